@@ -1,139 +1,216 @@
 import chromadb
-from chromadb.errors import DuplicateIDError
-import shutil
+import json
+import os
+import time
+import numpy as np
 import chromadb.utils.embedding_functions as embedding_functions
 from config.settings import settings
 from awr.logger import logger
+from awr.embedding_cache import EmbeddingCache, cache_key, get_default_cache
+from awr.vector_index import LocalVectorClient
+from utils.json_file import load_json, save_json
+from utils.xml_reader import FieldSchema, batched, iter_record_elements
 import xml.etree.ElementTree as ET
 from hashlib import sha256
-
-
-def check_existing_db():
-    try:
-        shutil.rmtree(settings.CHROMA_PATH)
-    except FileNotFoundError:
-        pass
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+# names each record field may appear under, most preferred first.
+# matched case-insensitively against child tags and attribute names.
+FIELD_ALIASES = {
+    "ID": ["ID"],
+    "JIRA_AWR_Title": ["JIRA_AWR_Title", "title"],
+    "JIRA_AWR_Description": ["JIRA_AWR_Description", "description"],
+    "JIRA_AWR_URL": ["JIRA_AWR_URL", "url", "link"],
+    "AWR_Document_Version": ["AWR_Document_Version", "version"],
+    "AWR_Document_Reference": ["AWR_Document_Reference", "refer", "reference"],
+    "AWR_DOC_JIRA_REF": ["AWR_DOC_JIRA_REF", "jira_ref", "jiraRef"],
+    "AWR_DOC_Short_Work_Desc": ["AWR_DOC_Short_Work_Desc", "short_work", "shortWork"],
+    "AWR_DOC_CUST_REQ_Summary": ["AWR_DOC_CUST_REQ_Summary", "cust_req", "summary"],
+    "AWR_DOC_CUST_REQ_Details": ["AWR_DOC_CUST_REQ_Details", "req_details", "details"],
+    "AWR_DOC_Business_Solution": [
+        "AWR_DOC_Business_Solution",
+        "business_solution",
+        "solution",
+    ],
+    "WIKI_PAGE_URL": ["WIKI_PAGE_URL", "page_url", "url"],
+    "WIKI_PAGE_Heading": ["WIKI_PAGE_Heading", "page_heading", "heading"],
+    "WIKI_PAGE_Details": ["WIKI_PAGE_Details", "page_details", "details"],
+}
+RECORD_SCHEMA = FieldSchema(FIELD_ALIASES)
+
+
+# query filter name -> metadata field. only fields that every XML-ingested
+# record carries (see _entry); a filter on a field they lack would silently
+# drop the whole knowledge base from the results. triaged tickets stored by
+# add_ticket only carry "project" of these.
+FILTER_FIELDS = {
+    "project": "project",
+    "document_reference": "AWR_Document_Reference",
+    "version": "AWR_Document_Version",
+}
+
+
+def project_of(key: str) -> str:
+    """Jira project of an issue key, e.g. CSP for CSP-123"""
+    project, sep, _ = (key or "").partition("-")
+    return project if sep else ""
+
+
+def build_where(**filters) -> Optional[dict]:
+    """chroma `where` clause from FILTER_FIELDS filters. a list value matches
+    any of its items, None values are ignored and several filters must all
+    match. returns None when there is nothing to filter on."""
+    conditions = []
+    for name, value in filters.items():
+        if value is None:
+            continue
+        if name not in FILTER_FIELDS:
+            raise ValueError(f"Unknown filter: {name}")
+        if isinstance(value, (list, tuple, set)):
+            value = {"$in": list(value)}
+        conditions.append({FILTER_FIELDS[name]: value})
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+
+def record_hash(metadata: dict) -> str:
+    """content hash of a record's metadata, used to detect changed records"""
+    return sha256(json.dumps(metadata, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class CachedOpenAIEmbeddingFunction(embedding_functions.OpenAIEmbeddingFunction):
+    """OpenAIEmbeddingFunction that serves texts it has seen before from the
+    on-disk embedding cache and only sends the rest to Azure."""
+
+    def __init__(self, cache: Optional[EmbeddingCache] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def __call__(self, input):
+        if self.cache is None:
+            return super().__call__(input)
+
+        keys = [
+            cache_key(
+                settings.AZURE_OPENAI_DEPLOYMENT,
+                settings.AZURE_OPENAI_MODEL_DIMENSIONS,
+                text,
+            )
+            for text in input
+        ]
+        vectors = self.cache.get_many(keys)
+        missing = {key: text for key, text in zip(keys, input) if key not in vectors}
+        if missing:
+            embedded = super().__call__(list(missing.values()))
+            fresh = list(zip(missing, embedded))
+            self.cache.put_many(fresh)
+            vectors.update(fresh)
+        return [vectors[key] for key in keys]
 
 
 class ChromaDB:
-    chunks = []
-    documents = []
-    metadatas = []
-    uids = []
-
-    def __init__(self):
-        check_existing_db()
-        self.ef = embedding_functions.OpenAIEmbeddingFunction(
+    def __init__(self, rebuild: bool = False):
+        """opens the persistent store. the existing collection is reused unless
+        `rebuild` is set, in which case it is dropped and recreated empty."""
+        self.ef = CachedOpenAIEmbeddingFunction(
+            cache=get_default_cache(),
             api_key=settings.AZURE_OPENAI_API_KEY,
             api_base=settings.AZURE_OPENAI_ENDPOINT,
             api_type="azure",
             api_version="2023-05-15",
             deployment_id=settings.AZURE_OPENAI_DEPLOYMENT,
         )
-        self.client = chromadb.PersistentClient(path=str(settings.CHROMA_PATH))
+        if settings.VECTOR_BACKEND == "local":
+            self.path = settings.VECTOR_INDEX_PATH
+            self.client = LocalVectorClient(self.path)
+        elif settings.VECTOR_BACKEND == "chroma":
+            self.path = settings.CHROMA_PATH
+            self.client = chromadb.PersistentClient(path=str(self.path))
+        else:
+            raise ValueError(f"Unknown VECTOR_BACKEND {settings.VECTOR_BACKEND!r}")
+        self.manifest_path = self.path / "manifest.json"
+        if rebuild:
+            self.drop()
         self.collection = self.client.get_or_create_collection(
             name="awr", embedding_function=self.ef
         )
-        logger.info("AWR Vector ChromaDB initialized")
-
-    def _get_element_text(self, parent, tag_names):
-        """
-        Try to find an element with any of the given tag names and return its text.
-        Returns empty string if none found.
-        """
-        for tag_name in tag_names:
-            # Try direct child first
-            elem = parent.find(tag_name)
-            if elem is not None:
-                return elem.text.strip() if elem.text else ""
-
-            # Try case-insensitive search
-            for child in parent:
-                if child.tag.lower() == tag_name.lower():
-                    return child.text.strip() if child.text else ""
-
-        return ""
-
-    # Parse the XML file
-    def parse_xml_file(self, file_path):
-        records = []
-
+        # one entry per DOCX section, see index_sections
+        self.sections = self.client.get_or_create_collection(
+            name="awr_sections", embedding_function=self.ef
+        )
+        logger.info(f"AWR Vector ChromaDB initialized ({settings.VECTOR_BACKEND})")
+
+    def drop(self):
+        """removes the awr and awr_sections collections and the manifest"""
+        logger.info(f"Rebuilding ChromaDB at {self.path}")
+        for name in ("awr", "awr_sections"):
+            try:
+                self.client.delete_collection(name=name)
+            except Exception:
+                pass  # collection does not exist yet
+        self.manifest_path.unlink(missing_ok=True)
+
+    def _load_manifest(self) -> dict:
+        """uid -> record hash of every XML record already in the collection"""
         try:
-            # Parse the XML file
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-
-            # Look for record elements - adjust these based on your XML structure
-            # Common patterns: 'record', 'item', 'entry', or the root elements directly
-            record_elements = (
-                root.findall(".//record")
-                or root.findall(".//item")
-                or root.findall(".//entry")
-            )
-
-            # If no nested records found, treat direct children as records
-            if not record_elements:
-                record_elements = list(root)
-
-            for record_elem in record_elements:
-                record = {}
-
-                # Extract fields - adjust field names based on your XML structure
-                record["ID"] = self._get_element_text(record_elem, ["ID", "id", "Id"])
-                record["JIRA_AWR_Title"] = self._get_element_text(
-                    record_elem, ["JIRA_AWR_Title", "title", "Title"]
-                )
-                record["JIRA_AWR_Description"] = self._get_element_text(
-                    record_elem, ["JIRA_AWR_Description", "description", "Description"]
-                )
-                record["JIRA_AWR_URL"] = self._get_element_text(
-                    record_elem, ["JIRA_AWR_URL", "url", "URL", "link"]
-                )
-                record["AWR_Document_Version"] = self._get_element_text(
-                    record_elem, ["AWR_Document_Version", "version", "Version"]
-                )
-                record["AWR_Document_Reference"] = self._get_element_text(
-                    record_elem,
-                    ["AWR_Document_Reference", "refer", "reference", "Reference"],
-                )
-                record["AWR_DOC_JIRA_REF"] = self._get_element_text(
-                    record_elem, ["AWR_DOC_JIRA_REF", "jira_ref", "jiraRef"]
-                )
-                record["AWR_DOC_Short_Work_Desc"] = self._get_element_text(
-                    record_elem, ["AWR_DOC_Short_Work_Desc", "short_work", "shortWork"]
-                )
-                record["AWR_DOC_CUST_REQ_Summary"] = self._get_element_text(
-                    record_elem, ["AWR_DOC_CUST_REQ_Summary", "cust_req", "summary"]
-                )
-                record["AWR_DOC_CUST_REQ_Details"] = self._get_element_text(
-                    record_elem, ["AWR_DOC_CUST_REQ_Details", "req_details", "details"]
-                )
-                record["AWR_DOC_Business_Solution"] = self._get_element_text(
-                    record_elem,
-                    ["AWR_DOC_Business_Solution", "business_solution", "solution"],
-                )
-                record["WIKI_PAGE_URL"] = self._get_element_text(
-                    record_elem, ["WIKI_PAGE_URL", "page_url", "url"]
-                )
-                record["WIKI_PAGE_Heading"] = self._get_element_text(
-                    record_elem, ["WIKI_PAGE_Heading", "page_heading", "heading"]
-                )
-                record["WIKI_PAGE_Details"] = self._get_element_text(
-                    record_elem, ["WIKI_PAGE_Details", "page_details", "details"]
-                )
+            return load_json(self.manifest_path, {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable manifest {self.manifest_path}: {e}")
+            return {}
+
+    def _save_manifest(self, manifest: dict):
+        save_json(self.manifest_path, manifest)
+
+    def _record_from_element(self, record_elem) -> dict:
+        """reads a record's fields from its child elements"""
+        return RECORD_SCHEMA.from_children(record_elem)
+
+    def _record_from_attributes(self, record_elem) -> dict:
+        """reads a record's fields from its attributes, falling back to
+        child elements for missing ones"""
+        record = RECORD_SCHEMA.from_attributes(record_elem)
+        if not all(record.values()):
+            children = RECORD_SCHEMA.from_children(record_elem)
+            for field_name, value in record.items():
+                if not value:
+                    record[field_name] = children[field_name]
+        return record
+
+    def iter_records(self, file_path, extract=None):
+        """yields the records of an XML file one at a time while parsing it.
+        fields are read from child elements, or from attributes when that
+        gives neither ID nor title; `extract` forces one of the two.
+        raises ET.ParseError / FileNotFoundError, possibly after records were
+        already yielded, so a truncated file is never mistaken for a complete
+        one."""
+        for record_elem in iter_record_elements(file_path):
+            if extract:
+                record = extract(record_elem)
+            else:
+                record = self._record_from_element(record_elem)
+                if not (record["ID"] or record["JIRA_AWR_Title"]):
+                    record = self._record_from_attributes(record_elem)
 
-                # Only add records that have at least an ID or title
-                if record["ID"] or record["JIRA_AWR_Title"]:
-                    records.append(record)
+            # Only add records that have at least an ID or title
+            if record["ID"] or record["JIRA_AWR_Title"]:
+                yield record
 
+    def _read_records(self, file_path, extract) -> list:
+        try:
+            return list(self.iter_records(file_path, extract))
         except ET.ParseError as e:
-            logger.error("Error parsing XML file", extra={"file_path": file_path})
-            return []
+            logger.error(f"Error parsing XML file: {e}", extra={"file_path": file_path})
         except FileNotFoundError:
             logger.error(f"XML file not found: {file_path}")
-            return []
+        return []
 
-        return records
+    # Parse the XML file
+    def parse_xml_file(self, file_path):
+        return self._read_records(file_path, self._record_from_element)
 
     # Alternative parsing function for attribute-based XML
     def parse_xml_file_attributes(self, file_path):
@@ -141,189 +218,344 @@ class ChromaDB:
         Alternative parser for XML files where data is stored in
         attributes rather than text content.
         """
-        records = []
-
-        try:
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-
-            record_elements = (
-                root.findall(".//record")
-                or root.findall(".//item")
-                or root.findall(".//entry")
-            )
-            if not record_elements:
-                record_elements = list(root)
-
-            for record_elem in record_elements:
-                record = {}
-
-                # Extract from attributes
-                attrs = record_elem.attrib
-                record["ID"] = attrs.get("ID", attrs.get("id", ""))
-                record["JIRA_AWR_Title"] = attrs.get(
-                    "JIRA_AWR_Title", attrs.get("title", "")
-                )
-                record["JIRA_AWR_Description"] = attrs.get(
-                    "JIRA_AWR_Description", attrs.get("description", "")
-                )
-                record["JIRA_AWR_URL"] = attrs.get("JIRA_AWR_URL", attrs.get("url", ""))
-                record["AWR_Document_Version"] = attrs.get(
-                    "AWR_Document_Version", attrs.get("version", "")
-                )
-                record["AWR_Document_Reference"] = attrs.get(
-                    "AWR_Document_Reference", attrs.get("refer", "")
-                )
-                record["AWR_DOC_JIRA_REF"] = attrs.get(
-                    "AWR_DOC_JIRA_REF", attrs.get("jira_ref", "")
-                )
-                record["AWR_DOC_Short_Work_Desc"] = attrs.get(
-                    "AWR_DOC_Short_Work_Desc", attrs.get("short_work", "")
-                )
-                record["AWR_DOC_CUST_REQ_Summary"] = attrs.get(
-                    "AWR_DOC_CUST_REQ_Summary", attrs.get("cust_req", "")
-                )
-                record["AWR_DOC_CUST_REQ_Details"] = attrs.get(
-                    "AWR_DOC_CUST_REQ_Details", attrs.get("req_details", "")
-                )
-                record["AWR_DOC_Business_Solution"] = attrs.get(
-                    "AWR_DOC_Business_Solution", attrs.get("business_solution", "")
-                )
-                record["WIKI_PAGE_URL"] = attrs.get(
-                    "WIKI_PAGE_URL", attrs.get("page_url", "")
-                )
-                record["WIKI_PAGE_Heading"] = attrs.get(
-                    "WIKI_PAGE_Heading", attrs.get("page_heading", "")
-                )
-                record["WIKI_PAGE_Details"] = attrs.get(
-                    "WIKI_PAGE_Details", attrs.get("page_details", "")
-                )
-
-                # Also check child elements for any missing data
-                for field_name in record:
-                    if not record[field_name]:
-                        record[field_name] = self._get_element_text(
-                            record_elem, [field_name]
-                        )
-
-                if record["ID"] or record["JIRA_AWR_Title"]:
-                    records.append(record)
-
-        except ET.ParseError as e:
-            logger.error(f"Error parsing XML file: {e}")
-            return []
-        except FileNotFoundError:
-            logger.error(f"XML file not found: {file_path}")
+        return self._read_records(file_path, self._record_from_attributes)
+
+    def populate(self, documents, metadatas, uids) -> List[str]:
+        """embeds and stores documents, returns the uids that were written.
+        entries with an empty document are skipped together with their
+        metadata and uid."""
+        assert (
+            len(documents) == len(metadatas) == len(uids)
+        ), "Input lists must match in length"
+
+        entries = [entry for entry in zip(documents, metadatas, uids) if entry[0]]
+        if len(entries) < len(documents):
+            logger.warning(f"Skipping {len(documents) - len(entries)} empty documents")
+        if not entries:
+            logger.warning("No valid documents found to add to ChromaDB.")
             return []
+        return self.ingest(entries)
+
+    def ingest(self, entries: Iterable[tuple], collection=None) -> List[str]:
+        """embeds and upserts (document, metadata, uid) entries in batches no
+        larger than the client's max batch size. the next batch is embedded on
+        a worker thread while the current one is written, and a failing batch
+        is logged and skipped instead of aborting the load. entries are pulled
+        lazily, so `entries` can be a stream. returns the uids written."""
+        collection = self.collection if collection is None else collection
+        batch_size = min(settings.CHROMA_INGEST_BATCH, self.client.get_max_batch_size())
+        batches = batched(entries, batch_size)
+        stored = []
+        failed = 0
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pending = self._embed_next(pool, batches)
+            while pending is not None:
+                batch, embedding = pending
+                pending = self._embed_next(pool, batches)
+                documents, metadatas, uids = map(list, zip(*batch))
+                try:
+                    collection.upsert(
+                        ids=uids,
+                        embeddings=embedding.result(),
+                        documents=documents,
+                        metadatas=metadatas,
+                    )
+                except Exception as e:
+                    failed += len(batch)
+                    logger.error(
+                        f"Failed to store batch of {len(batch)} documents: {e}",
+                        exc_info=True,
+                    )
+                    continue
+                stored.extend(uids)
+                elapsed = time.perf_counter() - start
+                logger.info(
+                    f"Stored {len(stored)} documents in ChromaDB "
+                    f"({len(stored) / elapsed:.1f} docs/s)"
+                )
 
-        return records
-
-    def populate(self, documents, metadatas, uids):
-        try:
-            if not (documents and metadatas and uids):
-                logger.warning("No valid documents found to add to ChromaDB.")
-                return False
-
-            assert (
-                len(documents) == len(metadatas) == len(uids)
-            ), "Input lists must match in length"
-
-            documents = [doc for doc in documents if doc]
-
-            self.collection.upsert(documents=documents, metadatas=metadatas, ids=uids)
-            logger.info(f"Added {len(documents)} documents to ChromaDB")
-            logger.info(f"Collection now contains {self.collection.count()} entries.")
-            return True
+        if failed:
+            logger.warning(f"{failed} documents could not be stored")
+        return stored
 
-        except DuplicateIDError:
-            logger.warning("Duplicate records found.")
-            return False
-        except Exception as e:
-            logger.error(f"Unexpected error in populate method: {e}", exc_info=True)
-            return False
+    def _embed_next(self, pool: ThreadPoolExecutor, batches: Iterator[list]):
+        """takes the next batch and starts embedding it on the pool"""
+        batch = next(batches, None)
+        if batch is None:
+            return None
+        return batch, pool.submit(self.ef, [document for document, _, _ in batch])
 
     def init_populate(self, xml_file_path=None):
-        """we initialize chromadb using the contents of xml file,"""
+        """we initialize chromadb using the contents of xml file, returns
+        whether the sync completed (see sync)"""
         if not xml_file_path:
             xml_file_path = settings.XML_SOURCE
+        if not xml_file_path:
+            logger.warning("No XML source configured, skipping ChromaDB sync")
+            return False
+        if not os.path.isfile(xml_file_path):
+            logger.error(f"XML file not found: {xml_file_path}, skipping ChromaDB sync")
+            return False
 
-        # Try element-based parsing first, then attribute-based if needed
-        records = self.parse_xml_file(xml_file_path)
-
-        # If no records found, try attribute-based parsing
-        if not records:
-            logger.warning(
-                "No records found with element-based parsing, "
-                "trying attribute-based parsing..."
-            )
-            records = self.parse_xml_file_attributes(xml_file_path)
-
-        logger.info(f"Found {len(records)} records in XML file")
+        # records are streamed from the file and synced in fixed-size batches
+        entries = filter(None, map(self._entry, self.iter_records(xml_file_path)))
+        return self.sync(entries)
+
+    @staticmethod
+    def _entry(record: dict):
+        """(document, metadata, uid) of an XML record, None if it has no text"""
+        # Create document content by combining title and description
+        title = record.get("JIRA_AWR_Title", "").strip()
+        description = record.get("JIRA_AWR_Description", "").strip()
+
+        if title and description:
+            document_content = f"{title} - {description}"
+        elif title:
+            document_content = title
+        elif description:
+            document_content = description
+        else:
+            return None
+
+        # Create a metadata dictionary with all fields
+        metadata = {
+            "ID": record.get("ID", ""),
+            "JIRA_AWR_Title": record.get("JIRA_AWR_Title", ""),
+            "JIRA_AWR_Description": record.get("JIRA_AWR_Description", ""),
+            "JIRA_AWR_URL": record.get("JIRA_AWR_URL", ""),
+            "AWR_Document_Version": record.get("AWR_Document_Version", ""),
+            "AWR_Document_Reference": record.get("AWR_Document_Reference", ""),
+            "AWR_DOC_JIRA_REF": record.get("AWR_DOC_JIRA_REF", ""),
+            "AWR_DOC_Short_Work_Desc": record.get("AWR_DOC_Short_Work_Desc", ""),
+            "AWR_DOC_CUST_REQ_Summary": record.get("AWR_DOC_CUST_REQ_Summary", ""),
+            "AWR_DOC_CUST_REQ_Details": record.get("AWR_DOC_CUST_REQ_Details", ""),
+            "AWR_DOC_Business_Solution": record.get("AWR_DOC_Business_Solution", ""),
+            "WIKI_PAGE_URL": record.get("WIKI_PAGE_URL", ""),
+            "WIKI_PAGE_Heading": record.get("WIKI_PAGE_Heading", ""),
+            "WIKI_PAGE_Details": record.get("WIKI_PAGE_Details", ""),
+            "project": project_of(record.get("AWR_DOC_JIRA_REF", "")),
+        }
+
+        # Generate a unique ID based on content and record ID to avoid duplicates
+        record_id = record.get("ID", "unknown")
+        uid = sha256(f"{record_id}_{document_content}".encode("utf-8")).hexdigest()
+        return document_content, metadata, uid
+
+    def sync(self, entries):
+        """incrementally applies (document, metadata, uid) entries against the
+        manifest, CHROMA_INGEST_BATCH entries at a time. new records are
+        embedded and upserted, records whose metadata changed are updated in
+        place (their uid already covers the embedded text), and records that
+        are no longer in the source are deleted. only the uid -> hash maps are
+        kept across batches. records whose update or delete fails keep their
+        old manifest entry, so the next sync retries them. if reading
+        `entries` fails, the sync stops before deleting anything, leaves the
+        manifest unchanged and returns False."""
+        manifest = self._load_manifest()
+        current = {}
+        changed = 0
+
+        def new_entries():
+            nonlocal changed
+            for batch in batched(entries, settings.CHROMA_INGEST_BATCH):
+                changed_entries = []
+                for document, metadata, uid in batch:
+                    if uid in current:
+                        continue
+                    digest = record_hash(metadata)
+                    current[uid] = digest
+                    if uid not in manifest:
+                        yield document, metadata, uid
+                    elif manifest[uid] != digest:
+                        changed_entries.append((metadata, uid))
+                if changed_entries:
+                    metadatas, uids = map(list, zip(*changed_entries))
+                    try:
+                        self.collection.update(ids=uids, metadatas=metadatas)
+                        changed += len(uids)
+                    except Exception as e:
+                        logger.error(
+                            f"ChromaDB metadata update of {len(uids)} records "
+                            f"failed: {e}"
+                        )
+                        for uid in uids:  # old hash kept, retried next sync
+                            current[uid] = manifest[uid]
 
-        for record in records:
-            # Create document content by combining title and description
-            title = record.get("JIRA_AWR_Title", "").strip()
-            description = record.get("JIRA_AWR_Description", "").strip()
+        try:
+            stored = set(self.ingest(new_entries()))
+        except (ET.ParseError, OSError) as e:
+            # a partial read says nothing about records after the failure, so
+            # nothing is deleted and the manifest is left as it was
+            logger.error(f"ChromaDB sync aborted, source could not be read: {e}")
+            return False
+        # keep failed records out of the manifest so the next sync retries them
+        for uid in [uid for uid in current if uid not in manifest]:
+            if uid not in stored:
+                del current[uid]
+
+        removed_uids = [uid for uid in manifest if uid not in current]
+        if removed_uids:
+            try:
+                self.collection.delete(ids=removed_uids)
+            except Exception as e:
+                logger.error(
+                    f"ChromaDB delete of {len(removed_uids)} records failed: {e}"
+                )
+                for uid in removed_uids:  # kept in the manifest, retried next sync
+                    current[uid] = manifest[uid]
+                removed_uids = []
+        added = len(stored)
+        logger.info(
+            f"ChromaDB sync: {added} added, {changed} changed, "
+            f"{len(removed_uids)} removed, {len(current) - added - changed} unchanged"
+        )
+        logger.info(f"Collection now contains {self.collection.count()} entries.")
 
-            if title and description:
-                document_content = f"{title} - {description}"
-            elif title:
-                document_content = title
-            elif description:
-                document_content = description
-            else:
-                continue
-            self.documents.append(document_content)
+        self._save_manifest(current)
+        return True
 
-            # Create a metadata dictionary with all fields
-            self.metadatas.append(
+    @staticmethod
+    def _matches(results, i: int = 0) -> list:
+        """shapes the i-th result set of a collection query as {id, url, distance}.
+        triaged tickets stored by add_ticket carry their key in `id`."""
+        v_awr = []
+        for metadata, distance in zip(results["metadatas"][i], results["distances"][i]):
+            v_awr.append(
                 {
-                    "ID": record.get("ID", ""),
-                    "JIRA_AWR_Title": record.get("JIRA_AWR_Title", ""),
-                    "JIRA_AWR_Description": record.get("JIRA_AWR_Description", ""),
-                    "JIRA_AWR_URL": record.get("JIRA_AWR_URL", ""),
-                    "AWR_Document_Version": record.get("AWR_Document_Version", ""),
-                    "AWR_Document_Reference": record.get("AWR_Document_Reference", ""),
-                    "AWR_DOC_JIRA_REF": record.get("AWR_DOC_JIRA_REF", ""),
-                    "AWR_DOC_Short_Work_Desc": record.get(
-                        "AWR_DOC_Short_Work_Desc", ""
-                    ),
-                    "AWR_DOC_CUST_REQ_Summary": record.get(
-                        "AWR_DOC_CUST_REQ_Summary", ""
-                    ),
-                    "AWR_DOC_CUST_REQ_Details": record.get(
-                        "AWR_DOC_CUST_REQ_Details", ""
-                    ),
-                    "AWR_DOC_Business_Solution": record.get(
-                        "AWR_DOC_Business_Solution", ""
-                    ),
-                    "WIKI_PAGE_URL": record.get("WIKI_PAGE_URL", ""),
-                    "WIKI_PAGE_Heading": record.get("WIKI_PAGE_Heading", ""),
-                    "WIKI_PAGE_Details": record.get("WIKI_PAGE_Details", ""),
+                    "id": metadata.get("AWR_DOC_JIRA_REF") or metadata.get("id"),
+                    "url": metadata.get("JIRA_AWR_URL"),
+                    "distance": distance,
                 }
             )
+        return v_awr
 
-            # Generate a unique ID based on content and record ID to avoid duplicates
-            record_id = record.get("ID", "unknown")
-            uid = sha256(f"{record_id}_{document_content}".encode("utf-8")).hexdigest()
-            self.uids.append(uid)
-
-        # load the processed xml data to chromadb
-        self.populate(self.documents, self.metadatas, self.uids)
-        return 0
-
-    def query(self, query_text: str, n_results: int = 3):
-        awr_docs = self.client.get_collection(name="awr", embedding_function=self.ef)
-        results = awr_docs.query(query_texts=[query_text], n_results=n_results)
+    def query(self, query_text: str, n_results: int = 3, where=None):
+        return self.query_many([query_text], n_results=n_results, where=where)[0]
+
+    def query_many(
+        self, queries: Sequence, n_results: int = 3, where=None
+    ) -> List[list]:
+        """nearest neighbours of many queries in a single collection.query
+        call. each query is a text or an embedding; texts are embedded in one
+        batch. `where` (see build_where) restricts the search to matching
+        records. returns a list of {id, url, distance} per query, in order."""
+        if not len(queries):
+            return []
+        texts = [q for q in queries if isinstance(q, str)]
+        vectors = iter(self.ef(texts) if texts else [])
+        embeddings = [
+            np.asarray(next(vectors) if isinstance(q, str) else q, dtype=np.float32)
+            for q in queries
+        ]
+        results = self.collection.query(
+            query_embeddings=embeddings,
+            n_results=n_results,
+            where=where,
+            include=["metadatas", "distances"],
+        )
+        return [self._matches(results, i) for i in range(len(queries))]
+
+    def query_by_embedding(self, vector, n_results: int = 3, where=None):
+        """nearest neighbours of an already computed embedding, so callers
+        that hold the vector don't pay for embedding the text again."""
+        results = self.collection.query(
+            query_embeddings=[np.asarray(vector, dtype=np.float32)],
+            n_results=n_results,
+            where=where,
+            include=["metadatas", "distances"],
+        )
+        return self._matches(results)
+
+    def index_sections(
+        self,
+        parent_id: str,
+        sections: Dict[str, str],
+        metadata: Optional[dict] = None,
+        embeddings=None,
+    ) -> int:
+        """indexes the sections (title -> text) of one AWR document in the
+        awr_sections collection, replacing what was indexed for it before.
+        each section carries the parent's `metadata` plus its parent_id and
+        section title. `embeddings` (one per section, in order) are used as
+        is instead of embedding the texts again. returns the sections stored."""
+        self.sections.delete(where={"parent_id": parent_id})
+        if embeddings is not None:
+            entries = [
+                (title, text, vector)
+                for (title, text), vector in zip(sections.items(), embeddings)
+                if text
+            ]
+        else:
+            entries = [(title, text, None) for title, text in sections.items() if text]
+        if not entries:
+            logger.warning(f"No sections to index for {parent_id}")
+            return 0
+
+        titles, documents, vectors = map(list, zip(*entries))
+        if embeddings is None:
+            vectors = self.ef(documents)
+        self.sections.upsert(
+            ids=[
+                sha256(f"{parent_id}\0{title}".encode("utf-8")).hexdigest()
+                for title in titles
+            ],
+            embeddings=[np.asarray(vector, dtype=np.float32) for vector in vectors],
+            documents=documents,
+            metadatas=[
+                {**(metadata or {}), "parent_id": parent_id, "section": title}
+                for title in titles
+            ],
+        )
+        logger.info(f"Indexed {len(titles)} sections of {parent_id}")
+        return len(titles)
+
+    def query_sections(
+        self, query, n_results: int = 3, aggregate: str = "max", where=None
+    ) -> list:
+        """searches awr_sections and ranks the parent documents of the hits.
+        with `max` a parent scores as its closest section, with `mean` as the
+        mean distance of its sections among the hits. `query` is a text or an
+        embedding. returns the top n_results parents as {id, url, distance,
+        section}, where section is the title of the closest section."""
+        if aggregate not in ("max", "mean"):
+            raise ValueError(f"Unknown aggregation: {aggregate}")
+        vector = self.ef([query])[0] if isinstance(query, str) else query
+        results = self.sections.query(
+            query_embeddings=[np.asarray(vector, dtype=np.float32)],
+            n_results=n_results * settings.CHROMA_SECTION_FANOUT,
+            where=where,
+            include=["metadatas", "distances"],
+        )
 
-        v_awr = []
-        for i in range(len(results["documents"][0])):
-            metadata = results["metadatas"][0][i]
-            v_awr.append(
+        hits = {}
+        for metadata, distance in zip(results["metadatas"][0], results["distances"][0]):
+            hits.setdefault(metadata["parent_id"], []).append((distance, metadata))
+
+        parents = []
+        for parent_id, parent_hits in hits.items():
+            # hits come back closest first
+            distance, best = parent_hits[0]
+            if aggregate == "mean":
+                distance = float(np.mean([d for d, _ in parent_hits]))
+            parents.append(
                 {
-                    "id": metadata.get("AWR_DOC_JIRA_REF"),
-                    "url": metadata.get("JIRA_AWR_URL"),
-                    "distance": results["distances"][0][i],
+                    "id": best.get("AWR_DOC_JIRA_REF") or parent_id,
+                    "url": best.get("JIRA_AWR_URL"),
+                    "distance": distance,
+                    "section": best.get("section"),
                 }
             )
-        return v_awr
+        parents.sort(key=lambda parent: parent["distance"])
+        return parents[:n_results]
+
+    def add_ticket(self, ticket_id: str, embedding, metadata: dict, document=None):
+        """stores a triaged ticket with its precomputed embedding"""
+        self.collection.upsert(
+            ids=[ticket_id],
+            embeddings=[np.asarray(embedding, dtype=np.float32)],
+            metadatas=[metadata],
+            documents=[document] if document else None,
+        )
+        logger.info(f"Stored ticket {ticket_id} in ChromaDB")
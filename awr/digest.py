@@ -0,0 +1,111 @@
+import threading
+from contextlib import contextmanager
+from html import escape
+from typing import Dict, List, Optional, Tuple
+from config.settings import settings
+from awr.logger import logger
+
+CATEGORY_TITLES = {
+    "duplicate": "Duplicates",
+    "review": "Review needed",
+    "escalated": "Escalated",
+}
+COLUMNS = ("Ticket", "Match", "Similarity", "URL")
+
+
+class Digest:
+    """notifications collected over a run and sent as one summary email,
+    grouped by category and match. safe to fill from several threads."""
+
+    def __init__(self, title: str):
+        self.title = title
+        self._events: Dict[Tuple[str, str], dict] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def add(
+        self,
+        category: str,
+        ticket: str,
+        match: Optional[str] = None,
+        similarity: Optional[float] = None,
+        url: Optional[str] = None,
+    ):
+        """records an event, once per ticket and category"""
+        with self._lock:
+            self._events[(category, ticket)] = {
+                "ticket": ticket,
+                "match": match or "",
+                "similarity": f"{similarity:.2f}" if similarity is not None else "",
+                "url": url or "",
+            }
+
+    def groups(self) -> Dict[str, List[dict]]:
+        """category -> events, ordered by match then ticket"""
+        with self._lock:
+            items = sorted(
+                self._events.items(),
+                key=lambda item: (item[0][0], item[1]["match"], item[1]["ticket"]),
+            )
+        groups = {}
+        for (category, _), event in items:
+            groups.setdefault(category, []).append(event)
+        return groups
+
+    def render(self) -> Tuple[str, str, str]:
+        """subject, plain-text body and HTML body of the digest email"""
+        groups = self.groups()
+        counts = ", ".join(f"{len(events)} {name}" for name, events in groups.items())
+        subject = f"[{self.title}] {len(self)} notifications: {counts}"
+
+        text, html = [], []
+        for category, events in groups.items():
+            heading = f"{CATEGORY_TITLES.get(category, category)} ({len(events)})"
+            rows = [[event[c.lower()] for c in COLUMNS] for event in events]
+            widths = [
+                max(len(column), *(len(row[i]) for row in rows))
+                for i, column in enumerate(COLUMNS)
+            ]
+            text.append(heading)
+            for row in [list(COLUMNS)] + rows:
+                text.append(
+                    "  ".join(cell.ljust(w) for cell, w in zip(row, widths)).rstrip()
+                )
+            text.append("")
+
+            html.append(f"<h3>{escape(heading)}</h3>")
+            html.append('<table border="1" cellpadding="4" cellspacing="0">')
+            html.append("<tr>" + "".join(f"<th>{c}</th>" for c in COLUMNS) + "</tr>")
+            for row in rows:
+                html.append(
+                    "<tr>" + "".join(f"<td>{escape(c)}</td>" for c in row) + "</tr>"
+                )
+            html.append("</table>")
+
+        return subject, "\n".join(text), "\n".join(html)
+
+    def send(self, outbox) -> bool:
+        """queues the digest email, if anything was collected"""
+        if not len(self):
+            logger.info(f"[Digest] {self.title}: nothing to report")
+            return False
+        subject, body, html_body = self.render()
+        logger.info(f"[Digest] Sending {subject}")
+        return outbox.enqueue(
+            to=settings.EMAIL_USER, subject=subject, body=body, html_body=html_body
+        )
+
+
+@contextmanager
+def digest_window(workflow, title: str):
+    """collects the workflow's notifications into one digest that is sent
+    through its outbox when the block exits. workflows check their `digest`
+    attribute and add events to it instead of sending single emails."""
+    workflow.digest = Digest(title)
+    try:
+        yield workflow.digest
+    finally:
+        digest, workflow.digest = workflow.digest, None
+        digest.send(workflow.outbox)
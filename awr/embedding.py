@@ -1,41 +1,151 @@
 import openai
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Sequence, Tuple
 from config.settings import settings
 from awr.logger import logger
+from awr.embedding_cache import EmbeddingCache, cache_key, get_default_cache
 from openai import AzureOpenAI
 
+# Azure OpenAI configuration
 client = AzureOpenAI(
     azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
     api_key=settings.AZURE_OPENAI_API_KEY,
     api_version=settings.AZURE_OPENAI_VERSION,
 )
-import numpy as np
-from config.settings import settings
-from awr.logger import logger
 
-# Azure OpenAI configuration
+
+def estimate_tokens(text: str) -> int:
+    """rough token count (~4 characters per token), good enough for packing"""
+    return len(text) // 4 + 1
 
 
 class EmbeddingGenerator:
-    def __init__(self):
+    def __init__(self, cache: Optional[EmbeddingCache] = None):
         self.model = settings.AZURE_OPENAI_DEPLOYMENT
         self.dimensions = settings.AZURE_OPENAI_MODEL_DIMENSIONS
+        self.cache = cache if cache is not None else get_default_cache()
+        self.batch_size = settings.EMBEDDING_BATCH_SIZE
+        self.batch_tokens = settings.EMBEDDING_BATCH_TOKENS
+        self.concurrency = settings.EMBEDDING_CONCURRENCY
 
     def generate(self, text: str) -> np.ndarray:
         if not text.strip():
             logger.warning("Empty text input for embedding generation")
-            return np.zeros(self.dimensions, dtype=float)
+            return np.zeros(self.dimensions, dtype=np.float32)
+
+        key = cache_key(self.model, self.dimensions, text)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
 
         try:
             response = client.embeddings.create(
                 model=self.model, input=text  # Azure Engine
             )
-            embedding = response.data[0].embedding
-            if len(embedding) != self.dimensions:
-                logger.warning(
-                    f"Embedding dimension mismatch: expected {self.dimensions}, got {len(embedding)}"
-                )
-            return np.array(embedding, dtype=float)
+            vector = np.array(response.data[0].embedding, dtype=np.float32)
+            self._check_dimensions(len(vector))
         except Exception as e:
             logger.error(f"Embedding generation failed: {e}", exc_info=True)
             raise
+
+        if self.cache is not None:
+            self.cache.put(key, vector)
+        return vector
+
+    def _check_dimensions(self, size: int):
+        """the stores hold fixed-size vectors, so a mismatch is an error"""
+        if size != self.dimensions:
+            raise ValueError(
+                f"Embedding dimension mismatch: expected {self.dimensions}, got {size}"
+            )
+
+    def _pack(
+        self, indices: Sequence[int], texts: Sequence[str]
+    ) -> Iterator[List[int]]:
+        """groups text indices into requests bounded by item count and token budget.
+        a single text over the token budget is sent on its own."""
+        batch, batch_tokens = [], 0
+        for i in indices:
+            tokens = estimate_tokens(texts[i])
+            if batch and (
+                len(batch) >= self.batch_size
+                or batch_tokens + tokens > self.batch_tokens
+            ):
+                yield batch
+                batch, batch_tokens = [], 0
+            batch.append(i)
+            batch_tokens += tokens
+        if batch:
+            yield batch
+
+    def _embed_request(
+        self, batch: List[int], texts: Sequence[str]
+    ) -> Tuple[List[int], np.ndarray]:
+        response = client.embeddings.create(
+            model=self.model, input=[texts[i] for i in batch]
+        )
+        # the api reports each embedding's input position in `index`; every
+        # row must be filled exactly once, or garbage would be cached
+        indices = sorted(item.index for item in response.data)
+        if indices != list(range(len(batch))):
+            raise ValueError(
+                f"Embedding response covers inputs {indices}, "
+                f"expected 0..{len(batch) - 1}"
+            )
+        vectors = np.empty((len(batch), self.dimensions), dtype=np.float32)
+        for item in response.data:
+            self._check_dimensions(len(item.embedding))
+            vectors[item.index] = item.embedding
+        return batch, vectors
+
+    def generate_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """embeds many texts with as few requests as possible.
+
+        texts are packed into requests of at most `batch_size` items and
+        `batch_tokens` estimated tokens, and up to `concurrency` requests are in
+        flight at once. returns a contiguous float32 matrix with one row per
+        input, in input order; empty texts get a zero row. cached texts and
+        repeats within `texts` are not sent at all."""
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        indices = [i for i, text in enumerate(texts) if text and text.strip()]
+        if len(indices) < len(texts):
+            logger.warning(
+                f"{len(texts) - len(indices)} empty text inputs for embedding generation"
+            )
+
+        # serve what we can from the cache and send each distinct text once
+        keys = {i: cache_key(self.model, self.dimensions, texts[i]) for i in indices}
+        cached = self.cache.get_many(keys.values()) if self.cache is not None else {}
+        first = {}
+        for i in indices:
+            if keys[i] in cached:
+                matrix[i] = cached[keys[i]]
+            else:
+                first.setdefault(keys[i], i)
+        indices = list(first.values())
+        if not indices:
+            return matrix
+
+        batches = list(self._pack(indices, texts))
+        logger.debug(
+            f"Embedding {len(indices)} texts in {len(batches)} requests "
+            f"(concurrency {self.concurrency})"
+        )
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                for batch, vectors in pool.map(
+                    lambda b: self._embed_request(b, texts), batches
+                ):
+                    matrix[batch] = vectors
+        except Exception as e:
+            logger.error(f"Batch embedding generation failed: {e}", exc_info=True)
+            raise
+
+        if self.cache is not None:
+            self.cache.put_many([(keys[i], matrix[i]) for i in indices])
+        for i, key in keys.items():
+            if key not in cached and first[key] != i:
+                matrix[i] = matrix[first[key]]
+        return matrix
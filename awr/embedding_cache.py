@@ -0,0 +1,189 @@
+import re
+import sqlite3
+import threading
+import time
+import numpy as np
+from hashlib import sha256
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from config.settings import settings
+from awr.logger import logger
+
+
+def cache_key(model: str, dimensions: int, text: str) -> str:
+    """content address of an embedding: deployment, dimensions and the
+    whitespace-normalized text"""
+    normalized = re.sub(r"\s+", " ", text.strip())
+    return sha256(f"{model}\0{dimensions}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """on-disk embedding cache.
+
+    vectors live in a memory-mapped float32 file with a fixed number of slots;
+    a small SQLite index maps each key to its slot and last access time. when
+    all slots are taken the least recently used entries are overwritten."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_mb: Optional[int] = None,
+        dimensions: Optional[int] = None,
+        capacity: Optional[int] = None,
+    ):
+        """the number of slots is `capacity` if given, otherwise as many
+        vectors as fit in `max_mb`."""
+        self.path = Path(path or settings.EMBEDDING_CACHE_PATH)
+        self.dimensions = dimensions or settings.AZURE_OPENAI_MODEL_DIMENSIONS
+        max_mb = settings.EMBEDDING_CACHE_MAX_MB if max_mb is None else max_mb
+        self.capacity = capacity or max(
+            1, max_mb * 1024 * 1024 // (self.dimensions * 4)
+        )
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path / "index.sqlite", check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                slot INTEGER NOT NULL UNIQUE,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+            CREATE TABLE IF NOT EXISTS layout (
+                dimensions INTEGER NOT NULL,
+                capacity INTEGER NOT NULL
+            );
+            """)
+        self._vectors = self._open_vectors()
+        logger.info(
+            f"Embedding cache at {self.path}: {len(self)} of {self.capacity} slots used"
+        )
+
+    def _open_vectors(self) -> np.memmap:
+        vectors_path = self.path / "vectors.f32"
+        layout = self._db.execute("SELECT dimensions, capacity FROM layout").fetchone()
+        if layout != (self.dimensions, self.capacity) or not vectors_path.exists():
+            # new cache, or dimensions/size changed: slots cannot be reused
+            if layout is not None:
+                logger.warning("Embedding cache layout changed, clearing cache")
+            with self._db:
+                self._db.execute("DELETE FROM entries")
+                self._db.execute("DELETE FROM layout")
+                self._db.execute(
+                    "INSERT INTO layout VALUES (?, ?)", (self.dimensions, self.capacity)
+                )
+            mode = "w+"
+        else:
+            mode = "r+"
+        return np.memmap(
+            vectors_path,
+            dtype=np.float32,
+            mode=mode,
+            shape=(self.capacity, self.dimensions),
+        )
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _slots(self, keys: List[str]) -> Dict[str, int]:
+        slots = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start : start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            slots.update(
+                self._db.execute(
+                    f"SELECT key, slot FROM entries WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+            )
+        return slots
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        """returns copies of the cached vectors for the keys that are present"""
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            slots = self._slots(keys)
+            found = {key: np.array(self._vectors[slot]) for key, slot in slots.items()}
+            now = time.time()
+            with self._db:
+                self._db.executemany(
+                    "UPDATE entries SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: List[Tuple[str, np.ndarray]]):
+        """stores vectors, evicting least recently used entries when full"""
+        items = [
+            (key, vector)
+            for key, vector in dict(items).items()
+            if len(vector) == self.dimensions
+        ][-self.capacity :]
+        if not items:
+            return
+        with self._lock:
+            slots = self._slots([key for key, _ in items])
+            new_keys = [key for key, _ in items if key not in slots]
+            used = len(self)
+            free = list(range(used, min(used + len(new_keys), self.capacity)))
+            evict = len(new_keys) - len(free)
+            with self._db:
+                if evict > 0:
+                    # oldest entries first, never the ones being written now
+                    candidates = self._db.execute(
+                        "SELECT key, slot FROM entries ORDER BY last_used LIMIT ?",
+                        (evict + len(slots),),
+                    ).fetchall()
+                    victims = [(k, s) for k, s in candidates if k not in slots][:evict]
+                    self._db.executemany(
+                        "DELETE FROM entries WHERE key = ?",
+                        [(key,) for key, _ in victims],
+                    )
+                    free.extend(slot for _, slot in victims)
+                    logger.debug(f"Evicted {len(victims)} entries from embedding cache")
+                slots.update(zip(new_keys, free))
+                now = time.time()
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO entries (key, slot, last_used) VALUES (?, ?, ?)",
+                    [(key, slots[key], now) for key, _ in items],
+                )
+                for key, vector in items:
+                    self._vectors[slots[key]] = vector
+                self._vectors.flush()
+
+    def put(self, key: str, vector: np.ndarray):
+        self.put_many([(key, vector)])
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self),
+            "capacity": self.capacity,
+        }
+
+
+_default_cache: Optional[EmbeddingCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[EmbeddingCache]:
+    """process-wide cache shared by the embedding generator and ChromaDB.
+    returns None when EMBEDDING_CACHE_MAX_MB is 0."""
+    global _default_cache
+    if settings.EMBEDDING_CACHE_MAX_MB <= 0:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache()
+        return _default_cache
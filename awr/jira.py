@@ -3,8 +3,9 @@ from jira.resources import Issue
 from jira.exceptions import JIRAError
 from config.settings import settings
 from awr.logger import logger
+from awr.pagination import paginate
 import json
-from typing import Optional, List, Any
+from typing import Iterator, Optional, List, Any, Tuple
 
 
 class JiraClient:
@@ -67,6 +68,38 @@ class JiraClient:
             logger.exception("Unexpected error creating issue")
             return None
 
+    def create_tickets_bulk(
+        self, tickets: List[dict], issue_type: str = "Task"
+    ) -> List[Tuple[Optional[str], Optional[str]]]:
+        """creates issues through Jira's bulk endpoint, see
+        JiraClientREST.create_tickets_bulk for the shape of in- and output."""
+        field_list = [
+            {
+                "project": {"key": self.project_key},
+                "summary": ticket["summary"],
+                "description": ticket["description"],
+                "issuetype": {"name": issue_type},
+                **({"labels": ticket["labels"]} if ticket.get("labels") else {}),
+            }
+            for ticket in tickets
+        ]
+        logger.info(f"Bulk creating {len(tickets)} issues in '{self.project_key}'")
+        try:
+            created = self.client.create_issues(field_list=field_list, prefetch=False)
+        except JIRAError as e:
+            error = e.text if hasattr(e, "text") else str(e)
+            logger.error(f"Bulk create failed: {error}")
+            return [(None, error)] * len(tickets)
+
+        return [
+            (
+                (item["issue"].key, None)
+                if item["status"] == "Success"
+                else (None, str(item["error"]))
+            )
+            for item in created
+        ]
+
     def get_ticket(self, ticket_id: str) -> Optional[Issue]:
         logger.info(f"Fetching ticket {ticket_id}")
         try:
@@ -89,12 +122,16 @@ class JiraClient:
             logger.exception(f"Unexpected error fetching ticket: {str(e)}")
             raise
 
-    def update_ticket(self, ticket: Issue, **fields) -> bool:
+    def update_ticket(
+        self, ticket: Issue, comment: Optional[str] = None, **fields
+    ) -> bool:
+        """sets `fields` and adds `comment` in a single edit request"""
         changes = "\n".join([f"{k}: {v}" for k, v in fields.items()])
         logger.info(f"Updating {ticket.key} with:\n{changes}")
 
+        update = {"comment": [{"add": {"body": comment}}]} if comment else None
         try:
-            ticket.update(fields=fields)
+            ticket.update(fields=fields, update=update)
             logger.debug(f"Update successful for {ticket.key}")
             return True
         except JIRAError as e:
@@ -146,6 +183,39 @@ class JiraClient:
             logger.exception(f"Unexpected search error: {str(e)}")
             raise
 
+    def iter_search(
+        self,
+        jql: str,
+        fields: Optional[List[str]] = None,
+        prefetch: bool = True,
+        consuming: bool = False,
+    ) -> Iterator[Issue]:
+        """yields every issue matching the JQL one page at a time, see
+        awr.pagination.paginate for `prefetch` and `consuming`."""
+        logger.info(f"Executing JQL: {jql}")
+
+        def fetch_page(start_at):
+            try:
+                issues = self.client.search_issues(
+                    jql,
+                    startAt=start_at,
+                    maxResults=settings.JIRA_PAGE_SIZE,
+                    fields=",".join(fields) if fields else "*all",
+                )
+            except JIRAError as e:
+                logger.error(
+                    f"JQL search failed: {e.text if hasattr(e, 'text') else str(e)}"
+                )
+                return [], 0
+            return list(issues), issues.total
+
+        return paginate(
+            fetch_page,
+            prefetch=prefetch,
+            consuming=consuming,
+            key=lambda issue: issue.key,
+        )
+
     def add_comment(self, ticket_id: str, comment: str) -> bool:
         logger.info(f"Adding comment to {ticket_id}")
         logger.debug(f"Comment content:\n{comment}")
@@ -0,0 +1,255 @@
+import asyncio
+import json
+import time
+import httpx
+from typing import AsyncIterator, List, Optional
+from config.settings import settings
+from awr.logger import logger
+from awr.jira_rest import LatencyStats, edit_payload, endpoint_name
+from utils.retry import retry_delay, should_retry
+
+
+class AsyncJiraClientREST:
+    """asyncio counterpart of JiraClientREST with the same methods.
+
+    requests share one httpx.AsyncClient (HTTP/2, keep-alive) and a semaphore
+    caps how many are in flight, so callers can gather hundreds of calls
+    without flooding Jira. use as `async with AsyncJiraClientREST() as jira:`
+    or call `aclose()` when done."""
+
+    def __init__(self, concurrency: Optional[int] = None):
+        # self.base_url = settings.JIRA_SERVER
+        self.base_url = "https://devjfto.atlassian.net"
+        self.project_key = settings.JIRA_PROJECT_KEY
+        self.approval_task_customfield = "customfield_10010"
+        self.timeout = 30  # seconds
+        self.max_retries = settings.JIRA_MAX_RETRIES
+        self.backoff_factor = settings.JIRA_BACKOFF_FACTOR
+        self.page_size = settings.JIRA_PAGE_SIZE
+        self.concurrency = concurrency or settings.JIRA_ASYNC_CONCURRENCY
+        self.latency = LatencyStats()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            auth=(settings.JIRA_USERNAME, settings.JIRA_API_TOKEN),
+            headers={"Content-Type": "application/json"},
+            timeout=self.timeout,
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+            ),
+        )
+
+        logger.info("Initializing async JIRA REST client")
+        logger.info(f"Base URL: {self.base_url}")
+        logger.info(f"Logged in as {settings.JIRA_USERNAME}")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def _request(
+        self, method, endpoint, max_retries=None, backoff_factor=None, **kwargs
+    ):
+        max_retries = self.max_retries if max_retries is None else max_retries
+        if backoff_factor is None:
+            backoff_factor = self.backoff_factor
+        name = endpoint_name(method, endpoint)
+        logger.debug(f"Request URL: {self.base_url}{endpoint}")
+        if "json" in kwargs:
+            logger.debug(
+                f"Request JSON payload: {json.dumps(kwargs['json'], indent=2)}"
+            )
+
+        for attempt in range(max_retries + 1):
+            start = time.perf_counter()
+            try:
+                async with self._semaphore:
+                    response = await self.client.request(method, endpoint, **kwargs)
+            except httpx.TransportError as e:
+                self.latency.record(name, time.perf_counter() - start, error=True)
+                if attempt < max_retries and should_retry(method, None):
+                    delay = retry_delay(attempt, backoff_factor)
+                    logger.warning(f"{name} failed ({e}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                logger.error(f"Request failed: {e}")
+                raise
+
+            failed = response.status_code >= 400
+            self.latency.record(name, time.perf_counter() - start, error=failed)
+            logger.debug(f"Response code: {response.status_code}")
+            logger.debug(f"Response body: {response.text}")
+            if (
+                failed
+                and attempt < max_retries
+                and should_retry(method, response.status_code)
+            ):
+                delay = retry_delay(
+                    attempt, backoff_factor, response.headers.get("Retry-After")
+                )
+                logger.warning(
+                    f"{name} returned {response.status_code}, retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            try:
+                response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                logger.error(f"Request failed: {e}")
+                raise
+            if response.text:
+                return response.json()
+            return None
+
+    async def create_ticket(
+        self,
+        summary: str,
+        description: str,
+        project_key: Optional[str] = None,
+        issue_type: str = "Task",
+        labels: Optional[List[str]] = None,
+    ) -> Optional[str]:
+        project_key = project_key or self.project_key
+        payload = {
+            "fields": {
+                "project": {"key": project_key},
+                "summary": summary,
+                "description": description,
+                "issuetype": {"name": issue_type},
+            }
+        }
+        if labels:
+            payload["fields"]["labels"] = labels
+        logger.info(
+            f"Creating issue in project '{project_key}' with summary '{summary}'"
+        )
+        response = await self._request("POST", "/rest/api/2/issue", json=payload)
+        if response and "key" in response:
+            logger.info(f"Issue created: {response['key']}")
+            return response["key"]
+        logger.error(f"Failed to create issue. Response: {response}")
+        return None
+
+    async def get_ticket(self, ticket_id: str) -> Optional[dict]:
+        logger.info(f"Fetching ticket {ticket_id}")
+        response = await self._request("GET", f"/rest/api/2/issue/{ticket_id}")
+        if response:
+            logger.debug(f"Ticket {ticket_id} fetched successfully")
+        else:
+            logger.error(f"Failed to fetch ticket {ticket_id}")
+        return response
+
+    async def update_ticket(
+        self,
+        ticket_id: str,
+        fields: Optional[dict] = None,
+        add_labels: Optional[List[str]] = None,
+        comment: Optional[str] = None,
+    ) -> bool:
+        """edits the ticket in a single PUT: `fields` are set, `add_labels`
+        are added to the current labels and `comment` is posted, the last two
+        through the edit API's update verbs."""
+        logger.info(
+            f"Updating ticket {ticket_id} with fields: {fields}, "
+            f"labels: {add_labels}, comment: {bool(comment)}"
+        )
+        payload = edit_payload(fields, add_labels, comment)
+        response = await self._request(
+            "PUT", f"/rest/api/2/issue/{ticket_id}", json=payload
+        )
+        if response is None:  # PUT returns empty on success
+            logger.info(f"Ticket {ticket_id} updated successfully")
+            return True
+        logger.error(f"Failed to update ticket {ticket_id}. Response: {response}")
+        return False
+
+    async def create_approval_task(self, ticket_id: str) -> Optional[str]:
+        logger.info(f"Creating approval task for {ticket_id}")
+        payload = {
+            "fields": {
+                "project": {"key": self.project_key},
+                "summary": f"Review disputed AWR: {ticket_id}",
+                "description": f"Disputed classification for {ticket_id}",
+                "issuetype": {"name": "Approval Task"},
+                self.approval_task_customfield: ticket_id,
+            }
+        }
+        response = await self._request("POST", "/rest/api/2/issue", json=payload)
+        if response and "key" in response:
+            logger.info(f"Approval task created: {response['key']}")
+            return response["key"]
+        logger.error(f"Failed to create approval task. Response: {response}")
+        return None
+
+    async def iter_search(
+        self, jql: str, fields: Optional[List[str]] = None, limit: Optional[int] = None
+    ) -> AsyncIterator[dict]:
+        """yields every issue matching the JQL (at most `limit`), fetching the
+        next page while the current one is consumed. no page past the limit
+        is requested."""
+        logger.info(f"Searching tickets with JQL: {jql}")
+        page_size = self.page_size if limit is None else min(self.page_size, limit)
+        params = {"jql": jql, "maxResults": page_size}
+        if fields:
+            params["fields"] = ",".join(fields)
+
+        async def fetch_page(start_at):
+            response = await self._request(
+                "GET", "/rest/api/2/search", params={**params, "startAt": start_at}
+            )
+            if not response or "issues" not in response:
+                logger.error(f"JQL search failed. Response: {response}")
+                return [], 0
+            return response["issues"], response.get("total", 0)
+
+        if limit is not None and limit <= 0:
+            return
+        pending = asyncio.ensure_future(fetch_page(0))
+        start_at = 0
+        try:
+            while pending is not None:
+                issues, total = await pending
+                if limit is not None:
+                    issues = issues[: limit - start_at]
+                start_at += len(issues)
+                pending = None
+                if issues and start_at < total and (limit is None or start_at < limit):
+                    pending = asyncio.ensure_future(fetch_page(start_at))
+                for issue in issues:
+                    yield issue
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def search_tickets(
+        self,
+        jql: str,
+        max_results: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[dict]:
+        issues = [
+            issue
+            async for issue in self.iter_search(jql, fields=fields, limit=max_results)
+        ]
+        logger.info(f"Found {len(issues)} issues")
+        return issues
+
+    async def add_comment(self, ticket_id: str, comment: str) -> bool:
+        logger.info(f"Adding comment to ticket {ticket_id}")
+        payload = {"body": comment}
+        response = await self._request(
+            "POST", f"/rest/api/2/issue/{ticket_id}/comment", json=payload
+        )
+        if response and "id" in response:
+            logger.info(f"Comment added with ID {response['id']}")
+            return True
+        logger.error(f"Failed to add comment. Response: {response}")
+        return False
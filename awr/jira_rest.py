@@ -1,10 +1,77 @@
 import requests
 import json
+import re
+import threading
 import time
-import random
-from typing import Optional, List
+from collections import defaultdict
+from itertools import islice
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterator, Optional, List, Tuple
 from config.settings import settings
 from awr.logger import logger
+from awr.pagination import paginate
+from utils.retry import retry_delay, should_retry
+
+_ENDPOINT_IDS = re.compile(r"(?<!/api)/(?:[A-Z][A-Z0-9_]*-\d+|\d+)(?=/|$)")
+
+
+def endpoint_name(method: str, endpoint: str) -> str:
+    """groups requests for latency stats, e.g. GET /rest/api/2/issue/{id}"""
+    return f"{method.upper()} {_ENDPOINT_IDS.sub('/{id}', endpoint)}"
+
+
+def edit_payload(
+    fields: Optional[dict] = None,
+    add_labels: Optional[List[str]] = None,
+    comment: Optional[str] = None,
+) -> dict:
+    """issue-edit body that sets fields, adds labels and adds a comment at once"""
+    payload = {"fields": dict(fields or {})}
+    update = {}
+    if add_labels:
+        update["labels"] = [{"add": label} for label in add_labels]
+    if comment:
+        update["comment"] = [{"add": {"body": comment}}]
+    if update:
+        payload["update"] = update
+    return payload
+
+
+class LatencyStats:
+    """per-endpoint request count, latency and error totals, thread-safe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(
+            lambda: {"count": 0, "errors": 0, "total": 0.0, "max": 0.0}
+        )
+
+    def record(self, name: str, elapsed: float, error: bool = False):
+        with self._lock:
+            stats = self._stats[name]
+            stats["count"] += 1
+            stats["errors"] += int(error)
+            stats["total"] += elapsed
+            stats["max"] = max(stats["max"], elapsed)
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                name: {
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "mean": stats["total"] / stats["count"],
+                    "max": stats["max"],
+                }
+                for name, stats in self._stats.items()
+            }
+
+    def log(self):
+        for name, stats in sorted(self.summary().items()):
+            logger.info(
+                f"[Jira] {name}: {stats['count']} calls, {stats['errors']} errors, "
+                f"mean {stats['mean'] * 1000:.0f}ms, max {stats['max'] * 1000:.0f}ms"
+            )
 
 
 class JiraClientREST:
@@ -18,37 +85,76 @@ class JiraClientREST:
         self.session = requests.Session()
         self.session.auth = self.auth
         self.session.headers.update(self.headers)
+        # one pooled keep-alive connection per concurrent caller
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.JIRA_POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self.timeout = 30  # seconds
+        self.max_retries = settings.JIRA_MAX_RETRIES
+        self.backoff_factor = settings.JIRA_BACKOFF_FACTOR
+        self.page_size = settings.JIRA_PAGE_SIZE
+        self.latency = LatencyStats()
 
         logger.info("Initializing JIRA REST client")
         logger.info(f"Base URL: {self.base_url}")
         logger.info(f"Logged in as {settings.JIRA_USERNAME}")
 
-    def _request(self, method, endpoint, max_retries=3, backoff_factor=1, **kwargs):
+    def _request(
+        self, method, endpoint, max_retries=None, backoff_factor=None, **kwargs
+    ):
+        max_retries = self.max_retries if max_retries is None else max_retries
+        if backoff_factor is None:
+            backoff_factor = self.backoff_factor
         url = f"{self.base_url}{endpoint}"
+        name = endpoint_name(method, endpoint)
         logger.debug(f"Request URL: {url}")
         if "json" in kwargs:
             logger.debug(
                 f"Request JSON payload: {json.dumps(kwargs['json'], indent=2)}"
             )
-        try:
-            response = requests.request(
-                method,
-                url,
-                auth=self.auth,
-                headers=self.headers,
-                timeout=30,
-                **kwargs,
-            )
+
+        for attempt in range(max_retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.request(
+                    method, url, timeout=self.timeout, **kwargs
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.latency.record(name, time.perf_counter() - start, error=True)
+                if attempt < max_retries and should_retry(method, None):
+                    delay = retry_delay(attempt, backoff_factor)
+                    logger.warning(f"{name} failed ({e}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+                logger.error(f"Request failed: {e}")
+                raise
+
+            failed = response.status_code >= 400
+            self.latency.record(name, time.perf_counter() - start, error=failed)
             logger.debug(f"Response code: {response.status_code}")
             logger.debug(f"Response body: {response.text}")
-            response.raise_for_status()
+            if (
+                failed
+                and attempt < max_retries
+                and should_retry(method, response.status_code)
+            ):
+                delay = retry_delay(
+                    attempt, backoff_factor, response.headers.get("Retry-After")
+                )
+                logger.warning(
+                    f"{name} returned {response.status_code}, retrying in {delay:.1f}s"
+                )
+                time.sleep(delay)
+                continue
+
+            try:
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Request failed: {e}")
+                raise
             if response.text:
                 return response.json()
             return None
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request failed: {e}")
-            raise
 
     def create_ticket(
         self,
@@ -56,6 +162,7 @@ class JiraClientREST:
         description: str,
         project_key: Optional[str] = None,
         issue_type: str = "Task",
+        labels: Optional[List[str]] = None,
     ) -> Optional[str]:
         project_key = project_key or self.project_key
         payload = {
@@ -66,6 +173,8 @@ class JiraClientREST:
                 "issuetype": {"name": issue_type},
             }
         }
+        if labels:
+            payload["fields"]["labels"] = labels
         logger.info(
             f"Creating issue in project '{project_key}' with summary '{summary}'"
         )
@@ -76,6 +185,63 @@ class JiraClientREST:
         logger.error(f"Failed to create issue. Response: {response}")
         return None
 
+    def create_tickets_bulk(
+        self, tickets: List[dict], issue_type: str = "Task"
+    ) -> List[Tuple[Optional[str], Optional[str]]]:
+        """creates up to 50 issues with one /issue/bulk request. `tickets` are
+        dicts with summary, description and optional labels. returns one
+        (issue key, error) pair per ticket, in order; exactly one is set."""
+        payload = {
+            "issueUpdates": [
+                {
+                    "fields": {
+                        "project": {"key": self.project_key},
+                        "summary": ticket["summary"],
+                        "description": ticket["description"],
+                        "issuetype": {"name": issue_type},
+                        **(
+                            {"labels": ticket["labels"]} if ticket.get("labels") else {}
+                        ),
+                    }
+                }
+                for ticket in tickets
+            ]
+        }
+        logger.info(f"Bulk creating {len(tickets)} issues in '{self.project_key}'")
+        try:
+            response = self._request("POST", "/rest/api/2/issue/bulk", json=payload)
+        except requests.HTTPError as e:
+            # every item failed, the body still lists the per-item errors
+            try:
+                response = e.response.json()
+            except ValueError:
+                return [(None, str(e))] * len(tickets)
+
+        errors = {}
+        for error in (response or {}).get("errors", []):
+            element_errors = error.get("elementErrors", {})
+            message = "; ".join(
+                element_errors.get("errorMessages", [])
+                + [f"{k}: {v}" for k, v in element_errors.get("errors", {}).items()]
+            )
+            errors[error.get("failedElementNumber")] = message or str(error)
+
+        # created issues are returned in input order, skipping failed items
+        created = iter((response or {}).get("issues", []))
+        results = []
+        for i in range(len(tickets)):
+            if i in errors:
+                results.append((None, errors[i]))
+            else:
+                issue = next(created, None)
+                results.append(
+                    (issue["key"], None) if issue else (None, "missing from response")
+                )
+        logger.info(
+            f"Bulk create: {len(tickets) - len(errors)} created, {len(errors)} failed"
+        )
+        return results
+
     def get_ticket(self, ticket_id: str) -> Optional[dict]:
         logger.info(f"Fetching ticket {ticket_id}")
         response = self._request("GET", f"/rest/api/2/issue/{ticket_id}")
@@ -85,17 +251,48 @@ class JiraClientREST:
             logger.error(f"Failed to fetch ticket {ticket_id}")
         return response
 
-    def get_open_tickets(self, label: Optional[str] = None, max_results: int = 50):
+    def iter_open_tickets(
+        self,
+        label: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        exclude_labels: Optional[List[str]] = None,
+    ) -> Iterator[dict]:
+        """yields the project's open tickets. tickets carrying any of
+        `exclude_labels` are left out; callers add such a label while
+        iterating (e.g. AI_TRIAGED), so the search is then read as a
+        consuming one."""
         jql = f"project = {self.project_key} AND statusCategory != Done"
         if label:
             jql += f" AND labels = {label}"
-        params = {"jql": jql, "maxResults": max_results}
-        data = self._request("GET", "/rest/api/2/search", params=params)
-        return data.get("issues", []) if data else []
+        if exclude_labels:
+            jql += f" AND labels not in ({', '.join(exclude_labels)})"
+        return self.iter_search(jql, fields=fields, consuming=bool(exclude_labels))
+
+    def get_open_tickets(
+        self,
+        label: Optional[str] = None,
+        max_results: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+        exclude_labels: Optional[List[str]] = None,
+    ) -> List[dict]:
+        tickets = self.iter_open_tickets(label, fields, exclude_labels)
+        return list(islice(tickets, max_results))
 
-    def update_ticket(self, ticket_id: str, fields: dict) -> bool:
-        logger.info(f"Updating ticket {ticket_id} with fields: {fields}")
-        payload = {"fields": fields}
+    def update_ticket(
+        self,
+        ticket_id: str,
+        fields: Optional[dict] = None,
+        add_labels: Optional[List[str]] = None,
+        comment: Optional[str] = None,
+    ) -> bool:
+        """edits the ticket in a single PUT: `fields` are set, `add_labels`
+        are added to the current labels and `comment` is posted, the last two
+        through the edit API's update verbs."""
+        logger.info(
+            f"Updating ticket {ticket_id} with fields: {fields}, "
+            f"labels: {add_labels}, comment: {bool(comment)}"
+        )
+        payload = edit_payload(fields, add_labels, comment)
         response = self._request("PUT", f"/rest/api/2/issue/{ticket_id}", json=payload)
         if response is None:  # PUT returns empty on success
             logger.info(f"Ticket {ticket_id} updated successfully")
@@ -121,15 +318,42 @@ class JiraClientREST:
         logger.error(f"Failed to create approval task. Response: {response}")
         return None
 
-    def search_tickets(self, jql: str, max_results: int = 100) -> List[dict]:
+    def iter_search(
+        self,
+        jql: str,
+        fields: Optional[List[str]] = None,
+        prefetch: bool = True,
+        consuming: bool = False,
+    ) -> Iterator[dict]:
+        """yields every issue matching the JQL, following startAt/total
+        pagination one page at a time. `fields` limits the issue payload to
+        the given fields. see awr.pagination.paginate for `prefetch` and
+        `consuming`."""
         logger.info(f"Searching tickets with JQL: {jql}")
-        params = {"jql": jql, "maxResults": max_results}
-        response = self._request("GET", "/rest/api/2/search", params=params)
-        if response and "issues" in response:
-            logger.info(f"Found {len(response['issues'])} issues")
-            return response["issues"]
-        logger.error(f"JQL search failed. Response: {response}")
-        return []
+        params = {"jql": jql, "maxResults": self.page_size}
+        if fields:
+            params["fields"] = ",".join(fields)
+
+        def fetch_page(start_at):
+            response = self._request(
+                "GET", "/rest/api/2/search", params={**params, "startAt": start_at}
+            )
+            if not response or "issues" not in response:
+                logger.error(f"JQL search failed. Response: {response}")
+                return [], 0
+            return response["issues"], response.get("total", 0)
+
+        return paginate(fetch_page, prefetch=prefetch, consuming=consuming)
+
+    def search_tickets(
+        self,
+        jql: str,
+        max_results: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[dict]:
+        issues = list(islice(self.iter_search(jql, fields=fields), max_results))
+        logger.info(f"Found {len(issues)} issues")
+        return issues
 
     def add_comment(self, ticket_id: str, comment: str) -> bool:
         logger.info(f"Adding comment to ticket {ticket_id}")
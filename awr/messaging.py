@@ -1,30 +1,131 @@
+import queue
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from config.settings import Settings
 from awr.logger import logger
+from utils.retry import retry_delay, smtp_is_permanent
 from typing import List, Optional, Union
 import ssl
 
+# refused by the server for one message: dropped if the reply code is
+# permanent (5xx), retried with backoff if it is transient (4xx)
+REJECTED = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+)
+
 
 class EmailNotifier:
-    def __init__(self):
+    """sends email over a small pool of authenticated SMTP connections.
+
+    connections are opened on demand (at most `pool_size` at a time), reused
+    across messages and threads, closed once idle for longer than
+    `idle_timeout` seconds and replaced when they fail. server and
+    credentials default to the SMTP_* / EMAIL_* settings."""
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        use_tls: Optional[bool] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+    ):
         self.ssl_context = ssl.create_default_context()
         self.max_retries = 3
         self.timeout = 10  # seconds
+        self.backoff_factor = Settings.SMTP_BACKOFF_FACTOR
+        self.host = host or Settings.SMTP_SERVER
+        self.port = port or Settings.SMTP_PORT
+        self.use_tls = Settings.SMTP_USE_TLS if use_tls is None else use_tls
+        self.username = Settings.EMAIL_USER if username is None else username
+        self.password = Settings.EMAIL_PASSWORD if password is None else password
+        self.sender = Settings.EMAIL_USER or self.username
+        self.idle_timeout = (
+            Settings.SMTP_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        )
+        pool_size = pool_size or Settings.SMTP_POOL_SIZE
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._idle = queue.LifoQueue()  # (connection, last used)
+        self.connections_opened = 0
 
-    def send(
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """closes the idle connections"""
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._quit(server)
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls(context=self.ssl_context)
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.connections_opened += 1
+        logger.debug(f"Opened SMTP connection to {self.host}:{self.port}")
+        return server
+
+    def _acquire(self) -> smtplib.SMTP:
+        """an idle connection that has not timed out, or a new one"""
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    server, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if time.monotonic() - last_used < self.idle_timeout:
+                    return server
+                self._quit(server)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, server: smtplib.SMTP):
+        self._idle.put((server, time.monotonic()))
+        self._slots.release()
+
+    def _discard(self, server: smtplib.SMTP):
+        self._quit(server)
+        self._slots.release()
+
+    @staticmethod
+    def _quit(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def build_message(
         self,
         to: Union[str, List[str]],
         subject: str,
         body: str,
         html_body: Optional[str] = None,
         cc: Optional[List[str]] = None,
-    ) -> bool:
-
+    ) -> MIMEMultipart:
         msg = MIMEMultipart("alternative")
         msg["Subject"] = subject
-        msg["From"] = Settings.EMAIL_USER
+        msg["From"] = self.sender
         msg["To"] = to if isinstance(to, str) else ", ".join(to)
 
         if cc:
@@ -33,26 +134,100 @@ class EmailNotifier:
         msg.attach(MIMEText(body, "plain"))
         if html_body:
             msg.attach(MIMEText(html_body, "html"))
+        return msg
+
+    def send(
+        self,
+        to: Union[str, List[str]],
+        subject: str,
+        body: str,
+        html_body: Optional[str] = None,
+        cc: Optional[List[str]] = None,
+        rejected: Optional[list] = None,
+        deferred: Optional[list] = None,
+    ) -> bool:
+        msg = self.build_message(to, subject, body, html_body=html_body, cc=cc)
+        return self.deliver([msg], rejected=rejected, deferred=deferred) == 1
 
-        # Retry with simple backoff (could be improved)
-        for attempt in range(self.max_retries):
+    def send_many(self, messages: List[dict]) -> int:
+        """sends several emails, each given as the keyword arguments of
+        `send`, over one SMTP session. returns how many were accepted."""
+        return self.deliver([self.build_message(**message) for message in messages])
+
+    def deliver(
+        self,
+        messages: List[MIMEMultipart],
+        rejected: Optional[list] = None,
+        deferred: Optional[list] = None,
+    ) -> int:
+        """sends built messages over a pooled connection. a broken connection
+        is replaced and the remaining messages are resent on the new one,
+        with exponential backoff between attempts; after `max_retries`
+        connection failures the rest of the batch is given up. a message the
+        server refuses with a transient (4xx) reply is resent after a backoff
+        up to `max_retries` times, then skipped so the messages after it
+        still go out. returns how many messages the server accepted;
+        (message, error) pairs of messages refused for good are appended to
+        `rejected`, those still refused after the retries to `deferred`."""
+        pending = list(messages)
+        sent = 0
+        failures = 0  # connection failures, shared by the batch
+        refusals = {}  # transient refusals, per message
+        while pending:
+            server = None
             try:
-                with smtplib.SMTP(
-                    Settings.SMTP_SERVER, Settings.SMTP_PORT, timeout=self.timeout
-                ) as server:
-                    server.starttls(context=self.ssl_context)
-                    server.login(Settings.EMAIL_USER, Settings.EMAIL_PASSWORD)
-                    server.send_message(msg)
-                logger.info(f"Email sent to {msg['To']}")
-                return True
-
-            except smtplib.SMTPException as e:
-                logger.warning(f"Email attempt {attempt + 1} failed: {e}")
-                if attempt == self.max_retries - 1:
+                server = self._acquire()
+                while pending:
+                    msg = pending[0]
+                    try:
+                        server.send_message(msg)
+                        sent += 1
+                        logger.info(f"Email sent to {msg['To']}")
+                    except REJECTED as e:
+                        if smtp_is_permanent(e):
+                            logger.error(f"Email to {msg['To']} was rejected: {e}")
+                            if rejected is not None:
+                                rejected.append((msg, e))
+                        else:
+                            refusals[id(msg)] = refusals.get(id(msg), 0) + 1
+                            if refusals[id(msg)] < self.max_retries:
+                                raise  # 4xx, resent after the backoff below
+                            logger.error(
+                                f"Email to {msg['To']} still refused after "
+                                f"{self.max_retries} attempts: {e}"
+                            )
+                            if deferred is not None:
+                                deferred.append((msg, e))
+                    pending.pop(0)
+                self._release(server)
+
+            except REJECTED as e:
+                # the server reset the transaction, the connection is fine
+                self._release(server)
+                delay = retry_delay(refusals[id(pending[0])] - 1, self.backoff_factor)
+                logger.warning(
+                    f"Email to {pending[0]['To']} refused ({e}), "
+                    f"retrying in {delay:.1f}s"
+                )
+                time.sleep(delay)
+            except (smtplib.SMTPException, OSError) as e:
+                if server is not None:
+                    self._discard(server)
+                failures += 1
+                if failures >= self.max_retries:
                     logger.error(
-                        f"Failed to send email after {self.max_retries} attempts"
+                        f"Failed to send {len(pending)} emails after "
+                        f"{self.max_retries} attempts: {e}"
                     )
-                    return False
+                    break
+                delay = retry_delay(failures - 1, self.backoff_factor)
+                logger.warning(
+                    f"Email attempt {failures} failed ({e}), retrying in {delay:.1f}s"
+                )
+                time.sleep(delay)
             except Exception as e:
+                if server is not None:
+                    self._discard(server)
                 logger.error(f"Unexpected error in email send: {e}")
-                return False
+                break
+        return sent
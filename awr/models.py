@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Optional
 from pydantic import BaseModel
 
 
@@ -16,3 +17,10 @@ class JiraTicket(BaseModel):
     description: str
     priority: Priority
     labels: list[str] = []
+
+
+class TriageResult(BaseModel):
+    ticket_id: str
+    outcome: Optional[str] = None  # duplicate / review / new, None on failure
+    elapsed: float  # seconds spent on the chunk the ticket was triaged in
+    error: Optional[str] = None
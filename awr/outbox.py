@@ -0,0 +1,257 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Union
+from config.settings import settings
+from awr.logger import logger
+from awr.messaging import EmailNotifier
+from utils.retry import retry_delay
+
+
+class NotificationOutbox:
+    """durable email queue between the workflows and SMTP.
+
+    `enqueue` only writes a row to a local SQLite file and returns; a
+    background thread drains the queue through an EmailNotifier. a message is
+    marked sent only after the server accepted it, so delivery is at least
+    once: a crash or failed send leaves it queued for a later attempt, and
+    messages still queued when the process exits go out on the next run.
+
+    a `dedup_key` (e.g. ticket + category) suppresses repeats of the same
+    notification for as long as the row is kept (OUTBOX_RETENTION_HOURS
+    after it was sent or given up on). senders claim rows with a lease, so
+    several processes can share one outbox file."""
+
+    def __init__(
+        self,
+        notifier: Optional[EmailNotifier] = None,
+        path: Optional[Path] = None,
+    ):
+        self.notifier = notifier
+        self.path = Path(path or settings.OUTBOX_PATH)
+        self.poll_interval = settings.OUTBOX_POLL_INTERVAL
+        self.max_attempts = settings.OUTBOX_MAX_ATTEMPTS
+        self.lease = settings.OUTBOX_LEASE
+        self.backoff_factor = settings.SMTP_BACKOFF_FACTOR
+        self._db_conn = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        # opened on first use, so workflows that never notify create no file
+        if self._db_conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    dedup_key TEXT UNIQUE,
+                    payload TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    next_attempt REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    sent REAL,
+                    last_error TEXT
+                );
+                CREATE INDEX IF NOT EXISTS outbox_due ON outbox (sent, next_attempt);
+                """)
+            self._db_conn = db
+        return self._db_conn
+
+    def enqueue(
+        self,
+        to: Union[str, List[str]],
+        subject: str,
+        body: str,
+        html_body: Optional[str] = None,
+        cc: Optional[List[str]] = None,
+        dedup_key: Optional[str] = None,
+    ) -> bool:
+        """queues an email (the arguments of EmailNotifier.send) and starts
+        the sender if needed. returns False if `dedup_key` was already queued
+        or sent."""
+        payload = {"to": to, "subject": subject, "body": body}
+        if html_body:
+            payload["html_body"] = html_body
+        if cc:
+            payload["cc"] = cc
+        now = time.time()
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO outbox (dedup_key, payload, created, next_attempt) "
+                "VALUES (?, ?, ?, ?)",
+                (dedup_key, json.dumps(payload), now, now),
+            )
+        if not cursor.rowcount:
+            logger.debug(f"[Outbox] Skipping duplicate notification {dedup_key}")
+            return False
+        self.start()
+        self._wake.set()
+        return True
+
+    def _claim(self, limit: int = 50) -> list:
+        """due messages, leased to this sender for OUTBOX_LEASE seconds"""
+        now = time.time()
+        with self._lock, self._db:
+            rows = self._db.execute(
+                "SELECT id, payload, attempts FROM outbox "
+                "WHERE sent IS NULL AND attempts < ? AND next_attempt <= ? "
+                "ORDER BY id LIMIT ?",
+                (self.max_attempts, now, limit),
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE outbox SET next_attempt = ? WHERE id = ?",
+                [(now + self.lease, row_id) for row_id, _, _ in rows],
+            )
+        return rows
+
+    def drain(self) -> int:
+        """sends every message that is due, returns how many were sent. the
+        pass stops at the first message that fails for lack of a connection
+        (not refused by the server), leaving the rest for the next pass."""
+        if self.notifier is None:
+            self.notifier = EmailNotifier()
+        sent = 0
+        while rows := self._claim():
+            for i, (row_id, payload, attempts) in enumerate(rows):
+                rejected, deferred = [], []
+                ok = self.notifier.send(
+                    **json.loads(payload), rejected=rejected, deferred=deferred
+                )
+                sent += ok
+                now = time.time()
+                if ok:
+                    self._mark_sent(row_id, attempts, now)
+                elif rejected:
+                    # refused for good (5xx): failed at once, not retried
+                    self._mark_failed(
+                        row_id,
+                        max(attempts + 1, self.max_attempts),
+                        now,
+                        f"rejected: {rejected[0][1]}",
+                    )
+                else:
+                    error = f"deferred: {deferred[0][1]}" if deferred else "send failed"
+                    next_attempt = now + retry_delay(attempts, self.backoff_factor)
+                    self._mark_failed(row_id, attempts + 1, next_attempt, error)
+                    if not deferred:
+                        # SMTP unreachable: the rest waits for the next pass
+                        with self._lock, self._db:
+                            self._db.executemany(
+                                "UPDATE outbox SET next_attempt = ? WHERE id = ?",
+                                [(next_attempt, row[0]) for row in rows[i + 1 :]],
+                            )
+                        logger.warning(
+                            f"[Outbox] SMTP unavailable, {len(rows) - i - 1} claimed "
+                            f"notifications left for the next pass"
+                        )
+                        self._prune()
+                        return sent
+        self._prune()
+        return sent
+
+    def _mark_sent(self, row_id: int, attempts: int, now: float):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE outbox SET sent = ?, attempts = ? WHERE id = ?",
+                (now, attempts + 1, row_id),
+            )
+
+    def _mark_failed(self, row_id: int, attempts: int, next_attempt: float, error: str):
+        """records a failed attempt. once the message is given up on,
+        next_attempt keeps the time of that last attempt, for _prune."""
+        if attempts >= self.max_attempts:
+            next_attempt = min(next_attempt, time.time())
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE outbox SET attempts = ?, next_attempt = ?, last_error = ? "
+                "WHERE id = ?",
+                (attempts, next_attempt, error, row_id),
+            )
+
+    def _prune(self):
+        """deletes sent and given-up messages (and with them their dedup_key)
+        OUTBOX_RETENTION_HOURS after their last attempt"""
+        cutoff = time.time() - settings.OUTBOX_RETENTION_HOURS * 3600
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM outbox WHERE sent < ? "
+                "OR (sent IS NULL AND attempts >= ? AND next_attempt < ?)",
+                (cutoff, self.max_attempts, cutoff),
+            )
+
+    def metrics(self) -> dict:
+        """queue depth, age in seconds of the oldest queued message, and
+        messages given up on (rejected, or after OUTBOX_MAX_ATTEMPTS)"""
+        if self._db_conn is None and not self.path.exists():
+            return {"depth": 0, "oldest_age": 0.0, "failed": 0}
+        with self._lock:
+            depth, oldest = self._db.execute(
+                "SELECT COUNT(*), MIN(created) FROM outbox "
+                "WHERE sent IS NULL AND attempts < ?",
+                (self.max_attempts,),
+            ).fetchone()
+            failed = self._db.execute(
+                "SELECT COUNT(*) FROM outbox WHERE sent IS NULL AND attempts >= ?",
+                (self.max_attempts,),
+            ).fetchone()[0]
+        return {
+            "depth": depth,
+            "oldest_age": time.time() - oldest if oldest else 0.0,
+            "failed": failed,
+        }
+
+    def start(self):
+        """starts the background sender, if not running yet"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="notification-outbox", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.drain():
+                    m = self.metrics()
+                    logger.info(
+                        f"[Outbox] depth {m['depth']}, oldest {m['oldest_age']:.0f}s, "
+                        f"failed {m['failed']}"
+                    )
+            except Exception as e:
+                logger.error(f"[Outbox] Sender failed: {e}", exc_info=True)
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def stop(self, drain: bool = True):
+        """stops the sender, after a last pass over the queue with `drain`"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if drain:
+            self.drain()
+        if self.notifier is not None:
+            self.notifier.close()
+
+
+_default_outbox: Optional[NotificationOutbox] = None
+_default_outbox_lock = threading.Lock()
+
+
+def get_default_outbox() -> NotificationOutbox:
+    """process-wide outbox shared by the triage and escalation workflows"""
+    global _default_outbox
+    with _default_outbox_lock:
+        if _default_outbox is None:
+            _default_outbox = NotificationOutbox()
+        return _default_outbox
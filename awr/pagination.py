@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, List, Tuple
+from awr.logger import logger
+
+# fetch_page(start_at) -> (issues on that page, total matching issues)
+PageFetcher = Callable[[int], Tuple[List[Any], int]]
+
+
+def paginate(
+    fetch_page: PageFetcher,
+    prefetch: bool = True,
+    consuming: bool = False,
+    key: Callable[[Any], str] = lambda issue: issue["key"],
+) -> Iterator[Any]:
+    """lazily walks a startAt/total paginated search, one page in memory.
+
+    with `prefetch` the next page is requested while the current one is being
+    consumed.
+
+    `consuming` is for callers that make each issue drop out of the search once
+    processed (e.g. by removing the label the JQL filters on). plain offsets
+    would then skip issues, so every page is read from the start of what is
+    left, and issues that stay in the result (e.g. failed updates) are skipped
+    by key. prefetching is disabled in that mode since the next page depends
+    on the current one being processed."""
+    if consuming:
+        yield from _paginate_consuming(fetch_page, key)
+        return
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pending = pool.submit(fetch_page, 0)
+        start_at = 0
+        while pending is not None:
+            issues, total = pending.result()
+            start_at += len(issues)
+            has_more = bool(issues) and start_at < total
+            pending = None
+            if has_more and prefetch:
+                pending = pool.submit(fetch_page, start_at)
+            logger.debug(f"Fetched {start_at} of {total} issues")
+            yield from issues
+            if has_more and not prefetch:
+                pending = pool.submit(fetch_page, start_at)
+
+
+def _paginate_consuming(fetch_page: PageFetcher, key) -> Iterator[Any]:
+    seen = set()
+    start_at = 0
+    while True:
+        issues, total = fetch_page(start_at)
+        if not issues:
+            return
+        fresh = [issue for issue in issues if key(issue) not in seen]
+        if not fresh:
+            # the whole page stayed in the result after processing
+            start_at += len(issues)
+            if start_at >= total:
+                return
+            continue
+        for issue in fresh:
+            seen.add(key(issue))
+            yield issue
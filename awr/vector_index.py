@@ -0,0 +1,432 @@
+import json
+import shutil
+import sqlite3
+import threading
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional
+from config.settings import settings
+from awr.logger import logger
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class MetadataColumns:
+    """per-field numpy arrays over a list of metadata dicts, built on first
+    use, so repeated filters on a field compare integer codes instead of
+    dicts"""
+
+    def __init__(self, metadatas: List[Optional[dict]]):
+        self.metadatas = metadatas
+        self._codes: Dict[str, tuple] = {}
+        self._numbers: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.metadatas)
+
+    def codes(self, field: str):
+        """the field's values encoded as integers (-1 where it is missing)
+        and the mapping from value to code"""
+        column = self._codes.get(field)
+        if column is None:
+            lookup: Dict = {}
+            codes = np.fromiter(
+                (
+                    -1 if v is None else lookup.setdefault(v, len(lookup))
+                    for v in (m.get(field) if m else None for m in self.metadatas)
+                ),
+                dtype=np.int64,
+                count=len(self.metadatas),
+            )
+            column = self._codes[field] = (codes, lookup)
+        return column
+
+    def numbers(self, field: str) -> np.ndarray:
+        """the field's numeric values as floats, nan where it is not a number"""
+        column = self._numbers.get(field)
+        if column is None:
+            codes, lookup = self.codes(field)
+            table = np.array(
+                [
+                    (
+                        v
+                        if isinstance(v, (int, float)) and not isinstance(v, bool)
+                        else np.nan
+                    )
+                    for v in lookup
+                ]
+                + [np.nan],
+                dtype=np.float64,
+            )
+            column = self._numbers[field] = table[codes]  # -1 picks the nan
+        return column
+
+
+_RANGE_OPS = {
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+}
+
+
+def match_where(metadatas, where: Optional[dict]) -> np.ndarray:
+    """boolean mask of the metadatas (a list or MetadataColumns) matching a
+    chroma style `where` clause ($eq, $ne, $in, $nin, $gt, $gte, $lt, $lte,
+    $and, $or)"""
+    if not isinstance(metadatas, MetadataColumns):
+        metadatas = MetadataColumns(metadatas)
+    size = len(metadatas)
+    if not where:
+        return np.ones(size, dtype=bool)
+    if "$and" in where:
+        return np.logical_and.reduce([match_where(metadatas, w) for w in where["$and"]])
+    if "$or" in where:
+        return np.logical_or.reduce([match_where(metadatas, w) for w in where["$or"]])
+
+    mask = np.ones(size, dtype=bool)
+    for field, condition in where.items():
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        ((op, value),) = condition.items()
+        if op in _RANGE_OPS:
+            with np.errstate(invalid="ignore"):
+                mask &= _RANGE_OPS[op](metadatas.numbers(field), value)
+            continue
+        codes, lookup = metadatas.codes(field)
+        if op in ("$in", "$nin"):
+            found = np.isin(codes, [lookup[v] for v in value if v in lookup])
+        else:
+            found = codes == lookup.get(value, -2)
+        mask &= ~found if op in ("$ne", "$nin") else found
+    return mask
+
+
+class LocalCollection:
+    """in-process vector collection with the subset of chroma's Collection
+    API that ChromaDB uses (upsert, update, delete, query, count).
+
+    embeddings are L2-normalized and kept in a memory-mapped float32 matrix;
+    ids, metadata and documents live in SQLite next to it. queries are one
+    BLAS matrix product over the matching rows followed by a partial sort.
+    distances are squared L2 between normalized vectors (2 - 2 cos), the
+    same values chroma's default space gives for normalized embeddings.
+
+    with `nlist` > 0 the rows are also clustered into an IVF index (k-means
+    centroids) and a query only scans the `nprobe` closest clusters, which
+    trades some recall for speed on large collections."""
+
+    def __init__(
+        self,
+        path: Path,
+        embedding_function=None,
+        nlist: Optional[int] = None,
+        nprobe: Optional[int] = None,
+    ):
+        self.path = Path(path)
+        self.embedding_function = embedding_function
+        self.nlist = settings.VECTOR_INDEX_NLIST if nlist is None else nlist
+        self.nprobe = nprobe or settings.VECTOR_INDEX_NPROBE
+        self._lock = threading.RLock()
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path / "items.sqlite", check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS items (
+                row INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                metadata TEXT,
+                document TEXT
+            )
+            """)
+        self._rows: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._metadatas: List[Optional[dict]] = []
+        for row, item_id, metadata in self._db.execute(
+            "SELECT row, id, metadata FROM items ORDER BY row"
+        ):
+            self._place(row, item_id, json.loads(metadata) if metadata else None)
+        self._vectors = None
+        self._centroids = None
+        self._assignments = None
+        self._trained_size = 0
+        self._live_rows = None
+        self._columns = None
+        layout_path = self.path / "layout.json"
+        if layout_path.exists():
+            layout = json.loads(layout_path.read_text(encoding="utf-8"))
+            self._vectors = np.memmap(
+                self.path / "vectors.f32",
+                np.float32,
+                "r+",
+                shape=(layout["capacity"], layout["dimensions"]),
+            )
+
+    def _place(self, row: int, item_id: str, metadata: Optional[dict]):
+        while len(self._ids) <= row:
+            self._ids.append(None)
+            self._metadatas.append(None)
+        self._ids[row] = item_id
+        self._metadatas[row] = metadata
+        self._rows[item_id] = row
+        self._live_rows = None
+        self._columns = None
+
+    def _reserve(self, rows: int, dimensions: int):
+        """grows the vector file (doubling) to hold at least `rows` rows"""
+        if self._vectors is not None:
+            capacity, current = self._vectors.shape
+            if dimensions != current:
+                raise ValueError(
+                    f"Embedding has {dimensions} dimensions, collection has {current}"
+                )
+            if rows <= capacity:
+                return
+        else:
+            capacity = 0
+        capacity = max(1024, capacity * 2, rows)
+        vectors_path = self.path / "vectors.f32"
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(vectors_path, "ab") as f:
+            f.truncate(capacity * dimensions * 4)
+        self._vectors = np.memmap(
+            vectors_path, np.float32, "r+", shape=(capacity, dimensions)
+        )
+        with open(self.path / "layout.json", "w", encoding="utf-8") as f:
+            json.dump({"dimensions": dimensions, "capacity": capacity}, f)
+
+    def count(self) -> int:
+        return len(self._rows)
+
+    def upsert(self, ids, embeddings=None, metadatas=None, documents=None):
+        if embeddings is None:
+            embeddings = self.embedding_function(documents)
+        vectors = normalize_rows(embeddings)
+        metadatas = metadatas or [None] * len(ids)
+        documents = documents or [None] * len(ids)
+        if len(set(ids)) < len(ids):
+            # an id repeated within the call: the last occurrence wins
+            keep = sorted({item_id: i for i, item_id in enumerate(ids)}.values())
+            ids = [ids[i] for i in keep]
+            vectors = vectors[keep]
+            metadatas = [metadatas[i] for i in keep]
+            documents = [documents[i] for i in keep]
+        with self._lock:
+            free = iter(
+                [row for row, item_id in enumerate(self._ids) if item_id is None]
+            )
+            rows = []
+            for item_id in ids:
+                row = self._rows.get(item_id)
+                if row is None:
+                    row = next(free, None)
+                    if row is None:
+                        row = len(self._ids)
+                        self._ids.append(None)
+                        self._metadatas.append(None)
+                rows.append(row)
+            self._reserve(len(self._ids), vectors.shape[1])
+            self._vectors[rows] = vectors
+            self._vectors.flush()
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO items (row, id, metadata, document) "
+                    "VALUES (?, ?, ?, ?)",
+                    [
+                        (row, item_id, json.dumps(metadata), document)
+                        for row, item_id, metadata, document in zip(
+                            rows, ids, metadatas, documents
+                        )
+                    ],
+                )
+            for row, item_id, metadata in zip(rows, ids, metadatas):
+                self._place(row, item_id, metadata)
+            self._assign(rows)
+
+    def update(self, ids, metadatas):
+        with self._lock, self._db:
+            for item_id, metadata in zip(ids, metadatas):
+                row = self._rows.get(item_id)
+                if row is None:
+                    continue
+                self._metadatas[row] = metadata
+                self._columns = None
+                self._db.execute(
+                    "UPDATE items SET metadata = ? WHERE row = ?",
+                    (json.dumps(metadata), row),
+                )
+
+    def delete(self, ids=None, where=None):
+        with self._lock:
+            if where is not None:
+                mask = match_where(self._metadata_columns(), where)
+                rows = [
+                    row for row in np.flatnonzero(mask) if self._ids[row] is not None
+                ]
+            else:
+                rows = [self._rows[i] for i in ids or [] if i in self._rows]
+            with self._db:
+                self._db.executemany(
+                    "DELETE FROM items WHERE row = ?", [(int(row),) for row in rows]
+                )
+            for row in rows:
+                del self._rows[self._ids[row]]
+                self._ids[row] = None
+                self._metadatas[row] = None
+            self._live_rows = None
+            self._columns = None
+
+    def train(self):
+        """clusters the rows into `nlist` IVF lists (k-means on a sample)"""
+        with self._lock:
+            rows = np.flatnonzero(self._live())
+            if self.nlist <= 0 or len(rows) < self.nlist:
+                self._centroids = None
+                return
+            rng = np.random.default_rng(0)
+            sample = self._vectors[
+                np.sort(rng.choice(rows, min(len(rows), self.nlist * 64), False))
+            ]
+            centroids = sample[rng.choice(len(sample), self.nlist, replace=False)]
+            for _ in range(10):
+                labels = (sample @ centroids.T).argmax(axis=1)
+                for c in range(self.nlist):
+                    members = sample[labels == c]
+                    if len(members):
+                        centroids[c] = members.mean(axis=0)
+                centroids = normalize_rows(centroids)
+            self._centroids = centroids
+            self._assignments = np.full(len(self._ids), -1, dtype=np.intp)
+            self._trained_size = len(rows)
+            self._assign(rows)
+            logger.info(f"Trained IVF index: {self.nlist} lists over {len(rows)} rows")
+
+    def _assign(self, rows):
+        if self._centroids is None:
+            return
+        if len(self._assignments) < len(self._ids):
+            grown = np.full(len(self._ids), -1, dtype=np.intp)
+            grown[: len(self._assignments)] = self._assignments
+            self._assignments = grown
+        rows = np.asarray(rows, dtype=np.intp)
+        if len(rows):
+            self._assignments[rows] = (self._vectors[rows] @ self._centroids.T).argmax(
+                axis=1
+            )
+
+    def _live(self) -> np.ndarray:
+        """mask of the rows holding an item, cached until the next write"""
+        if self._live_rows is None:
+            self._live_rows = np.fromiter(
+                (i is not None for i in self._ids), dtype=bool, count=len(self._ids)
+            )
+        return self._live_rows
+
+    def _metadata_columns(self) -> MetadataColumns:
+        """filter columns over the metadata, cached until the next write"""
+        if self._columns is None:
+            self._columns = MetadataColumns(self._metadatas)
+        return self._columns
+
+    def _needs_training(self) -> bool:
+        """IVF training is deferred until there are rows for all `nlist`
+        lists (queries are exact until then) and redone once the collection
+        has doubled since the last training"""
+        count = self.count()
+        if self.nlist <= 0 or count < self.nlist:
+            return False
+        return self._centroids is None or count > 2 * self._trained_size
+
+    def _search(self, queries: np.ndarray, mask: np.ndarray, k: int):
+        """yields (rows, scores) of the k best rows in `mask` for each query.
+        exact search scores every row through a view of the matrix, IVF only
+        the rows in the nprobe closest lists."""
+        if self._needs_training():
+            self.train()
+        k = min(k, int(mask.sum()))
+        if not k:
+            for _ in queries:
+                yield np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+            return
+        for chunk in range(0, len(queries), 256):
+            block = queries[chunk : chunk + 256]
+            if self._centroids is None:
+                scores = block @ self._vectors[: len(mask)].T
+                scores[:, ~mask] = -np.inf
+                rows = [None] * len(block)
+            else:
+                probes = np.argsort(-(block @ self._centroids.T), axis=1)
+                rows = [
+                    np.flatnonzero(mask & np.isin(self._assignments, p[: self.nprobe]))
+                    for p in probes
+                ]
+                scores = [self._vectors[r] @ q for r, q in zip(rows, block)]
+            for candidates, row_scores in zip(rows, scores):
+                n = min(k, len(row_scores))
+                top = np.argpartition(-row_scores, n - 1)[:n] if n else []
+                top = np.asarray(top, dtype=np.intp)
+                top = top[np.argsort(-row_scores[top])]
+                yield (top if candidates is None else candidates[top]), row_scores[top]
+
+    def query(
+        self,
+        query_embeddings,
+        n_results: int = 10,
+        where=None,
+        include=("metadatas", "documents", "distances"),
+    ) -> dict:
+        queries = normalize_rows(query_embeddings)
+        results = {"ids": [], "distances": [], "metadatas": [], "documents": []}
+        with self._lock:
+            mask = self._live()
+            if where:
+                mask = mask & match_where(self._metadata_columns(), where)
+            for hits, scores in self._search(queries, mask, n_results):
+                results["ids"].append([self._ids[row] for row in hits])
+                results["distances"].append((2 - 2 * scores).tolist())
+                results["metadatas"].append([self._metadatas[row] for row in hits])
+                if "documents" in include:
+                    results["documents"].append(self._documents(hits))
+        return results
+
+    def _documents(self, rows) -> List[Optional[str]]:
+        documents = dict(
+            self._db.execute(
+                f"SELECT row, document FROM items WHERE row IN ({','.join('?' * len(rows))})",
+                [int(row) for row in rows],
+            ).fetchall()
+        )
+        return [documents.get(int(row)) for row in rows]
+
+
+class LocalVectorClient:
+    """stands in for chromadb.PersistentClient with LocalCollection
+    collections, one directory per collection under `path`"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._collections: Dict[str, LocalCollection] = {}
+
+    def get_or_create_collection(self, name: str, embedding_function=None):
+        if name not in self._collections:
+            self._collections[name] = LocalCollection(
+                self.path / name, embedding_function=embedding_function
+            )
+        return self._collections[name]
+
+    def delete_collection(self, name: str):
+        collection = self._collections.pop(name, None)
+        if collection is not None:
+            collection._db.close()
+        if not (self.path / name).exists():
+            raise ValueError(f"Collection {name} does not exist")
+        shutil.rmtree(self.path / name)
+
+    def get_max_batch_size(self) -> int:
+        return settings.CHROMA_INGEST_BATCH
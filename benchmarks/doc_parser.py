@@ -0,0 +1,156 @@
+"""micro-benchmark of DocumentParser.extract_structured_sections.
+
+builds a large synthetic AWR (every target section plus many unrelated
+chapters) and times the parser against the previous implementation, kept
+below as `reference_extract`. both the parse of an already loaded document
+and the full call including python-docx loading are reported.
+
+    python -m benchmarks.doc_parser [--chapters 20] [--repeat 3]
+"""
+
+import argparse
+import re
+import tempfile
+import time
+from pathlib import Path
+from docx import Document
+from utils import doc_parser
+from utils.doc_parser import DocumentParser
+
+TARGETS = {
+    "Customer Requirements Details": {
+        "Functional Requirements": None,
+        "Technical Requirements": None,
+        "Required Delivery Date": None,
+    },
+    "CHAMP Proposed Solution": {
+        "Business Solution": None,
+        "Technical Solution": None,
+        "Limitations": None,
+    },
+    "Timescales and Notifications": {"Delivery Date": None, "Notifications": None},
+    "Pricing and Payment Terms": {
+        "Price": {"One-Time Charges": None, "Annual Maintenance Charges": None},
+        "Payment Terms": {
+            "One-Time Charges": None,
+            "Annual Maintenance Charges": None,
+        },
+    },
+}
+
+
+def build_document(path: Path, chapters: int, paragraphs: int = 12):
+    """target chapters in the middle, unrelated chapters around them"""
+    doc = Document()
+
+    def add_tree(tree, level):
+        for heading, children in tree.items():
+            doc.add_heading(heading, level=level)
+            for i in range(paragraphs):
+                doc.add_paragraph(f"{heading} paragraph {i} " + "lorem ipsum " * 10)
+            if children:
+                add_tree(children, level + 1)
+
+    def add_filler(prefix, count):
+        for c in range(count):
+            add_tree(
+                {
+                    f"{prefix} {c}": {
+                        f"{prefix} {c}.{s}": {
+                            f"{prefix} {c}.{s}.{t}": None for t in range(3)
+                        }
+                        for s in range(4)
+                    }
+                },
+                1,
+            )
+
+    add_filler("Background", chapters // 2)
+    add_tree(TARGETS, 1)
+    add_filler("Appendix", chapters - chapters // 2)
+    doc.save(path)
+
+
+def reference_extract(parser: DocumentParser, file_path: str) -> dict:
+    """extract_structured_sections before the fast path"""
+    doc = doc_parser.Document(file_path)
+    result = parser.nested_dict()
+    current_path = []
+    section_buffer = []
+
+    def flush_buffer():
+        if not current_path:
+            return
+        norm_path = tuple(re.sub(r"\s+", " ", p.strip().lower()) for p in current_path)
+        if norm_path in parser.target_paths:
+            parser.set_nested(result, current_path, "\n".join(section_buffer).strip())
+
+    for para in doc.paragraphs:
+        text = para.text.strip()
+        if not text:
+            continue
+        style = para.style.name if para.style else ""
+        if style.lower().startswith("heading"):
+            flush_buffer()
+            section_buffer = []
+            match = re.search(r"\d+", style)
+            if match:
+                level = int(match.group())
+                current_path = current_path[: level - 1]
+            else:
+                current_path = []
+            current_path.append(text)
+        else:
+            section_buffer.append(text)
+    flush_buffer()
+    return result
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args.add_argument("--chapters", type=int, default=20)
+    args.add_argument("--repeat", type=int, default=3)
+    args = args.parse_args()
+
+    parser = DocumentParser()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "synthetic_awr.docx")
+        build_document(path, args.chapters)
+        loaded = Document(path)
+        print(f"{len(loaded.paragraphs)} paragraphs, {args.repeat} runs, best of")
+
+        expected = parser.dict_to_json(reference_extract(parser, path))
+        actual = parser.dict_to_json(parser.extract_structured_sections(path))
+        assert actual == expected, "fast path output differs from reference"
+
+        for label, load in [
+            ("load + parse", Document),
+            ("parse only", lambda _: loaded),
+        ]:
+            doc_parser.Document = load
+            try:
+                reference = best_of(
+                    lambda: reference_extract(parser, path), args.repeat
+                )
+                fast = best_of(
+                    lambda: parser.extract_structured_sections(path), args.repeat
+                )
+            finally:
+                doc_parser.Document = Document
+            print(
+                f"{label:>13}: reference {reference * 1000:8.1f} ms, "
+                f"current {fast * 1000:8.1f} ms, {reference / fast:5.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
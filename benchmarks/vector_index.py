@@ -0,0 +1,98 @@
+"""latency and recall of the vector backends behind ChromaDB.
+
+indexes a synthetic set of clustered, normalized embeddings in chroma
+(HNSW), in the local index with exact search and in the local index with
+IVF, then times single queries (as TriageWorkflow.process sends them) and
+one batched query, and reports recall@k against brute-force ground truth.
+
+    python -m benchmarks.vector_index [--size 20000] [--dimensions 1536]
+"""
+
+import argparse
+import tempfile
+import time
+import chromadb
+import numpy as np
+from pathlib import Path
+from awr.vector_index import LocalCollection, normalize_rows
+from utils.xml_reader import batched
+
+
+def synthetic(size: int, dimensions: int, queries: int, clusters: int = 200):
+    """embeddings grouped around topic centers, like tickets about the same
+    products and requirements, and query embeddings of new tickets drawn
+    from the same topics"""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(clusters, dimensions))
+
+    def sample(n):
+        labels = rng.integers(0, clusters, n)
+        return normalize_rows(centers[labels] + 0.6 * rng.normal(size=(n, dimensions)))
+
+    return sample(size), sample(queries)
+
+
+def recall(truth, found) -> float:
+    return float(np.mean([len(set(t) & set(f)) / len(t) for t, f in zip(truth, found)]))
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args.add_argument("--size", type=int, default=20000)
+    args.add_argument("--dimensions", type=int, default=1536)
+    args.add_argument("--queries", type=int, default=200)
+    args.add_argument("-k", type=int, default=3)
+    args.add_argument("--nlist", type=int, default=128)
+    args.add_argument("--nprobe", type=int, default=8)
+    args = args.parse_args()
+
+    data, queries = synthetic(args.size, args.dimensions, args.queries)
+    truth = np.argsort(-(queries @ data.T), axis=1)[:, : args.k]
+    truth = [[str(i) for i in row] for row in truth]
+    ids = [str(i) for i in range(args.size)]
+    print(
+        f"{args.size} x {args.dimensions} embeddings, {args.queries} queries, "
+        f"top {args.k}"
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        client = chromadb.PersistentClient(path=str(Path(tmp) / "chroma"))
+        backends = {
+            "chroma (hnsw)": client.get_or_create_collection(
+                "bench", embedding_function=None
+            ),
+            "local exact": LocalCollection(Path(tmp) / "exact", nlist=0),
+            f"local ivf {args.nlist}/{args.nprobe}": LocalCollection(
+                Path(tmp) / "ivf", nlist=args.nlist, nprobe=args.nprobe
+            ),
+        }
+        for name, collection in backends.items():
+            start = time.perf_counter()
+            for batch in batched(range(args.size), 5000):
+                collection.upsert(
+                    ids=[ids[i] for i in batch],
+                    embeddings=data[batch[0] : batch[-1] + 1],
+                )
+            collection.query(queries[:1], n_results=args.k)  # trains IVF
+            build = time.perf_counter() - start
+
+            start = time.perf_counter()
+            found = [
+                collection.query(q[None, :], n_results=args.k)["ids"][0]
+                for q in queries
+            ]
+            single = (time.perf_counter() - start) / args.queries
+
+            start = time.perf_counter()
+            collection.query(queries, n_results=args.k)
+            batch = time.perf_counter() - start
+
+            print(
+                f"{name:>18}: build {build:6.1f} s, query {single * 1000:6.2f} ms, "
+                f"batch of {args.queries} {batch * 1000:7.1f} ms, "
+                f"recall@{args.k} {recall(truth, found):.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
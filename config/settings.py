@@ -10,6 +10,12 @@ class Settings:
     JIRA_USERNAME = os.getenv("JIRA_USERNAME")
     JIRA_API_TOKEN = os.getenv("JIRA_API_TOKEN")
     JIRA_PROJECT_KEY = os.getenv("JIRA_PROJECT_KEY")
+    JIRA_PAGE_SIZE = int(os.getenv("JIRA_PAGE_SIZE", 100))  # issues per search page
+    JIRA_POOL_SIZE = int(os.getenv("JIRA_POOL_SIZE", 20))  # keep-alive connections
+    JIRA_MAX_RETRIES = int(os.getenv("JIRA_MAX_RETRIES", 3))
+    JIRA_BACKOFF_FACTOR = float(os.getenv("JIRA_BACKOFF_FACTOR", 1))
+    JIRA_ASYNC_CONCURRENCY = int(os.getenv("JIRA_ASYNC_CONCURRENCY", 50))
+    JIRA_BULK_SIZE = int(os.getenv("JIRA_BULK_SIZE", 50))  # Jira caps bulk create at 50
 
     OPENAI_KEY = os.getenv("OPENAI_API_KEY")
 
@@ -19,14 +25,61 @@ class Settings:
     AZURE_OPENAI_VERSION = os.getenv("AZURE_OPENAI_VERSION")
     AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
 
+    # request packing for EmbeddingGenerator.generate_batch
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 256))
+    EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", 100000))
+    EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", 4))
+
+    # on-disk embedding cache, 0 disables it
+    EMBEDDING_CACHE_PATH = Path(
+        os.getenv("EMBEDDING_CACHE_DIR", "./data/embedding_cache")
+    ).absolute()
+    EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", 512))
+
     CHROMA_PATH = Path(os.getenv("CHROMA_PERSIST_DIR", "./data/chroma_db")).absolute()
+    CHROMA_INGEST_BATCH = int(os.getenv("CHROMA_INGEST_BATCH", 256))  # per upsert
+    # section hits fetched per requested document in ChromaDB.query_sections
+    CHROMA_SECTION_FANOUT = int(os.getenv("CHROMA_SECTION_FANOUT", 5))
+
+    # "chroma" (default), or "local" for the in-process index in
+    # awr/vector_index.py; exact local search scans every row per query, so
+    # chroma's HNSW stays the default for single ticket lookups
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+    VECTOR_INDEX_PATH = Path(
+        os.getenv("VECTOR_INDEX_DIR", str(CHROMA_PATH / "local"))
+    ).absolute()
+    VECTOR_INDEX_NLIST = int(os.getenv("VECTOR_INDEX_NLIST", 0))  # IVF lists, 0 = exact
+    VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", 8))  # lists per query
 
     SMTP_SERVER = os.getenv("SMTP_SERVER")
     SMTP_PORT = int(os.getenv("SMTP_PORT", 587))  # Default fallback: TLS port
+    SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"  # STARTTLS
+    SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 2))  # open connections at most
+    SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", 60))  # seconds
+    SMTP_BACKOFF_FACTOR = float(os.getenv("SMTP_BACKOFF_FACTOR", 1))
     EMAIL_USER = os.getenv("EMAIL_USER")
     EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
 
+    # notification outbox drained by a background sender
+    OUTBOX_PATH = Path(os.getenv("OUTBOX_PATH", "./data/outbox.sqlite")).absolute()
+    OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", 5))  # seconds
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 10))
+    OUTBOX_LEASE = float(os.getenv("OUTBOX_LEASE", 300))  # seconds a claim is held
+    OUTBOX_RETENTION_HOURS = int(os.getenv("OUTBOX_RETENTION_HOURS", 24))  # dedup
+
+    # one summary email per batch / escalation run instead of one per ticket
+    NOTIFICATION_DIGEST = os.getenv("NOTIFICATION_DIGEST", "false").lower() == "true"
+
     ESCALATION_HOURS = int(os.getenv("ESCALATION_HOURS", 24))
+
+    # batch triage worker pool
+    TRIAGE_WORKERS = int(os.getenv("TRIAGE_WORKERS", 8))
+    TRIAGE_QUEUE_SIZE = int(os.getenv("TRIAGE_QUEUE_SIZE", 100))
+    TRIAGE_CHUNK_SIZE = int(os.getenv("TRIAGE_CHUNK_SIZE", 16))  # tickets per batch
+    # duplicate search: nearest candidates fetched per ticket, and whether
+    # to only compare against AWRs of the ticket's own Jira project
+    TRIAGE_CANDIDATES = int(os.getenv("TRIAGE_CANDIDATES", 3))
+    TRIAGE_SCOPE_PROJECT = os.getenv("TRIAGE_SCOPE_PROJECT", "false").lower() == "true"
     XML_SOURCE = os.getenv("XML_SOURCE")
 
     @classmethod
@@ -1,5 +1,6 @@
+import numpy as np
 from types import MappingProxyType
-from typing import Dict
+from typing import Dict, Iterable, Tuple
 from awr.models import Priority
 
 
@@ -22,3 +23,16 @@ class Thresholds:
         """Get similarity thresholds for the given ticket priority.
         default is MEDIUM if priority is not recognized."""
         return cls._VALUES.get(priority, cls._VALUES[Priority.MEDIUM])
+
+    @classmethod
+    def arrays(cls, priorities: Iterable) -> Tuple[np.ndarray, np.ndarray]:
+        """duplicate and review thresholds for many tickets at once, as two
+        float arrays aligned with `priorities` (Priority members or their
+        names; unrecognized ones get MEDIUM's)."""
+        table = np.array([[v["duplicate"], v["review"]] for v in cls._VALUES.values()])
+        rows = {priority: i for i, priority in enumerate(cls._VALUES)}
+        # Priority is a str enum, so plain names hit the same rows
+        index = np.fromiter(
+            (rows.get(p, rows[Priority.MEDIUM]) for p in priorities), dtype=np.intp
+        )
+        return table[index, 0], table[index, 1]
@@ -1,9 +1,15 @@
 import argparse
+from contextlib import nullcontext
+from typing import Iterator
 from awr.jira import JiraClient
 from awr.chroma import ChromaDB
-from workflow.triage import TriageWorkflow
+from workflow.triage import TRIAGED_LABEL, TriageWorkflow
+from workflow.batch import BatchTriageRunner
+from workflow.bulk_load import BulkLoader
 from awr.messaging import EmailNotifier
+from awr.digest import digest_window
 from xml.etree import ElementTree as ET
+from utils.xml_reader import iter_record_elements
 from config.settings import settings
 from awr.logger import logger
 
@@ -36,47 +42,47 @@ def build_description(awr: ET.Element) -> str:
     """
 
 
-def parse_awr_xml(xml_path: str) -> list[dict]:
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-    tickets = []
+def parse_awr_xml(xml_path: str) -> Iterator[dict]:
+    """yields the AWRData records of the file one at a time while parsing it"""
+    for awr in iter_record_elements(xml_path, record_tags=("AWRData",)):
+        yield {
+            "id": awr.findtext("ID"),
+            "summary": awr.findtext("JIRA_AWR_Title"),
+            "description": build_description(awr),
+        }
 
-    for awr in root.findall("AWRData"):
-        tickets.append(
-            {
-                "summary": awr.findtext("JIRA_AWR_Title"),
-                "description": build_description(awr),
-            }
-        )
-    return tickets
 
-
-def load_dummy_data_to_jira(xml_path: str):
+def load_dummy_data_to_jira(xml_path: str, checkpoint_path: str = None):
+    """creates the XML records as Jira issues in bulk. progress is kept in
+    `<xml_path>.checkpoint.json`, rerunning after an interruption resumes."""
     jira = JiraClient()
-    tickets = parse_awr_xml(xml_path)
-
-    for idx, ticket in enumerate(tickets, start=1):
-        try:
-            issue_key = jira.create_ticket(
-                summary=ticket["summary"], description=ticket["description"]
-            )
-            print(f"[{idx}] Created: {issue_key}")
-        except Exception as e:
-            print(f"[{idx}] Failed to create: {ticket['summary']}\n{e}")
+    loader = BulkLoader(jira, checkpoint_path or f"{xml_path}.checkpoint.json")
+    loader.load(parse_awr_xml(xml_path))
 
 
-def process_single(ticket_id):
-    workflow = TriageWorkflow()
+def process_single(ticket_id, xml_path=None, rebuild=False):
+    workflow = TriageWorkflow(rebuild=rebuild)
+    workflow.chroma.init_populate(xml_path)
     workflow.process(ticket_id)
+    workflow.outbox.stop()  # send queued notifications before exiting
 
 
-def process_batch():
-    jira = JiraClient()
-    workflow = TriageWorkflow()
+def process_batch(xml_path=None, rebuild=False):
+    workflow = TriageWorkflow(rebuild=rebuild)
+    workflow.chroma.init_populate(xml_path)
 
-    issues = jira.get_open_tickets(label="AI_NEW")
-    for issue in issues:
-        workflow.process(issue.key)
+    issues = workflow.jira.iter_open_tickets(
+        label="AI_NEW", fields=["summary"], exclude_labels=[TRIAGED_LABEL]
+    )
+    window = (
+        digest_window(workflow, "Triage batch")
+        if settings.NOTIFICATION_DIGEST
+        else nullcontext()
+    )
+    with window:
+        # tickets are triaged in chunks through TriageWorkflow.process_many
+        BatchTriageRunner(workflow).run(issue["key"] for issue in issues)
+    workflow.outbox.stop()
 
 
 def send_email(to, subject, body):
@@ -96,6 +102,11 @@ def main():
     parser.add_argument("--to", help="Recipient email")
     parser.add_argument("--subject", help="Email subject")
     parser.add_argument("--body", help="Email body")
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Wipe the vector store and re-embed the whole XML source",
+    )
 
     args = parser.parse_args()
 
@@ -107,10 +118,10 @@ def main():
     elif args.mode == "process-single":
         if not args.ticket_id:
             raise ValueError("Missing --ticket-id for process-single")
-        process_single(args.ticket_id)
+        process_single(args.ticket_id, args.xml_path, args.rebuild)
 
     elif args.mode == "process-batch":
-        process_batch()
+        process_batch(args.xml_path, args.rebuild)
 
     elif args.mode == "send-email":
         if not all([args.to, args.subject, args.body]):
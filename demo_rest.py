@@ -1,9 +1,16 @@
 import argparse
+import time
+from contextlib import nullcontext
+from typing import Iterator
 from awr.jira_rest import JiraClientREST
 from awr.chroma import ChromaDB
-from workflow.triage import TriageWorkflow
+from workflow.triage import TRIAGED_LABEL, TriageWorkflow
+from workflow.bulk_load import BulkLoader
+from workflow.batch import BatchTriageRunner
 from awr.messaging import EmailNotifier
+from awr.digest import digest_window
 from xml.etree import ElementTree as ET
+from utils.xml_reader import iter_record_elements
 from config.settings import settings
 from awr.logger import logger
 
@@ -36,65 +43,85 @@ def build_description(awr: ET.Element) -> str:
     """
 
 
-def parse_awr_xml(xml_path: str) -> list[dict]:
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-    tickets = []
+def parse_awr_xml(xml_path: str) -> Iterator[dict]:
+    """yields the AWRData records of the file one at a time while parsing it"""
+    for awr in iter_record_elements(xml_path, record_tags=("AWRData",)):
+        yield {
+            "id": awr.findtext("ID"),
+            "summary": awr.findtext("JIRA_AWR_Title"),
+            "description": build_description(awr),
+            "labels": ["auto-loaded"],
+        }
 
-    for awr in root.findall("AWRData"):
-        tickets.append(
-            {
-                "summary": awr.findtext("JIRA_AWR_Title"),
-                "description": build_description(awr),
-            }
-        )
-    return tickets
 
-
-def load_dummy_data_to_jira(xml_path: str):
+def load_dummy_data_to_jira(xml_path: str, checkpoint_path: str = None):
+    """creates the XML records as Jira issues in bulk. progress is kept in
+    `<xml_path>.checkpoint.json`, rerunning after an interruption resumes."""
     jira = JiraClientREST()
-    tickets = parse_awr_xml(xml_path)
+    loader = BulkLoader(jira, checkpoint_path or f"{xml_path}.checkpoint.json")
+    loader.load(parse_awr_xml(xml_path))
 
-    for idx, ticket in enumerate(tickets, start=1):
-        try:
-            issue_key = jira.create_ticket(
-                summary=ticket["summary"], description=ticket["description"]
-            )
-            if issue_key:
-                logger.info(f"[{idx}] Created ticket {issue_key}")
-                jira.add_comment(issue_key, "Ticket auto-created from XML load.")
-                jira.update_ticket(issue_key, fields={"labels": ["auto-loaded"]})
-            else:
-                logger.error(f"[{idx}] Failed to create ticket: {ticket['summary']}")
-        except Exception as e:
-            logger.exception(f"[{idx}] Exception while creating ticket: {e}")
 
-
-def process_single(ticket_id):
-    workflow = TriageWorkflow()
+def process_single(ticket_id, xml_path=None, rebuild=False):
+    workflow = TriageWorkflow(rebuild=rebuild)
+    workflow.chroma.init_populate(xml_path)
     workflow.process(ticket_id)
+    workflow.outbox.stop()  # send queued notifications before exiting
 
 
-def process_batch():
-    jira = JiraClientREST()
-    workflow = TriageWorkflow()
+def process_batch(xml_path=None, rebuild=False, workers=None, digest=False):
+    workflow = TriageWorkflow(rebuild=rebuild)
+    workflow.chroma.init_populate(xml_path)
+    triage_open_tickets(workflow, workers, digest)
+    workflow.outbox.stop()
 
+
+def serve(xml_path=None, rebuild=False, workers=None, interval=300, digest=False):
+    """long running mode: every `interval` seconds the XML source is synced
+    if it changed and the open AI_NEW tickets are triaged"""
+    workflow = TriageWorkflow(rebuild=rebuild)
+    logger.info(f"Serving, polling every {interval}s")
     try:
-        issues = jira.get_open_tickets(label="AI_NEW")
-    except Exception as e:
-        logger.error(f"Failed to retrieve open tickets: {e}")
-        return
-
-    for issue in issues:
-        issue_key = issue.get("key")
-        if not issue_key:
-            logger.warning("Skipping issue with missing key")
-            continue
+        while True:
+            workflow.reload_sources(xml_path)
+            triage_open_tickets(workflow, workers, digest)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        logger.info("Stopped")
+    workflow.outbox.stop()
+
+
+def triage_open_tickets(workflow, workers=None, digest=False):
+    """triages the open AI_NEW tickets not triaged yet. with `digest` the
+    run's notifications go out as one summary email."""
+    jira = workflow.jira  # share the connection pool with the workers
+
+    # pages are fetched lazily as the workers drain the queue; triaged tickets
+    # drop out of the search, which iter_open_tickets reads as consuming
+    issues = jira.iter_open_tickets(
+        label="AI_NEW", fields=["summary"], exclude_labels=[TRIAGED_LABEL]
+    )
+
+    def issue_keys():
+        for issue in issues:
+            issue_key = issue.get("key")
+            if not issue_key:
+                logger.warning("Skipping issue with missing key")
+                continue
+            yield issue_key
+
+    window = digest_window(workflow, "Triage batch") if digest else nullcontext()
+    with window:
         try:
-            workflow.process(issue_key)
-            logger.info(f"Processed ticket {issue_key}")
+            BatchTriageRunner(workflow, workers=workers).run(issue_keys())
         except Exception as e:
-            logger.error(f"Failed to process ticket {issue_key}: {e}")
+            logger.error(f"Failed to retrieve open tickets: {e}")
+    jira.latency.log()
+    metrics = workflow.outbox.metrics()
+    logger.info(
+        f"[Outbox] {metrics['depth']} notifications queued, "
+        f"oldest {metrics['oldest_age']:.0f}s"
+    )
 
 
 def send_email(to, subject, body):
@@ -107,13 +134,39 @@ def main():
     parser.add_argument(
         "--mode",
         required=True,
-        choices=["load-dummy", "process-single", "process-batch", "send-email"],
+        choices=[
+            "load-dummy",
+            "process-single",
+            "process-batch",
+            "serve",
+            "send-email",
+        ],
     )
     parser.add_argument("--xml-path", help="Path to dummy XML data")
     parser.add_argument("--ticket-id", help="Jira ticket ID to process")
     parser.add_argument("--to", help="Recipient email")
     parser.add_argument("--subject", help="Email subject")
     parser.add_argument("--body", help="Email body")
+    parser.add_argument(
+        "--workers", type=int, help="Number of concurrent triage workers"
+    )
+    parser.add_argument(
+        "--interval",
+        type=int,
+        default=300,
+        help="Seconds between polls in serve mode",
+    )
+    parser.add_argument(
+        "--digest",
+        action="store_true",
+        default=settings.NOTIFICATION_DIGEST,
+        help="Send one summary email per batch instead of one per ticket",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Wipe the vector store and re-embed the whole XML source",
+    )
 
     args = parser.parse_args()
 
@@ -125,10 +178,13 @@ def main():
     elif args.mode == "process-single":
         if not args.ticket_id:
             raise ValueError("Missing --ticket-id for process-single")
-        process_single(args.ticket_id)
+        process_single(args.ticket_id, args.xml_path, args.rebuild)
 
     elif args.mode == "process-batch":
-        process_batch()
+        process_batch(args.xml_path, args.rebuild, args.workers, args.digest)
+
+    elif args.mode == "serve":
+        serve(args.xml_path, args.rebuild, args.workers, args.interval, args.digest)
 
     elif args.mode == "send-email":
         if not all([args.to, args.subject, args.body]):
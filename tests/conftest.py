@@ -0,0 +1,21 @@
+import os
+import tempfile
+import pytest
+
+# the logger creates its directory when first imported; keep it out of the tree
+os.environ.setdefault("LOG_PATH", tempfile.mkdtemp(prefix="awr-logs-"))
+
+
+@pytest.fixture(autouse=True)
+def isolated_stores(tmp_path, monkeypatch):
+    """points every on-disk store at the test's tmp_path"""
+    from config.settings import settings
+    import awr.embedding_cache as embedding_cache
+    import awr.outbox as outbox
+
+    monkeypatch.setattr(settings, "CHROMA_PATH", tmp_path / "chroma_db")
+    monkeypatch.setattr(settings, "VECTOR_INDEX_PATH", tmp_path / "vector_index")
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_PATH", tmp_path / "embedding_cache")
+    monkeypatch.setattr(settings, "OUTBOX_PATH", tmp_path / "outbox.sqlite")
+    monkeypatch.setattr(embedding_cache, "_default_cache", None)
+    monkeypatch.setattr(outbox, "_default_outbox", None)
@@ -0,0 +1,52 @@
+import json
+from unittest.mock import Mock
+from workflow.bulk_load import BulkLoader
+
+
+def tickets(n):
+    return [
+        {"id": str(i), "summary": f"AWR {i}", "description": "..."} for i in range(n)
+    ]
+
+
+def fake_bulk(fail_once=()):
+    """creates CSP-<id> for every ticket, failing the given ids on first try"""
+    failed = set()
+
+    def create_tickets_bulk(batch):
+        results = []
+        for ticket in batch:
+            if ticket["id"] in fail_once and ticket["id"] not in failed:
+                failed.add(ticket["id"])
+                results.append((None, "summary: rate limited"))
+            else:
+                results.append((f"CSP-{ticket['id']}", None))
+        return results
+
+    jira = Mock()
+    jira.create_tickets_bulk.side_effect = create_tickets_bulk
+    return jira
+
+
+def test_load_chunks_and_retries_failed_items(tmp_path):
+    jira = fake_bulk(fail_once={"3"})
+    loader = BulkLoader(jira, tmp_path / "load.checkpoint.json", chunk_size=4)
+
+    summary = loader.load(tickets(10))
+
+    assert summary == {"created": 10, "skipped": 0, "failed": 0}
+    sizes = [len(c.args[0]) for c in jira.create_tickets_bulk.call_args_list]
+    assert sizes == [4, 1, 4, 2]  # the retry only resends the failed item
+    assert json.loads((tmp_path / "load.checkpoint.json").read_text())["3"] == "CSP-3"
+
+
+def test_load_resumes_from_checkpoint(tmp_path):
+    checkpoint = tmp_path / "load.checkpoint.json"
+    checkpoint.write_text(json.dumps({str(i): f"CSP-{i}" for i in range(6)}))
+    jira = fake_bulk()
+
+    summary = BulkLoader(jira, checkpoint, chunk_size=50).load(tickets(10))
+
+    assert summary == {"created": 4, "skipped": 6, "failed": 0}
+    sent = [t["id"] for t in jira.create_tickets_bulk.call_args.args[0]]
+    assert sent == ["6", "7", "8", "9"]
@@ -0,0 +1,137 @@
+import pytest
+import xml.etree.ElementTree as ET
+from unittest.mock import Mock
+from awr.chroma import ChromaDB, build_where
+from config.settings import settings
+
+
+@pytest.fixture
+def chroma():
+    db = ChromaDB.__new__(ChromaDB)
+    db.client = Mock(get_max_batch_size=Mock(return_value=2))
+    db.collection = Mock()
+    db.sections = Mock()
+    db.ef = lambda documents: [[float(len(doc))] for doc in documents]
+    return db
+
+
+def test_populate_upserts_in_batches_and_isolates_failures(chroma, monkeypatch):
+    monkeypatch.setattr(settings, "CHROMA_INGEST_BATCH", 100)
+    chroma.collection.upsert.side_effect = [None, RuntimeError("boom"), None]
+
+    stored = chroma.populate(
+        ["a", "", "b", "c", "d", "e"],
+        [{"n": i} for i in range(6)],
+        ["0", "1", "2", "3", "4", "5"],
+    )
+
+    # the empty document is dropped with its metadata and uid
+    first = chroma.collection.upsert.call_args_list[0][1]
+    assert first["ids"] == ["0", "2"]
+    assert first["metadatas"] == [{"n": 0}, {"n": 2}]
+    assert chroma.collection.upsert.call_count == 3
+    assert stored == ["0", "2", "5"]
+
+
+def test_query_many_sends_one_query(chroma):
+    chroma.collection.query.return_value = {
+        "metadatas": [
+            [{"AWR_DOC_JIRA_REF": "CSP-1", "JIRA_AWR_URL": "u1"}],
+            [{"id": "CSP-2"}],
+        ],
+        "distances": [[0.1], [0.3]],
+    }
+
+    matches = chroma.query_many(["some text", [0.5]], n_results=1)
+
+    chroma.collection.query.assert_called_once()
+    embeddings = chroma.collection.query.call_args[1]["query_embeddings"]
+    assert [list(e) for e in embeddings] == [[9.0], [0.5]]
+    assert matches == [
+        [{"id": "CSP-1", "url": "u1", "distance": 0.1}],
+        [{"id": "CSP-2", "url": None, "distance": 0.3}],
+    ]
+    chroma.client.get_collection.assert_not_called()
+
+
+def test_query_sections_aggregates_per_parent(chroma):
+    chroma.sections.query.return_value = {
+        "metadatas": [
+            [
+                {"parent_id": "A", "section": "Price", "AWR_DOC_JIRA_REF": "CSP-1"},
+                {"parent_id": "B", "section": "Limitations"},
+                {"parent_id": "A", "section": "Payment Terms"},
+            ]
+        ],
+        "distances": [[0.1, 0.2, 0.5]],
+    }
+
+    best = chroma.query_sections([0.5], n_results=2)
+    mean = chroma.query_sections([0.5], n_results=2, aggregate="mean")
+
+    assert [(m["id"], m["distance"], m["section"]) for m in best] == [
+        ("CSP-1", 0.1, "Price"),
+        ("B", 0.2, "Limitations"),
+    ]
+    assert [(m["id"], m["distance"]) for m in mean] == [("B", 0.2), ("CSP-1", 0.3)]
+
+
+def test_sync_keeps_records_when_source_fails(chroma, tmp_path):
+    chroma.manifest_path = tmp_path / "manifest.json"
+    chroma._save_manifest({"old-1": "h1", "old-2": "h2"})
+
+    def entries():
+        yield "a", {"n": 0}, "new-1"
+        raise ET.ParseError("no element found")
+
+    assert chroma.sync(entries()) is False
+    chroma.collection.delete.assert_not_called()
+    assert chroma._load_manifest() == {"old-1": "h1", "old-2": "h2"}
+
+    assert chroma.init_populate(tmp_path / "missing.xml") is False
+    chroma.collection.delete.assert_not_called()
+
+
+def test_sync_retries_failed_updates_and_deletes(chroma, tmp_path):
+    chroma.manifest_path = tmp_path / "manifest.json"
+    assert chroma.sync(iter([("a", {"n": 0}, "1"), ("b", {"n": 0}, "2")]))
+    manifest = chroma._load_manifest()
+
+    chroma.collection.update.side_effect = RuntimeError("update failed")
+    chroma.collection.delete.side_effect = RuntimeError("delete failed")
+    assert chroma.sync(iter([("a", {"n": 1}, "1")]))
+
+    # the changed and the removed record keep their old entry
+    assert chroma._load_manifest() == manifest
+    chroma.collection.update.side_effect = None
+    chroma.collection.delete.side_effect = None
+    assert chroma.sync(iter([("a", {"n": 1}, "1")]))
+    chroma.collection.update.assert_called_with(ids=["1"], metadatas=[{"n": 1}])
+    chroma.collection.delete.assert_called_with(ids=["2"])
+    assert list(chroma._load_manifest()) == ["1"]
+
+
+def test_truncated_xml_keeps_existing_records(chroma, tmp_path):
+    chroma.manifest_path = tmp_path / "manifest.json"
+    record = "<record><ID>{0}</ID><JIRA_AWR_Title>title {0}</JIRA_AWR_Title></record>"
+    complete = tmp_path / "complete.xml"
+    complete.write_text(
+        "<root>" + "".join(record.format(i) for i in range(5)) + "</root>"
+    )
+    chroma.init_populate(complete)
+    manifest = chroma._load_manifest()
+    assert len(manifest) == 5
+
+    truncated = tmp_path / "truncated.xml"
+    truncated.write_text(complete.read_text()[:120])
+    chroma.init_populate(truncated)
+
+    chroma.collection.delete.assert_not_called()
+    assert chroma._load_manifest() == manifest
+    assert chroma.parse_xml_file(truncated) == []
+
+
+def test_build_where_only_accepts_ingested_fields():
+    assert build_where(project="CSP", version=None) == {"project": "CSP"}
+    with pytest.raises(ValueError):
+        build_where(priority="High")
@@ -0,0 +1,27 @@
+import numpy as np
+from awr.models import Priority
+from workflow.classify import classify
+
+
+def test_classify_vectorizes_thresholds():
+    distances = [
+        [0.12, 0.05, 0.3],  # HIGH: similarity 0.95 >= 0.90 -> duplicate
+        [0.2, np.inf, np.nan],  # SHOW_STOPPER: 0.80 < 0.85 -> new
+        [0.2, 0.21, 0.4],  # LOW: 0.80 >= 0.80 -> duplicate
+        [0.22, 0.3, 0.4],  # unknown priority uses MEDIUM: 0.78 -> review
+        [np.inf, np.inf, np.inf],  # no candidates -> new
+    ]
+    priorities = [Priority.HIGH, "Show Stopper", Priority.LOW, "Other", "Medium"]
+
+    result = classify(distances, priorities)
+
+    assert list(result.decisions) == ["duplicate", "new", "duplicate", "review", "new"]
+    assert list(result.best) == [1, 0, 0, 0, -1]
+    np.testing.assert_allclose(result.similarity[:4], [0.95, 0.8, 0.8, 0.78])
+    assert np.isnan(result.similarity[4])
+
+
+def test_classify_without_candidates():
+    result = classify(np.empty((2, 0)), ["High", "Low"])
+    assert list(result.decisions) == ["new", "new"]
+    assert list(result.best) == [-1, -1]
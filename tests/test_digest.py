@@ -0,0 +1,42 @@
+from unittest.mock import Mock
+from awr.digest import Digest, digest_window
+from workflow.escalate import EscalationWorkflow
+
+
+def test_digest_groups_by_category_and_match():
+    digest = Digest("Triage batch")
+    digest.add("review", "CSP-3", "CSP-1", 0.8, "http://x/1")
+    digest.add("duplicate", "CSP-4", "CSP-2", 0.95)
+    digest.add("review", "CSP-5", "CSP-0", 0.79, "<b>")
+    digest.add("review", "CSP-3", "CSP-1", 0.81)  # same ticket and category
+
+    subject, text, html = digest.render()
+
+    assert subject == "[Triage batch] 3 notifications: 1 duplicate, 2 review"
+    assert [e["ticket"] for e in digest.groups()["review"]] == ["CSP-5", "CSP-3"]
+    assert "Review needed (2)" in text
+    assert "CSP-3   CSP-1  0.81" in text
+    assert "<td>&lt;b&gt;</td>" in html
+
+
+def test_escalation_run_sends_one_digest():
+    workflow = EscalationWorkflow.__new__(EscalationWorkflow)
+    workflow.jira = Mock()
+    workflow.outbox = Mock()
+    workflow.digest = None
+    workflow._get_stale_issues = Mock(
+        return_value=[Mock(key=f"CSP-{i}", fields=Mock(labels=[])) for i in range(3)]
+    )
+
+    workflow.run(digest=True)
+
+    workflow.outbox.enqueue.assert_called_once()
+    assert "3 escalated" in workflow.outbox.enqueue.call_args[1]["subject"]
+    assert workflow.digest is None
+
+
+def test_empty_digest_sends_nothing():
+    workflow = Mock(digest=None)
+    with digest_window(workflow, "Triage batch"):
+        pass
+    workflow.outbox.enqueue.assert_not_called()
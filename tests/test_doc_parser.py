@@ -0,0 +1,48 @@
+from docx import Document
+from utils.doc_parser import DocumentParser
+
+
+def test_extracts_target_sections(tmp_path):
+    doc = Document()
+    doc.add_heading("Introduction", level=1)
+    doc.add_paragraph("not a target")
+    doc.add_heading("Pricing and  Payment Terms", level=1)
+    doc.add_heading("Price", level=2)
+    doc.add_heading("One-Time Charges", level=3)
+    doc.add_paragraph("100 EUR")
+    doc.add_paragraph("once")
+    doc.add_heading("Annual Maintenance Charges", level=3)
+    doc.add_paragraph("10 EUR")
+    doc.add_heading("Appendix", level=1)
+    doc.add_paragraph("ignored")
+    path = tmp_path / "awr.docx"
+    doc.save(path)
+
+    parser = DocumentParser(
+        {
+            ("pricing and payment terms", "price", "one-time charges"),
+            ("pricing and payment terms", "price", "annual maintenance charges"),
+        }
+    )
+
+    assert parser.extract_awr_sections(str(path)) == {
+        "Pricing and  Payment Terms > Price > One-Time Charges": "100 EUR once",
+        "Pricing and  Payment Terms > Price > Annual Maintenance Charges": "10 EUR",
+    }
+
+
+def test_same_headings_outside_a_target_subtree_are_ignored(tmp_path):
+    doc = Document()
+    doc.add_heading("Appendix", level=1)
+    doc.add_heading("Price", level=2)
+    doc.add_heading("One-Time Charges", level=3)
+    doc.add_paragraph("copy of the price table")
+    path = tmp_path / "awr.docx"
+    doc.save(path)
+
+    parser = DocumentParser()
+
+    assert parser.target_trie["pricing and payment terms"]["price"]["one-time charges"][
+        None
+    ] == ("pricing and payment terms", "price", "one-time charges")
+    assert parser.extract_awr_sections(str(path)) == {}
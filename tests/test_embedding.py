@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from unittest.mock import Mock
+import awr.embedding as embedding
+from awr.embedding import EmbeddingGenerator
+from awr.embedding_cache import EmbeddingCache, cache_key
+
+
+def fake_create(model, input):
+    """returns the input length as every component of each vector"""
+    data = [
+        SimpleNamespace(index=i, embedding=[float(len(text))] * 8)
+        for i, text in enumerate(input)
+    ]
+    return SimpleNamespace(data=list(reversed(data)))
+
+
+@pytest.fixture
+def embedder(monkeypatch):
+    client = Mock()
+    client.embeddings.create.side_effect = fake_create
+    monkeypatch.setattr(embedding, "client", client)
+    monkeypatch.setattr(embedding.settings, "EMBEDDING_CACHE_MAX_MB", 0)
+    generator = EmbeddingGenerator()
+    generator.dimensions = 8
+    generator.batch_size = 3
+    generator.batch_tokens = 1000
+    generator.concurrency = 2
+    return generator
+
+
+def test_generate_batch_keeps_order(embedder):
+    texts = ["a" * n for n in range(1, 11)]
+    matrix = embedder.generate_batch(texts)
+
+    assert matrix.dtype == np.float32
+    assert matrix.shape == (10, 8)
+    assert matrix.flags["C_CONTIGUOUS"]
+    assert matrix[:, 0].tolist() == list(range(1, 11))
+    assert embedding.client.embeddings.create.call_count == 4  # 3 + 3 + 3 + 1
+
+
+def test_generate_batch_respects_token_budget(embedder):
+    embedder.batch_tokens = 30
+    texts = ["x" * 100, "y" * 100, "z"]  # ~26 tokens each for the long ones
+    embedder.generate_batch(texts)
+
+    sent = [
+        c.kwargs["input"] for c in embedding.client.embeddings.create.call_args_list
+    ]
+    assert sent == [["x" * 100], ["y" * 100, "z"]]
+
+
+def test_generate_batch_empty_texts(embedder):
+    matrix = embedder.generate_batch(["", "abc", "  "])
+
+    assert matrix[0].tolist() == [0.0] * 8
+    assert matrix[1].tolist() == [3.0] * 8
+    assert matrix[2].tolist() == [0.0] * 8
+    embedding.client.embeddings.create.assert_called_once()
+
+
+def test_generate_batch_rejects_incomplete_responses(embedder):
+    def missing_index(model, input):
+        response = fake_create(model, input)
+        response.data[0].index = response.data[1].index  # one index repeated
+        return response
+
+    embedding.client.embeddings.create.side_effect = missing_index
+    with pytest.raises(ValueError):
+        embedder.generate_batch(["a", "bb", "ccc"])
+
+
+def test_generate_rejects_wrong_dimensions(embedder):
+    embedder.dimensions = 16
+    with pytest.raises(ValueError):
+        embedder.generate("abc")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(path=tmp_path, dimensions=8, capacity=3)
+
+
+def test_cache_key_normalizes_whitespace():
+    assert cache_key("m", 8, " a  b\n") == cache_key("m", 8, "a b")
+    assert cache_key("m", 8, "a b") != cache_key("m", 16, "a b")
+    assert cache_key("m", 8, "a b") != cache_key("other", 8, "a b")
+
+
+def test_cache_lru_eviction(cache):
+    for name in "abc":
+        cache.put(name, np.full(8, ord(name), dtype=np.float32))
+    cache.get("a")  # b is now the least recently used
+    cache.put("d", np.full(8, 1.0, dtype=np.float32))
+
+    assert cache.get("b") is None
+    assert cache.get("a")[0] == ord("a")
+    assert cache.get("d")[0] == 1.0
+    assert cache.stats()["entries"] == 3
+
+
+def test_cache_hit_miss_counters(cache):
+    cache.put("a", np.ones(8, dtype=np.float32))
+    cache.get_many(["a", "b"])
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_generate_batch_uses_cache(embedder, cache):
+    embedder.cache = cache
+    embedder.generate_batch(["aa", "bbb", "aa"])
+    matrix = embedder.generate_batch(["bbb", "aa"])
+
+    assert matrix[:, 0].tolist() == [3.0, 2.0]
+    sent = [
+        c.kwargs["input"] for c in embedding.client.embeddings.create.call_args_list
+    ]
+    assert sent == [["aa", "bbb"]]
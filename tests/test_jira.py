@@ -0,0 +1,194 @@
+import json
+import asyncio
+import httpx
+import pytest
+import requests
+from unittest.mock import AsyncMock, Mock
+import awr.jira_async as jira_async
+import awr.jira_rest as jira_rest
+from awr.jira_async import AsyncJiraClientREST
+from awr.jira_rest import JiraClientREST
+from awr.pagination import paginate
+
+
+def make_fetcher(issues, page_size=100):
+    calls = []
+
+    def fetch_page(start_at):
+        calls.append(start_at)
+        return issues[start_at : start_at + page_size], len(issues)
+
+    return fetch_page, calls
+
+
+def test_paginate_follows_start_at():
+    issues = [{"key": f"CSP-{i}"} for i in range(250)]
+    fetch_page, calls = make_fetcher(issues)
+
+    assert list(paginate(fetch_page)) == issues
+    assert calls == [0, 100, 200]
+
+
+def test_paginate_is_lazy_without_prefetch():
+    issues = [{"key": f"CSP-{i}"} for i in range(250)]
+    fetch_page, calls = make_fetcher(issues)
+
+    pages = paginate(fetch_page, prefetch=False)
+    next(pages)
+    assert calls == [0]
+
+
+def test_paginate_consuming_skips_nothing():
+    remaining = [{"key": f"CSP-{i}"} for i in range(250)]
+    stuck = {"CSP-3", "CSP-150"}  # e.g. the update failed, issue stays in the JQL
+    fetch_page, _ = make_fetcher(remaining)
+
+    seen = []
+    for issue in paginate(fetch_page, consuming=True):
+        seen.append(issue["key"])
+        if issue["key"] not in stuck:
+            remaining.remove(issue)
+
+    assert len(seen) == len(set(seen)) == 250
+    assert [issue["key"] for issue in remaining] == ["CSP-3", "CSP-150"]
+
+
+def response(status, text="", headers=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = text.encode()
+    resp.headers.update(headers or {})
+    return resp
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(jira_rest.time, "sleep", Mock())
+    client = JiraClientREST()
+    client.session = Mock()
+    return client
+
+
+def test_request_retries_with_retry_after(client):
+    client.session.request.side_effect = [
+        response(429, headers={"Retry-After": "7"}),
+        response(503),
+        response(200, '{"key": "CSP-1"}'),
+    ]
+
+    assert client._request("GET", "/rest/api/2/issue/CSP-1") == {"key": "CSP-1"}
+    assert client.session.request.call_count == 3
+    assert jira_rest.time.sleep.call_args_list[0].args == (7.0,)
+    stats = client.latency.summary()["GET /rest/api/2/issue/{id}"]
+    assert (stats["count"], stats["errors"]) == (3, 2)
+
+
+def test_request_does_not_retry_post_on_server_error(client):
+    client.session.request.return_value = response(502)
+
+    with pytest.raises(requests.HTTPError):
+        client._request("POST", "/rest/api/2/issue", json={})
+    assert client.session.request.call_count == 1
+
+
+def test_request_gives_up_after_max_retries(client):
+    client.session.request.return_value = response(500)
+
+    with pytest.raises(requests.HTTPError):
+        client._request("GET", "/rest/api/2/search", max_retries=2)
+    assert client.session.request.call_count == 3
+
+
+def test_async_client_paginates_and_retries(monkeypatch):
+    monkeypatch.setattr(jira_async.asyncio, "sleep", AsyncMock())
+    issues = [{"key": f"CSP-{i}"} for i in range(150)]
+    attempts = []
+
+    def handler(request):
+        start_at = int(request.url.params["startAt"])
+        attempts.append(start_at)
+        if attempts.count(start_at) == 1 and start_at == 100:
+            return httpx.Response(503)
+        page = issues[start_at : start_at + 100]
+        return httpx.Response(200, json={"issues": page, "total": len(issues)})
+
+    async def search():
+        async with AsyncJiraClientREST() as jira:
+            jira.client = httpx.AsyncClient(
+                base_url=jira.base_url, transport=httpx.MockTransport(handler)
+            )
+            return await jira.search_tickets("project = CSP")
+
+    assert asyncio.run(search()) == issues
+    assert attempts == [0, 100, 100]
+
+
+def test_async_search_stops_at_max_results():
+    issues = [{"key": f"CSP-{i}"} for i in range(300)]
+    requested = []
+
+    def handler(request):
+        start_at = int(request.url.params["startAt"])
+        size = int(request.url.params["maxResults"])
+        requested.append(start_at)
+        page = issues[start_at : start_at + size]
+        return httpx.Response(200, json={"issues": page, "total": len(issues)})
+
+    async def search(max_results):
+        async with AsyncJiraClientREST() as jira:
+            jira.client = httpx.AsyncClient(
+                base_url=jira.base_url, transport=httpx.MockTransport(handler)
+            )
+            return await jira.search_tickets("project = CSP", max_results=max_results)
+
+    assert asyncio.run(search(100)) == issues[:100]
+    assert requested == [0]
+    requested.clear()
+    assert asyncio.run(search(150)) == issues[:150]
+    assert requested == [0, 100]
+
+
+def test_edit_payload_uses_update_verbs():
+    payload = jira_rest.edit_payload(
+        {"summary": "s"}, add_labels=["AI_REVIEW"], comment="see CSP-1"
+    )
+
+    assert payload == {
+        "fields": {"summary": "s"},
+        "update": {
+            "labels": [{"add": "AI_REVIEW"}],
+            "comment": [{"add": {"body": "see CSP-1"}}],
+        },
+    }
+
+
+def test_create_tickets_bulk_maps_errors_to_items(client):
+    body = {
+        "issues": [{"key": "CSP-1"}, {"key": "CSP-3"}],
+        "errors": [
+            {
+                "status": 400,
+                "failedElementNumber": 1,
+                "elementErrors": {"errors": {"summary": "required"}},
+            }
+        ],
+    }
+    client.session.request.return_value = response(201, json.dumps(body))
+    batch = [{"summary": s, "description": "d"} for s in ("a", "", "c")]
+
+    assert client.create_tickets_bulk(batch) == [
+        ("CSP-1", None),
+        (None, "summary: required"),
+        ("CSP-3", None),
+    ]
+
+
+def test_open_tickets_exclude_triaged(client):
+    client.iter_search = Mock(return_value=iter([]))
+
+    client.get_open_tickets(label="AI_NEW", exclude_labels=["AI_TRIAGED"])
+
+    jql = client.iter_search.call_args[0][0]
+    assert jql.endswith("AND labels = AI_NEW AND labels not in (AI_TRIAGED)")
+    # triaging adds the excluded label, so offsets would skip tickets
+    assert client.iter_search.call_args[1]["consuming"] is True
@@ -0,0 +1,129 @@
+import socketserver
+import threading
+import pytest
+from awr.messaging import EmailNotifier
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """just enough of an SMTP server to accept messages without TLS or auth"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.connections = 0
+        self.messages = []
+        self.busy = 1  # "busy@" recipients get a 451 this many times
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 stand-in ready")
+        for raw in self.rfile:
+            command = raw.decode().strip().upper()
+            if command.startswith("DATA"):
+                self.reply("354 end with .")
+                data = []
+                for line in self.rfile:
+                    if line == b".\r\n":
+                        break
+                    data.append(line)
+                self.server.messages.append(b"".join(data))
+                self.reply("250 queued")
+            elif command.startswith("RCPT") and "REJECT@" in command:
+                self.reply("550 no such user")
+            elif command.startswith("RCPT") and "BUSY@" in command and self.server.busy:
+                self.server.busy -= 1
+                self.reply("451 try again later")
+            elif command.startswith("QUIT"):
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+
+@pytest.fixture
+def smtp_server():
+    server = SMTPStandIn()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def notifier(smtp_server):
+    notifier = EmailNotifier(
+        host="127.0.0.1",
+        port=smtp_server.server_address[1],
+        use_tls=False,
+        username="",
+        password="",
+    )
+    notifier.backoff_factor = 0
+    yield notifier
+    notifier.close()
+
+
+def test_connection_is_reused(notifier, smtp_server):
+    assert notifier.send(to="a@example.com", subject="1", body="one")
+    assert notifier.send(to="a@example.com", subject="2", body="two")
+    assert (
+        notifier.send_many(
+            [
+                {"to": "b@example.com", "subject": "3", "body": "three"},
+                {"to": "reject@example.com", "subject": "4", "body": "four"},
+                {"to": ["c@example.com"], "subject": "5", "body": "five"},
+            ]
+        )
+        == 2
+    )
+
+    assert len(smtp_server.messages) == 4
+    assert smtp_server.connections == 1
+
+
+def test_reconnects_after_failure_and_idle_timeout(notifier, smtp_server):
+    assert notifier.send(to="a@example.com", subject="1", body="one")
+    server, _ = notifier._idle.queue[0]
+    server.close()  # connection dropped behind the pool's back
+
+    assert notifier.send(to="a@example.com", subject="2", body="two")
+    assert smtp_server.connections == 2
+
+    notifier.idle_timeout = 0
+    assert notifier.send(to="a@example.com", subject="3", body="three")
+    assert smtp_server.connections == 3
+    assert len(smtp_server.messages) == 3
+
+
+def test_transient_refusal_is_retried(notifier, smtp_server):
+    assert notifier.send(to="busy@example.com", subject="1", body="one")
+    assert len(smtp_server.messages) == 1
+
+    assert not notifier.send(to="reject@example.com", subject="2", body="two")
+    assert len(smtp_server.messages) == 1
+
+
+def test_refused_message_does_not_hold_up_the_batch(notifier, smtp_server):
+    smtp_server.busy = 100  # "busy@" keeps getting 451
+    deferred = []
+    messages = [
+        notifier.build_message(to, subject, "body")
+        for to, subject in [
+            ("busy@example.com", "1"),
+            ("a@example.com", "2"),
+            ("b@example.com", "3"),
+        ]
+    ]
+
+    assert notifier.deliver(messages, deferred=deferred) == 2
+
+    assert [msg["Subject"] for msg, _ in deferred] == ["1"]
+    assert len(smtp_server.messages) == 2
+    assert smtp_server.connections == 1
@@ -0,0 +1,71 @@
+import json
+import os
+from pathlib import Path
+from docx import Document
+from utils.multidoc_json import export_jsonl, iter_documents, write_jsonl
+
+
+def write_docx(path, price):
+    doc = Document()
+    doc.add_heading("Pricing and Payment Terms", level=1)
+    doc.add_heading("Price", level=2)
+    doc.add_heading("One-Time Charges", level=3)
+    doc.add_paragraph(price)
+    doc.save(path)
+
+
+def test_exports_documents_and_skips_unchanged(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(3):
+        write_docx(docs / f"CHAMP-{i}.docx", f"{i}00 EUR")
+    state = tmp_path / "state.json"
+
+    records = sorted(iter_documents(docs, state, workers=2), key=lambda r: r["path"])
+    assert [r["sections"] for r in records] == [
+        {"Pricing and Payment Terms > Price > One-Time Charges": f"{i}00 EUR"}
+        for i in range(3)
+    ]
+
+    write_docx(docs / "CHAMP-1.docx", "150 EUR")
+    out = tmp_path / "out.jsonl"
+    with open(out, "w", encoding="utf-8") as f:
+        assert write_jsonl(iter_documents(docs, state, workers=2), f) == 1
+    assert json.loads(out.read_text())["path"].endswith("CHAMP-1.docx")
+
+
+def test_export_rewrites_changed_records(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(3):
+        write_docx(docs / f"CHAMP-{i}.docx", f"{i}00 EUR")
+    out = tmp_path / "out.jsonl"
+    assert export_jsonl(docs, out, workers=2) == 3
+
+    write_docx(docs / "CHAMP-1.docx", "150 EUR")
+    (docs / "CHAMP-2.docx").unlink()
+    assert export_jsonl(docs, out, workers=2) == 1
+
+    lines = out.read_text(encoding="utf-8").splitlines()
+    records = {Path(r["path"]).name: r for r in map(json.loads, lines)}
+    assert len(lines) == 2
+    assert list(records["CHAMP-1.docx"]["sections"].values()) == ["150 EUR"]
+    assert list(records["CHAMP-0.docx"]["sections"].values()) == ["000 EUR"]
+
+    # the state belongs to its output: a new output file gets every document
+    assert export_jsonl(docs, tmp_path / "other.jsonl", workers=2) == 2
+
+
+def test_export_keeps_touched_files(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(2):
+        write_docx(docs / f"CHAMP-{i}.docx", f"{i}00 EUR")
+    out = tmp_path / "out.jsonl"
+    assert export_jsonl(docs, out, workers=2) == 2
+    before = out.read_text(encoding="utf-8").splitlines()
+
+    os.utime(docs / "CHAMP-0.docx", ns=(0, 0))  # new mtime, same content
+    assert export_jsonl(docs, out, workers=2) == 0
+
+    assert sorted(out.read_text(encoding="utf-8").splitlines()) == sorted(before)
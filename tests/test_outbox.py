@@ -0,0 +1,108 @@
+import time
+import pytest
+from unittest.mock import Mock
+from awr.outbox import NotificationOutbox
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    outbox = NotificationOutbox(notifier=Mock(), path=tmp_path / "outbox.sqlite")
+    outbox.start = Mock()  # drained by hand unless a test starts the sender
+    return outbox
+
+
+def test_enqueue_dedups_and_drain_delivers(outbox):
+    outbox.notifier.send.return_value = True
+
+    assert outbox.enqueue("a@example.com", "s", "b", dedup_key="CSP-1:review")
+    assert not outbox.enqueue("a@example.com", "s", "b", dedup_key="CSP-1:review")
+    assert outbox.enqueue("a@example.com", "s", "b", dedup_key="CSP-2:review")
+    assert outbox.metrics()["depth"] == 2
+
+    assert outbox.drain() == 2
+    outbox.notifier.send.assert_called_with(
+        to="a@example.com", subject="s", body="b", rejected=[], deferred=[]
+    )
+    assert outbox.metrics() == {"depth": 0, "oldest_age": 0.0, "failed": 0}
+    # still deduplicated after sending
+    assert not outbox.enqueue("a@example.com", "s", "b", dedup_key="CSP-1:review")
+
+
+def test_failed_sends_stay_queued_until_max_attempts(outbox):
+    def send(deferred, **message):
+        deferred.append((message, "451 try again later"))
+        return False
+
+    outbox.backoff_factor = 0
+    outbox.max_attempts = 2
+    outbox.notifier.send.side_effect = send
+
+    outbox.enqueue("a@example.com", "s", "b")
+    assert outbox.drain() == 0
+
+    assert outbox.notifier.send.call_count == 2
+    assert outbox.metrics()["failed"] == 1
+
+
+def test_unreachable_server_stops_the_pass(outbox):
+    outbox.backoff_factor = 0
+    outbox.notifier.send.return_value = False  # no connection
+    for i in range(3):
+        outbox.enqueue(f"{i}@example.com", "s", "b")
+
+    assert outbox.drain() == 0
+
+    assert outbox.notifier.send.call_count == 1
+    assert outbox.metrics()["depth"] == 3
+    outbox.notifier.send.return_value = True
+    assert outbox.drain() == 3
+
+
+def test_given_up_messages_are_pruned(outbox, monkeypatch):
+    def send(rejected, **message):
+        rejected.append((message, "550 no such user"))
+        return False
+
+    outbox.notifier.send.side_effect = send
+    outbox.enqueue("nobody@example.com", "s", "b", dedup_key="CSP-1:duplicate")
+    outbox.drain()
+    assert not outbox.enqueue(
+        "nobody@example.com", "s", "b", dedup_key="CSP-1:duplicate"
+    )
+
+    monkeypatch.setattr("awr.outbox.settings.OUTBOX_RETENTION_HOURS", 0)
+    outbox.drain()
+    assert outbox.metrics()["failed"] == 0
+    assert outbox.enqueue("nobody@example.com", "s", "b", dedup_key="CSP-1:duplicate")
+
+
+def test_background_sender(tmp_path):
+    outbox = NotificationOutbox(notifier=Mock(), path=tmp_path / "outbox.sqlite")
+    outbox.notifier.send.return_value = True
+
+    outbox.enqueue("a@example.com", "s", "b")
+    deadline = time.time() + 5
+    while outbox.metrics()["depth"] and time.time() < deadline:
+        time.sleep(0.01)
+    outbox.stop()
+
+    assert outbox.notifier.send.call_count == 1
+
+
+def test_rejected_message_fails_without_retries(outbox):
+    def send(rejected, **message):
+        rejected.append((message, "550 no such user"))
+        return False
+
+    outbox.notifier.send.side_effect = send
+    outbox.enqueue("nobody@example.com", "s", "b")
+    assert outbox.drain() == 0
+
+    assert outbox.notifier.send.call_count == 1
+    assert outbox.metrics() == {"depth": 0, "oldest_age": 0.0, "failed": 1}
+
+
+def test_metrics_do_not_create_the_queue(tmp_path):
+    outbox = NotificationOutbox(notifier=Mock(), path=tmp_path / "outbox.sqlite")
+    assert outbox.metrics() == {"depth": 0, "oldest_age": 0.0, "failed": 0}
+    assert not (tmp_path / "outbox.sqlite").exists()
@@ -1,28 +1,228 @@
 import pytest
 from unittest.mock import Mock
-from workflows.triage import TriageWorkflow
+from workflow.triage import TriageWorkflow
+from workflow.batch import BatchTriageRunner
 from awr.models import JiraTicket, Priority
+from config.settings import settings
 
 
 @pytest.fixture
 def mock_triage():
-    triage = TriageWorkflow()
+    triage = TriageWorkflow.__new__(TriageWorkflow)
+    triage.filters = {}
     triage.jira = Mock()
     triage.chroma = Mock()
     triage.embedder = Mock()
-    triage.notifier = Mock()
+    triage.outbox = Mock()
+    triage.digest = None
+    triage._source_stamp = None
     return triage
 
 
 def test_process_new_ticket(mock_triage):
-    mock_ticket = JiraTicket(
-        id="TEST-1", summary="Test", description="Test", priority=Priority.MEDIUM
-    )
+    mock_ticket = {
+        "key": "TEST-1",
+        "fields": {
+            "summary": "Test",
+            "description": "Test",
+            "priority": {"name": Priority.MEDIUM.value},
+            "labels": [],
+        },
+    }
     mock_triage.jira.get_ticket.return_value = mock_ticket
-    mock_triage.chroma.query.return_value = {"ids": [[]]}  # no match
+    mock_triage.embedder.generate.return_value = [0.1, 0.2]
+    mock_triage.chroma.query_by_embedding.return_value = []  # no match
 
     mock_triage.process("TEST-1")  # test
 
     # verify
     mock_triage.jira.update_ticket.assert_called()
-    assert "AI_NEW" in mock_triage.jira.update_ticket.call_args[1]["labels"]
+    assert "AI_NEW" in mock_triage.jira.update_ticket.call_args[1]["add_labels"]
+
+
+def test_process_embeds_ticket_once(mock_triage):
+    mock_triage.jira.get_ticket.return_value = {
+        "key": "TEST-2",
+        "fields": {"summary": "Test", "priority": {"name": "Low"}},
+    }
+    mock_triage.embedder.generate.return_value = [0.1, 0.2]
+    mock_triage.chroma.query_by_embedding.return_value = []
+
+    mock_triage.process("TEST-2")
+
+    mock_triage.embedder.generate.assert_called_once()
+    mock_triage.chroma.query.assert_not_called()
+    mock_triage.chroma.query_by_embedding.assert_called_once()
+    assert mock_triage.chroma.query_by_embedding.call_args[0][0] == [0.1, 0.2]
+    assert mock_triage.chroma.add_ticket.call_args[1]["embedding"] == [0.1, 0.2]
+
+
+def test_batch_runner_collects_results():
+    outcomes = {"T-1": "new", "T-2": "duplicate", "T-3": None}
+
+    def process_many(ticket_ids):
+        if "T-4" in ticket_ids:
+            raise RuntimeError("boom")
+        return {ticket_id: outcomes[ticket_id] for ticket_id in ticket_ids}
+
+    workflow = Mock()
+    workflow.process_many.side_effect = process_many
+
+    results = BatchTriageRunner(workflow, workers=3, queue_size=1, chunk_size=3).run(
+        iter(["T-1", "T-2", "T-3", "T-4"])
+    )
+
+    workflow.process.assert_not_called()
+    assert [c[0][0] for c in workflow.process_many.call_args_list] == [
+        ["T-1", "T-2", "T-3"],
+        ["T-4"],
+    ]
+    by_id = {result.ticket_id: result for result in results}
+    assert set(by_id) == {"T-1", "T-2", "T-3", "T-4"}
+    assert by_id["T-1"].outcome == "new"
+    assert by_id["T-2"].outcome == "duplicate"
+    assert by_id["T-3"].error == "not processed"
+    assert by_id["T-4"].outcome is None and by_id["T-4"].error == "boom"
+
+
+def test_batch_runner_classifies_chunks_in_one_pass(mock_triage):
+    mock_triage.jira.get_ticket.side_effect = lambda key: {
+        "key": key,
+        "fields": {"summary": key, "priority": {"name": "High"}},
+    }
+    mock_triage.embedder.generate_batch.side_effect = lambda texts: [[0.1]] * len(texts)
+    mock_triage.chroma.query_many.side_effect = lambda queries, **kwargs: [
+        [{"id": "CSP-1", "url": "u", "distance": 0.05}] for _ in queries
+    ]
+
+    results = BatchTriageRunner(mock_triage, workers=2, chunk_size=4).run(
+        f"T-{i}" for i in range(8)
+    )
+
+    assert sorted(r.outcome for r in results) == ["duplicate"] * 8
+    assert mock_triage.embedder.generate_batch.call_count == 2
+    assert mock_triage.chroma.query_many.call_count == 2
+    mock_triage.embedder.generate.assert_not_called()
+
+
+def test_reload_sources_only_syncs_changed_files(mock_triage, tmp_path):
+    xml_path = tmp_path / "awr.xml"
+    xml_path.write_text("<root/>")
+
+    assert mock_triage.reload_sources(str(xml_path))
+    assert not mock_triage.reload_sources(str(xml_path))
+
+    xml_path.write_text("<root><record/></root>")
+    assert mock_triage.reload_sources(str(xml_path))
+    assert mock_triage.chroma.init_populate.call_count == 2
+
+    # a failed sync is retried even though the file did not change again
+    xml_path.write_text("<root><record/><record/></root>")
+    mock_triage.chroma.init_populate.side_effect = [RuntimeError("boom"), False, True]
+    assert not mock_triage.reload_sources(str(xml_path))
+    assert not mock_triage.reload_sources(str(xml_path))
+    assert mock_triage.reload_sources(str(xml_path))
+    assert not mock_triage.reload_sources(str(xml_path))
+    assert mock_triage.chroma.init_populate.call_count == 5
+
+
+def test_process_filters_candidates(mock_triage, monkeypatch):
+    monkeypatch.setattr(settings, "TRIAGE_SCOPE_PROJECT", True)
+    mock_triage.filters = {"version": ["1.0", "1.1"]}
+    mock_triage.jira.get_ticket.return_value = {
+        "key": "CSP-7",
+        "fields": {"summary": "s", "priority": {"name": "High"}},
+    }
+    mock_triage.chroma.query_by_embedding.return_value = []
+
+    mock_triage.process("CSP-7")
+
+    where = mock_triage.chroma.query_by_embedding.call_args[1]["where"]
+    assert where == {
+        "$and": [
+            {"AWR_Document_Version": {"$in": ["1.0", "1.1"]}},
+            {"project": "CSP"},
+        ]
+    }
+
+
+def test_review_notification_is_queued(mock_triage):
+    mock_triage._classify_review(
+        JiraTicket(id="CSP-9", summary="s", description="", priority="Medium"),
+        {"id": "CSP-1", "url": "u"},
+        0.8,
+    )
+
+    assert mock_triage.outbox.enqueue.call_args[1]["dedup_key"] == "CSP-9:review"
+
+
+def test_process_many_classifies_in_one_pass(mock_triage):
+    mock_triage.jira.get_ticket.side_effect = lambda key: {
+        "key": key,
+        "fields": {"summary": key, "priority": {"name": "High"}},
+    }
+    mock_triage.embedder.generate_batch.return_value = [[0.1], [0.2], [0.3]]
+    mock_triage.chroma.query_many.return_value = [
+        [{"id": "CSP-1", "url": "u", "distance": 0.05}],
+        [
+            {"id": "CSP-2", "url": "u", "distance": 0.3},
+            {"id": "CSP-3", "distance": 0.2},
+        ],
+        [],
+    ]
+
+    outcomes = mock_triage.process_many(["T-1", "T-2", "T-3"])
+
+    assert outcomes == {"T-1": "duplicate", "T-2": "review", "T-3": "new"}
+    mock_triage.chroma.query_many.assert_called_once()
+    review_summary = mock_triage.jira.update_ticket.call_args_list[1][0][1]["summary"]
+    assert "CSP-3" in review_summary
+
+
+def test_process_many_isolates_unreadable_tickets(mock_triage):
+    def get_ticket(key):
+        if key == "T-2":
+            raise RuntimeError("404 Not Found")
+        priority = "Highest" if key == "T-3" else "High"  # not a Priority
+        return {"key": key, "fields": {"summary": key, "priority": {"name": priority}}}
+
+    mock_triage.jira.get_ticket.side_effect = get_ticket
+    mock_triage.embedder.generate_batch.side_effect = lambda texts: [[0.1]] * len(texts)
+    mock_triage.chroma.query_many.side_effect = lambda queries, **kwargs: [
+        [] for _ in queries
+    ]
+
+    outcomes = mock_triage.process_many(["T-1", "T-2", "T-3", "T-4"])
+
+    assert outcomes == {"T-1": "new", "T-2": None, "T-3": None, "T-4": "new"}
+
+
+def test_retriaged_ticket_does_not_match_itself(mock_triage):
+    mock_triage.jira.get_ticket.return_value = {
+        "key": "CSP-5",
+        "fields": {"summary": "s", "priority": {"name": "Medium"}},
+    }
+    mock_triage.embedder.generate.return_value = [0.1, 0.2]
+    # stored by add_ticket on the first triage
+    mock_triage.chroma.query_by_embedding.return_value = [
+        {"id": "CSP-5", "url": None, "distance": 0.0},
+        {"id": "CSP-1", "url": "u1", "distance": 0.9},
+    ]
+
+    assert mock_triage.process("CSP-5") == "new"
+    mock_triage.jira.update_ticket.assert_called_once()
+    assert "AI_NEW" in mock_triage.jira.update_ticket.call_args[1]["add_labels"]
+
+
+def test_retriage_replaces_summary_tag(mock_triage):
+    ticket = JiraTicket(
+        id="CSP-9",
+        summary="Login fails [DUPLICATE: CSP-1]",
+        description="",
+        priority="Medium",
+    )
+    mock_triage._classify_duplicate(ticket, {"id": "CSP-2", "url": "u"}, 0.95)
+
+    args = mock_triage.jira.update_ticket.call_args
+    assert args[0][1] == {"summary": "Login fails [DUPLICATE: CSP-2]"}
+    assert "AI_TRIAGED" in args[1]["add_labels"]
@@ -0,0 +1,140 @@
+import numpy as np
+from awr.vector_index import LocalCollection, LocalVectorClient, match_where
+
+
+def vectors(n, dimensions=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dimensions)).astype(np.float32)
+
+
+def test_exact_query_matches_brute_force(tmp_path):
+    data = vectors(200)
+    collection = LocalCollection(tmp_path / "awr", nlist=0)
+    collection.upsert(
+        ids=[str(i) for i in range(200)],
+        embeddings=data,
+        metadatas=[{"project": "A" if i % 2 else "B"} for i in range(200)],
+        documents=[f"doc {i}" for i in range(200)],
+    )
+
+    query = vectors(1, seed=1)[0]
+    result = collection.query([query], n_results=5, where={"project": "A"})
+
+    normed = data / np.linalg.norm(data, axis=1, keepdims=True)
+    scores = normed @ (query / np.linalg.norm(query))
+    odd = [i for i in np.argsort(-scores) if i % 2][:5]
+    assert result["ids"][0] == [str(i) for i in odd]
+    assert np.allclose(result["distances"][0], 2 - 2 * scores[odd], atol=1e-5)
+    assert result["documents"][0][0] == f"doc {odd[0]}"
+
+
+def test_upsert_delete_and_reopen(tmp_path):
+    client = LocalVectorClient(tmp_path)
+    collection = client.get_or_create_collection("awr")
+    collection.upsert(ids=["a", "b"], embeddings=[[1, 0], [0, 1]])
+    collection.upsert(ids=["a"], embeddings=[[0, 1]], metadatas=[{"v": 2}])
+    collection.delete(ids=["b"])
+    collection.upsert(ids=["c"], embeddings=[[1, 0]])  # reuses b's row
+    assert collection.count() == 2
+
+    reopened = LocalVectorClient(tmp_path).get_or_create_collection("awr")
+    result = reopened.query([[1, 0]], n_results=3)
+    assert result["ids"] == [["c", "a"]]
+    assert result["metadatas"][0][1] == {"v": 2}
+
+    reopened.upsert(
+        ids=[str(i) for i in range(2000)], embeddings=vectors(2000, dimensions=2)
+    )
+    reopened.delete(where={"v": 2})
+    assert reopened.count() == 2001
+    assert len(set(reopened.query([[1, 1]], n_results=5000)["ids"][0])) == 2001
+    client.delete_collection("awr")
+    assert not (tmp_path / "awr").exists()
+
+
+def test_ivf_recall(tmp_path):
+    rng = np.random.default_rng(0)
+    centers = vectors(32, dimensions=32, seed=2)
+    data = centers[rng.integers(0, 32, 4000)] + 0.3 * vectors(4000, dimensions=32)
+    ids = [str(i) for i in range(len(data))]
+    exact = LocalCollection(tmp_path / "exact", nlist=0)
+    ivf = LocalCollection(tmp_path / "ivf", nlist=32, nprobe=4)
+    exact.upsert(ids=ids, embeddings=data)
+    ivf.upsert(ids=ids, embeddings=data)
+
+    queries = data[:50] + 0.1 * vectors(50, dimensions=32, seed=3)
+    truth = exact.query(queries, n_results=10)["ids"]
+    found = ivf.query(queries, n_results=10)["ids"]
+    recall = np.mean([len(set(t) & set(f)) / 10 for t, f in zip(truth, found)])
+    assert recall > 0.9
+
+
+def test_ivf_training_waits_for_enough_rows(tmp_path, monkeypatch):
+    collection = LocalCollection(tmp_path / "awr", nlist=8, nprobe=2)
+    trainings = []
+    train = collection.train
+    monkeypatch.setattr(collection, "train", lambda: trainings.append(1) or train())
+
+    collection.upsert(ids=["a", "b", "c"], embeddings=vectors(3))
+    for _ in range(3):
+        assert len(collection.query(vectors(1, seed=1), n_results=2)["ids"][0]) == 2
+    assert not trainings
+
+    collection.upsert(ids=[str(i) for i in range(20)], embeddings=vectors(20))
+    collection.query(vectors(1, seed=1), n_results=2)
+    collection.query(vectors(1, seed=1), n_results=2)
+    assert len(trainings) == 1
+
+
+def test_duplicate_ids_in_one_upsert(tmp_path):
+    collection = LocalCollection(tmp_path / "awr", nlist=0)
+    collection.upsert(
+        ids=["a", "b", "b"],
+        embeddings=[[1, 0], [0, 1], [1, 1]],
+        metadatas=[{"v": 1}, {"v": 2}, {"v": 3}],
+    )
+
+    assert collection.count() == 2
+    result = collection.query([[1, 1]], n_results=5)
+    assert sorted(result["ids"][0]) == ["a", "b"]
+    assert result["ids"][0][0] == "b"  # the last occurrence was stored
+    assert result["metadatas"][0][0] == {"v": 3}
+
+
+def test_match_where():
+    metadatas = [
+        {"project": "A", "n": 1},
+        {"project": "B", "n": 2},
+        None,
+        {"project": "C", "n": "x"},
+    ]
+    assert match_where(metadatas, {"project": {"$in": ["A", "C"]}}).tolist() == [
+        True,
+        False,
+        False,
+        True,
+    ]
+    where = {"$and": [{"project": {"$ne": "A"}}, {"n": {"$gte": 2}}]}
+    assert match_where(metadatas, where).tolist() == [False, True, False, False]
+    where = {"$or": [{"project": "B"}, {"n": {"$lt": 2}}]}
+    assert match_where(metadatas, where).tolist() == [True, True, False, False]
+
+
+def test_chromadb_on_local_backend(tmp_path, monkeypatch):
+    from awr.chroma import ChromaDB
+    from config.settings import settings
+
+    monkeypatch.setattr(settings, "VECTOR_BACKEND", "local")
+    monkeypatch.setattr(settings, "VECTOR_INDEX_PATH", tmp_path)
+    db = ChromaDB()
+    db.ef = lambda documents: [[len(doc), 1.0] for doc in documents]
+
+    db.populate(
+        ["short", "a much longer description"],
+        [{"id": "CSP-1", "project": "CSP"}, {"id": "OPS-2", "project": "OPS"}],
+        ["1", "2"],
+    )
+    db.add_ticket("CSP-3", [4.0, 1.0], {"id": "CSP-3", "project": "CSP"}, "ticket")
+
+    matches = db.query_many(["fives"], n_results=2, where={"project": "CSP"})
+    assert [m["id"] for m in matches[0]] == ["CSP-1", "CSP-3"]
+    assert isinstance(db.client, LocalVectorClient)
@@ -0,0 +1,69 @@
+import xml.etree.ElementTree as ET
+from utils.xml_reader import FieldSchema, batched, iter_record_elements
+
+
+def write_xml(tmp_path, body):
+    path = tmp_path / "awr.xml"
+    path.write_text(f"<root>{body}</root>", encoding="utf-8")
+    return str(path)
+
+
+def test_records_are_streamed_and_released(tmp_path):
+    path = write_xml(
+        tmp_path, "".join(f"<record><ID>{i}</ID></record>" for i in range(3))
+    )
+
+    seen = []
+    for elem in iter_record_elements(path):
+        seen.append(elem)
+        assert elem.findtext("ID") == str(len(seen) - 1)
+
+    # every record was cleared once the next one was read
+    assert all(len(elem) == 0 for elem in seen)
+
+
+def test_root_children_are_records_without_known_tags(tmp_path):
+    path = write_xml(tmp_path, "<AWRData><ID>1</ID></AWRData><AWRData/>")
+    assert len(list(iter_record_elements(path))) == 2
+
+
+def test_root_children_before_the_first_record_tag_are_not_records(tmp_path):
+    path = write_xml(
+        tmp_path,
+        "<header><ID>export-1</ID></header>"
+        "<record><ID>1</ID></record><record><ID>2</ID></record>",
+    )
+    assert [e.findtext("ID") for e in iter_record_elements(path)] == ["1", "2"]
+
+    nested = write_xml(
+        tmp_path, "<meta/><records><record><ID>1</ID></record></records>"
+    )
+    assert [e.findtext("ID") for e in iter_record_elements(nested)] == ["1"]
+
+
+def test_root_children_are_records_past_the_lookahead(tmp_path):
+    path = write_xml(
+        tmp_path, "".join(f"<AWRData><ID>{i}</ID></AWRData>" for i in range(5))
+    )
+    ids = [e.findtext("ID") for e in iter_record_elements(path, lookahead=2)]
+    assert ids == [str(i) for i in range(5)]
+
+
+def test_batched():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_field_schema_prefers_earlier_aliases():
+    schema = FieldSchema(
+        {"ID": ["ID"], "JIRA_URL": ["JIRA_URL", "url"], "WIKI_URL": ["WIKI_URL", "url"]}
+    )
+    elem = ET.fromstring(
+        "<record><URL>http://a</URL><Id> 7 </Id><jira_url>http://b</jira_url></record>"
+    )
+
+    assert schema.from_children(elem) == {
+        "ID": "7",
+        "JIRA_URL": "http://b",
+        "WIKI_URL": "http://a",
+    }
+    assert schema.from_attributes(ET.fromstring('<r id="3"/>'))["ID"] == "3"
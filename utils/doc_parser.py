@@ -4,9 +4,12 @@ import json
 from collections import defaultdict
 from typing import Dict, Any, Tuple, Optional
 
+_WHITESPACE = re.compile(r"\s+")
+_DIGITS = re.compile(r"\d+")
+
 
 def normalize(text: str) -> str:
-    return re.sub(r"\s+", " ", text.strip().lower())
+    return _WHITESPACE.sub(" ", text.strip().lower())
 
 
 class DocumentParser:
@@ -28,6 +31,19 @@ class DocumentParser:
 
     def __init__(self, target_paths: Optional[set[Tuple[str, ...]]] = None):
         self.target_paths = target_paths or self.DEFAULT_TARGET_PATHS
+        self.target_trie = self.compile_targets(self.target_paths)
+
+    @staticmethod
+    def compile_targets(target_paths) -> dict:
+        """prefix trie of the normalized target paths: nested {heading: node}
+        dicts, where node[None] is the full path of a target ending there"""
+        trie = {}
+        for path in target_paths:
+            node = trie
+            for heading in path:
+                node = node.setdefault(normalize(heading), {})
+            node[None] = tuple(normalize(heading) for heading in path)
+        return trie
 
     @staticmethod
     def nested_dict() -> defaultdict:
@@ -50,37 +66,71 @@ class DocumentParser:
 
         result = self.nested_dict()
         current_path = []
+        # trie node of every heading in current_path, None once off the trie
+        nodes = []
         section_buffer = []
+        target = None  # target path of the current section, if it is one
+        remaining = set(self._iter_targets(self.target_trie))
+        # style id -> how much of the path a heading of that style keeps
+        # (None for body text); documents use only a handful of styles
+        heading_keep = {}
 
         def flush_buffer():
-            if not current_path:
-                return
-            norm_path = tuple(normalize(p) for p in current_path)
-            if norm_path in self.target_paths:
+            if target is not None:
                 self.set_nested(result, current_path, "\n".join(section_buffer).strip())
+                remaining.discard(target)
 
         for para in doc.paragraphs:
+            style_id = para._p.style  # raw id, no lookup in the styles part
+            if style_id not in heading_keep:
+                heading_keep[style_id] = self._heading_keep(para)
+            keep = heading_keep[style_id]
+
+            if keep is None:
+                # body text is only read inside a target section
+                if target is not None:
+                    text = para.text.strip()
+                    if text:
+                        section_buffer.append(text)
+                continue
+
             text = para.text.strip()
             if not text:
                 continue
+            flush_buffer()
+            if not remaining:
+                break  # every target captured, the rest is not needed
+            section_buffer = []
+            # trim or extend current_path for heading level
+            del current_path[keep:]
+            del nodes[keep:]
+            parent = nodes[-1] if nodes else self.target_trie
+            # subtrees that cannot lead to a target are not even normalized
+            node = parent.get(normalize(text)) if parent is not None else None
+            current_path.append(text)
+            nodes.append(node)
+            target = node.get(None) if node is not None else None
+        else:
+            flush_buffer()
+        return result
 
-            style = para.style.name if para.style else ""
-            if style.lower().startswith("heading"):
-                flush_buffer()
-                section_buffer = []
-
-                match = re.search(r"\d+", style)
-                if match:
-                    level = int(match.group())
-                    # trim or extend current_path for heading level
-                    current_path = current_path[: level - 1]
-                else:
-                    current_path = []
-                current_path.append(text)
+    @staticmethod
+    def _iter_targets(trie: dict):
+        for heading, node in trie.items():
+            if heading is None:
+                yield node
             else:
-                section_buffer.append(text)
-        flush_buffer()
-        return result
+                yield from DocumentParser._iter_targets(node)
+
+    @staticmethod
+    def _heading_keep(para) -> Optional[int]:
+        """number of enclosing headings kept by a heading paragraph: level - 1
+        for "Heading N" styles, 0 for unnumbered ones. None if not a heading."""
+        style = para.style.name if para.style else ""
+        if not style.lower().startswith("heading"):
+            return None
+        match = _DIGITS.search(style)
+        return int(match.group()) - 1 if match else 0
 
     @staticmethod
     def dict_to_json(nested_dict: dict) -> dict:
@@ -0,0 +1,23 @@
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+
+def load_json(path, default: Any = None) -> Any:
+    """contents of a JSON file, `default` if it does not exist"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def save_json(path, data: Any):
+    """writes `data` to a temporary file next to `path` and renames it over
+    `path`, so readers never see a half-written file"""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
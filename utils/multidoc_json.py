@@ -1,9 +1,195 @@
-
 import argparse
-import doc_parser
 import json
-import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from hashlib import sha256
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+from utils.doc_parser import DocumentParser
+from utils.json_file import load_json, save_json
+from awr.logger import logger
+
+
+def file_digest(path: Path) -> str:
+    h = sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def parse_document(
+    path: str, known_digest: Optional[str] = None
+) -> Tuple[str, Optional[dict]]:
+    """runs in a worker process: the content hash of one DOCX file and its
+    flattened sections, None for the sections if the hash is still
+    `known_digest` (the file was touched, not changed)"""
+    digest = file_digest(Path(path))
+    if digest == known_digest:
+        return digest, None
+    return digest, DocumentParser().extract_awr_sections(path)
+
+
+def iter_documents(
+    directory: str,
+    state_path: Optional[str] = None,
+    pattern: str = "**/*.docx",
+    workers: Optional[int] = None,
+) -> Iterator[dict]:
+    """parses every DOCX file under `directory` in a process pool and yields
+    {"path", "sections"} per document as soon as it is parsed.
+
+    with a `state_path` files exported by a previous run are skipped: an
+    unchanged mtime and size skips the file outright, otherwise its content
+    hash decides. a file is recorded in the state only after the consumer
+    took its record, so an interrupted run redoes at most the files in flight."""
+    state_path = Path(state_path) if state_path else None
+    state = load_json(state_path, {}) if state_path else {}
+    try:
+        yield from scan_documents(directory, state, pattern, workers)
+    finally:
+        if state_path:
+            save_json(state_path, state)
+
+
+def scan_documents(
+    directory: str,
+    state: Dict[str, dict],
+    pattern: str = "**/*.docx",
+    workers: Optional[int] = None,
+) -> Iterator[dict]:
+    """iter_documents against an in-memory state (path -> {mtime, size,
+    sha256}), updated in place and left to the caller to persist. entries of
+    files that no longer exist are removed from it."""
+    pending = {}
+    skipped = 0
+    seen = set()
+    for path in sorted(Path(directory).glob(pattern)):
+        if path.name.startswith("~$"):
+            continue  # Word lock file
+        seen.add(str(path))
+        stat = path.stat()
+        known = state.get(str(path))
+        stamp = {"mtime": stat.st_mtime_ns, "size": stat.st_size}
+        if known and all(known.get(k) == v for k, v in stamp.items()):
+            skipped += 1
+            continue
+        pending[str(path)] = (stamp, (known or {}).get("sha256"))
+    for path in set(state) - seen:
+        del state[path]
+    logger.info(f"{len(pending)} documents to hash and parse, {skipped} unchanged")
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        # the workers hash the files too, a touched file is not parsed again
+        futures = {
+            pool.submit(parse_document, path, known_digest): path
+            for path, (_, known_digest) in pending.items()
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                digest, sections = future.result()
+            except Exception as e:
+                failed += 1
+                logger.error(f"Failed to parse {path}: {e}")
+                continue
+            if sections is not None:
+                yield {"path": path, "sections": sections}
+            state[path] = {**pending[path][0], "sha256": digest}
+    if failed:
+        logger.warning(f"{failed} documents could not be parsed")
+
+
+def iter_jsonl(path: Path) -> Iterator[dict]:
+    """the records of a JSONL export one at a time, none if the file does
+    not exist"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    except FileNotFoundError:
+        return
+
+
+def export_jsonl(
+    directory: str,
+    output: str,
+    state_path: Optional[str] = None,
+    pattern: str = "**/*.docx",
+    workers: Optional[int] = None,
+) -> int:
+    """writes one record per DOCX file under `directory` to the JSONL file
+    `output` and returns how many were parsed.
+
+    only new and changed files are parsed. the output is rewritten each run:
+    a changed file's record replaces its old one, unchanged files keep the
+    record of the previous output (streamed over, not loaded) and deleted
+    files are dropped. the state (default <output>.state.json) describes that
+    one output file, so a new or missing output starts from scratch, and it
+    is saved only after the new output replaced the old one."""
+    output = Path(output)
+    state_path = Path(state_path or f"{output}.state.json")
+    previous = {record["path"] for record in iter_jsonl(output)}
+    # a state entry is only valid while the output still holds its record
+    state = {
+        path: stamp
+        for path, stamp in load_json(state_path, {}).items()
+        if path in previous
+    }
+
+    tmp_path = output.with_name(output.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        parsed = set()
+
+        def fresh():
+            for record in scan_documents(directory, state, pattern, workers):
+                parsed.add(record["path"])
+                yield record
+
+        count = write_jsonl(fresh(), out)
+        kept = write_jsonl(
+            (
+                record
+                for record in iter_jsonl(output)
+                if record["path"] in state and record["path"] not in parsed
+            ),
+            out,
+        )
+    os.replace(tmp_path, output)
+    save_json(state_path, state)
+    logger.info(f"Exported {count} documents, {kept} unchanged")
+    return count
+
+
+def write_jsonl(records: Iterable[dict], out: TextIO) -> int:
+    count = 0
+    for record in records:
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export the AWR sections of a directory of DOCX files as JSONL"
+    )
+    parser.add_argument("directory", help="Directory searched for DOCX files")
+    parser.add_argument("-o", "--output", required=True, help="JSONL output file")
+    parser.add_argument(
+        "--state",
+        help="State file used to skip unchanged files "
+        "(default: <output>.state.json)",
+    )
+    parser.add_argument("--pattern", default="**/*.docx", help="Glob for DOCX files")
+    parser.add_argument("--workers", type=int, help="Parser processes (default: CPUs)")
+    args = parser.parse_args()
+
+    export_jsonl(args.directory, args.output, args.state, args.pattern, args.workers)
+
 
 if __name__ == "__main__":
-    args = argparse.ArgumentParser()
-    args.par
+    main()
@@ -0,0 +1,48 @@
+import random
+import smtplib
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+
+def should_retry(method: str, status_code: Optional[int]) -> bool:
+    """429 means the request was rejected before processing, so it is always
+    safe to resend. 5xx and connection errors (status None) are only retried
+    for idempotent methods, a retried POST could create a second issue."""
+    if status_code == 429:
+        return True
+    if method.upper() not in IDEMPOTENT_METHODS:
+        return False
+    return status_code is None or status_code in RETRY_STATUSES
+
+
+def retry_delay(
+    attempt: int, backoff_factor: float, retry_after: Optional[str] = None
+) -> float:
+    """seconds to wait before the next attempt: the server's Retry-After if
+    given, otherwise exponential backoff with full jitter"""
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(
+                    0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()
+                )
+            except (TypeError, ValueError):
+                pass
+    return random.uniform(0, backoff_factor * 2**attempt)
+
+
+def smtp_is_permanent(error: smtplib.SMTPException) -> bool:
+    """whether an SMTP refusal is final: 5xx replies are, 4xx ones (421
+    service unavailable, 450/451 try again later) are worth retrying. a
+    refusal of all recipients is final only if every recipient got a 5xx."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+    else:
+        codes = [getattr(error, "smtp_code", None)]
+    return bool(codes) and all(isinstance(code, int) and code >= 500 for code in codes)
@@ -0,0 +1,127 @@
+import xml.etree.ElementTree as ET
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+RECORD_TAGS = ("record", "item", "entry")
+
+T = TypeVar("T")
+
+
+def iter_record_elements(
+    file_path: str, record_tags: Sequence[str] = RECORD_TAGS, lookahead: int = 16
+) -> Iterator[ET.Element]:
+    """yields the record elements of an XML file while it is being parsed.
+
+    records are elements tagged with one of `record_tags` at any depth. the
+    direct children of the root are records instead when no such tag starts
+    within the first `lookahead` of them; until that is decided those
+    children are held back, so header elements in front of the first record
+    tag are never yielded. a yielded element is complete, but it is cleared
+    and detached from its parent as soon as the consumer asks for the next
+    one, so at most `lookahead` records are held in memory however large the
+    file is.
+
+    raises ET.ParseError / FileNotFoundError like ET.parse, possibly after
+    some records were already yielded."""
+    stack = []
+    tagged = None  # None until decided, then whether records are tagged
+    held = []  # root children read while undecided
+    for event, elem in ET.iterparse(file_path, events=("start", "end")):
+        if event == "start":
+            if tagged is None and elem.tag in record_tags:
+                tagged = True
+                for child in held:  # headers, not records
+                    child.clear()
+                    stack[0].remove(child)
+                held = []
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        if not stack:
+            break  # end of root
+        parent = stack[-1]
+        if tagged and elem.tag in record_tags:
+            yield elem
+            elem.clear()
+            parent.remove(elem)
+        elif len(stack) == 1:
+            if tagged is None:
+                held.append(elem)
+                if len(held) <= lookahead:
+                    continue
+                tagged = False
+            if tagged is False:
+                yield from _release(held or [elem], parent)
+                held = []
+            else:
+                # processed top-level element that is not a record
+                elem.clear()
+                parent.remove(elem)
+    if held:
+        yield from _release(held, elem)  # elem is the root here
+
+
+def _release(elements: List[ET.Element], parent: ET.Element) -> Iterator[ET.Element]:
+    """yields the elements, clearing and detaching each once it was taken"""
+    for elem in elements:
+        yield elem
+        elem.clear()
+        parent.remove(elem)
+
+
+class FieldSchema:
+    """resolves record fields from tag or attribute names in one pass.
+
+    `aliases` maps each field to the names it may appear under, in order of
+    preference. names match case-insensitively and one name may be an alias
+    of several fields. the alias table is compiled once into a name ->
+    [(field, rank)] lookup, so a record costs one dict lookup per child."""
+
+    def __init__(self, aliases: Dict[str, Sequence[str]]):
+        self.fields = tuple(aliases)
+        self._by_name: Dict[str, List[Tuple[str, int]]] = {}
+        for field, names in aliases.items():
+            for rank, name in enumerate(names):
+                matches = self._by_name.setdefault(name.lower(), [])
+                if all(f != field for f, _ in matches):
+                    matches.append((field, rank))
+        # raw name -> matches, so each distinct tag is lowercased only once
+        self._resolved: Dict[str, List[Tuple[str, int]]] = {}
+
+    def _matches(self, name: str) -> List[Tuple[str, int]]:
+        matches = self._resolved.get(name)
+        if matches is None:
+            matches = self._by_name.get(name.lower(), [])
+            self._resolved[name] = matches
+        return matches
+
+    def resolve(self, pairs: Iterable[Tuple[str, Optional[str]]]) -> Dict[str, str]:
+        """maps (name, value) pairs to {field: value}. each field takes the
+        value of its most preferred alias present, the first one on ties;
+        fields that are not present are empty strings."""
+        record = dict.fromkeys(self.fields, "")
+        best: Dict[str, int] = {}
+        for name, value in pairs:
+            for field, rank in self._matches(name):
+                if field not in best or rank < best[field]:
+                    best[field] = rank
+                    record[field] = value or ""
+        return record
+
+    def from_children(self, elem: ET.Element) -> Dict[str, str]:
+        """fields from the stripped text of the element's children"""
+        return self.resolve(
+            (child.tag, child.text.strip() if child.text else "") for child in elem
+        )
+
+    def from_attributes(self, elem: ET.Element) -> Dict[str, str]:
+        """fields from the element's attributes"""
+        return self.resolve(elem.attrib.items())
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """splits an iterable into lists of at most `size` items"""
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
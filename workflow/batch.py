@@ -0,0 +1,126 @@
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Iterable, List, Optional
+from awr.logger import logger
+from awr.models import TriageResult
+from config.settings import settings
+from utils.xml_reader import batched
+
+_STOP = object()
+
+
+class BatchTriageRunner:
+    """triages many tickets with a pool of worker threads.
+
+    ticket ids are grouped into chunks of `chunk_size` and fed through a
+    bounded queue, so at most about `queue_size` tickets wait for a worker
+    and the id source (e.g. a paginated search) is consumed only as fast as
+    tickets are processed. each worker triages a whole chunk through
+    TriageWorkflow.process_many (one embedding call, one vector query per
+    filter and one vectorized classification), so a slow Jira, embedding or
+    SMTP call on one chunk does not hold up the others."""
+
+    def __init__(
+        self,
+        workflow,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+    ):
+        self.workflow = workflow
+        self.workers = workers or settings.TRIAGE_WORKERS
+        self.queue_size = queue_size or settings.TRIAGE_QUEUE_SIZE
+        self.chunk_size = chunk_size or settings.TRIAGE_CHUNK_SIZE
+
+    def _process(self, ticket_ids: List[str]) -> List[TriageResult]:
+        start = time.perf_counter()
+        try:
+            outcomes = self.workflow.process_many(ticket_ids)
+            errors = {
+                t: None if outcomes.get(t) else "not processed" for t in ticket_ids
+            }
+        except Exception as e:
+            logger.error(f"[Batch] Failed to process tickets {ticket_ids}: {e}")
+            outcomes, errors = {}, dict.fromkeys(ticket_ids, str(e))
+        elapsed = time.perf_counter() - start
+        # the chunk is triaged in one pass, so its tickets share its latency
+        return [
+            TriageResult(
+                ticket_id=ticket_id,
+                outcome=outcomes.get(ticket_id),
+                elapsed=elapsed,
+                error=errors[ticket_id],
+            )
+            for ticket_id in ticket_ids
+        ]
+
+    def run(self, ticket_ids: Iterable[str]) -> List[TriageResult]:
+        """processes every ticket id and returns one result per ticket"""
+        tasks = queue.Queue(maxsize=max(1, self.queue_size // self.chunk_size))
+        results = []
+        chunk_latencies = []
+        results_lock = threading.Lock()
+
+        def worker():
+            while True:
+                chunk = tasks.get()
+                if chunk is _STOP:
+                    return
+                chunk_results = self._process(chunk)
+                elapsed = chunk_results[0].elapsed
+                with results_lock:
+                    results.extend(chunk_results)
+                    chunk_latencies.append(elapsed)
+                logger.info(
+                    f"[Batch] Chunk of {len(chunk)} in {elapsed:.2f}s: "
+                    + ", ".join(
+                        f"{r.ticket_id} {r.outcome or 'failed'}" for r in chunk_results
+                    )
+                )
+
+        threads = [
+            threading.Thread(target=worker, name=f"triage-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            for chunk in batched(ticket_ids, self.chunk_size):
+                tasks.put(chunk)  # blocks while the queue is full
+        finally:
+            for _ in threads:
+                tasks.put(_STOP)
+            for thread in threads:
+                thread.join()
+
+        self.report(results, time.perf_counter() - start, chunk_latencies)
+        return results
+
+    def report(
+        self,
+        results: List[TriageResult],
+        elapsed: float,
+        chunk_latencies: Optional[List[float]] = None,
+    ):
+        """logs throughput, the latency of the process_many chunks and the
+        outcome counts of a run"""
+        outcomes = Counter(result.outcome or "failed" for result in results)
+        latencies = sorted(chunk_latencies or [])
+        throughput = len(results) / elapsed if elapsed else 0.0
+        logger.info(
+            f"[Batch] Triaged {len(results)} tickets in {elapsed:.1f}s "
+            f"({throughput:.2f} tickets/s) with {self.workers} workers"
+        )
+        if latencies:
+            logger.info(
+                f"[Batch] Chunk latency ({len(latencies)} chunks of up to "
+                f"{self.chunk_size}): p50 {latencies[len(latencies) // 2]:.2f}s, "
+                f"max {latencies[-1]:.2f}s"
+            )
+        logger.info(
+            "[Batch] Outcomes: "
+            + ", ".join(f"{name}={count}" for name, count in sorted(outcomes.items()))
+        )
@@ -0,0 +1,112 @@
+from hashlib import sha256
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from awr.logger import logger
+from config.settings import settings
+from utils.json_file import load_json, save_json
+
+
+def record_key(ticket: dict) -> str:
+    """stable identity of an XML record: its ID, or a hash of its content"""
+    if ticket.get("id"):
+        return ticket["id"]
+    content = f"{ticket['summary']}\n{ticket['description']}"
+    return sha256(content.encode("utf-8")).hexdigest()
+
+
+class BulkLoader:
+    """creates Jira issues for XML records through the bulk create endpoint.
+
+    records are sent in chunks of `chunk_size`; items Jira rejects are resent
+    on their own (up to `max_attempts` in total) while the rest of the chunk
+    is kept. every created issue is written to a checkpoint file right after
+    its chunk, so rerunning an interrupted load skips the records that
+    already have an issue instead of creating duplicates."""
+
+    def __init__(
+        self,
+        jira,
+        checkpoint_path: str,
+        chunk_size: Optional[int] = None,
+        max_attempts: int = 3,
+    ):
+        self.jira = jira
+        self.checkpoint_path = Path(checkpoint_path)
+        self.chunk_size = chunk_size or settings.JIRA_BULK_SIZE
+        self.max_attempts = max_attempts
+        self.created = self._load_checkpoint()
+
+    def _load_checkpoint(self) -> Dict[str, str]:
+        """record key -> issue key of every record created so far"""
+        created = load_json(self.checkpoint_path, {})
+        if created:
+            logger.info(
+                f"Resuming load: {len(created)} records already created "
+                f"({self.checkpoint_path})"
+            )
+        return created
+
+    def _save_checkpoint(self):
+        save_json(self.checkpoint_path, self.created)
+
+    def _create_chunk(self, chunk: list) -> Dict[str, str]:
+        """creates one chunk, resending only failed items. returns the
+        errors of items that still failed after the last attempt."""
+        pending = chunk
+        errors = {}
+        for attempt in range(1, self.max_attempts + 1):
+            results = self.jira.create_tickets_bulk([t for _, t in pending])
+            failed = []
+            for (key, ticket), (issue_key, error) in zip(pending, results):
+                if issue_key:
+                    self.created[key] = issue_key
+                    errors.pop(key, None)
+                else:
+                    errors[key] = error
+                    failed.append((key, ticket))
+            self._save_checkpoint()
+            if not failed:
+                break
+            logger.warning(
+                f"{len(failed)} of {len(pending)} issues failed (attempt {attempt})"
+            )
+            pending = failed
+        return errors
+
+    def _chunks(self, tickets: Iterable[dict], stats: dict):
+        """groups tickets without an issue yet into chunks of chunk_size"""
+        chunk = []
+        for ticket in tickets:
+            key = record_key(ticket)
+            if key in self.created or any(key == k for k, _ in chunk):
+                stats["skipped"] += 1
+                continue
+            chunk.append((key, ticket))
+            if len(chunk) == self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def load(self, tickets: Iterable[dict]) -> dict:
+        """creates an issue per ticket dict (summary, description, labels and
+        optionally the XML id) that is not in the checkpoint yet"""
+        created_before = len(self.created)
+        stats = {"skipped": 0}
+        failures = {}
+        for chunk in self._chunks(tickets, stats):
+            failures.update(self._create_chunk(chunk))
+            logger.info(f"{len(self.created) - created_before} issues created so far")
+
+        for key, error in failures.items():
+            logger.error(f"Failed to create issue for record {key}: {error}")
+        summary = {
+            "created": len(self.created) - created_before,
+            "skipped": stats["skipped"],
+            "failed": len(failures),
+        }
+        logger.info(
+            f"Bulk load finished: {summary['created']} created, "
+            f"{summary['skipped']} already loaded, {summary['failed']} failed"
+        )
+        return summary
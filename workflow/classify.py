@@ -0,0 +1,39 @@
+import numpy as np
+from typing import Iterable, NamedTuple
+from config.thresholds import Thresholds
+
+# indexed by how many thresholds the best similarity reaches
+DECISIONS = np.array(["new", "review", "duplicate"])
+
+
+class Classification(NamedTuple):
+    decisions: np.ndarray  # (N,) "duplicate" / "review" / "new"
+    best: np.ndarray  # (N,) column of the closest candidate, -1 if none
+    similarity: np.ndarray  # (N,) similarity of that candidate, nan if none
+
+
+def classify(distances, priorities: Iterable) -> Classification:
+    """classifies N tickets at once from an N x k matrix of candidate
+    distances (nan or inf where a ticket has fewer than k candidates) and
+    their N priorities, against the per-priority thresholds."""
+    distances = np.atleast_2d(np.asarray(distances, dtype=np.float64))
+    distances = np.where(np.isnan(distances), np.inf, distances)
+    rows = np.arange(len(distances))
+
+    if distances.shape[1]:
+        best = distances.argmin(axis=1)
+        best_distance = distances[rows, best]
+    else:
+        best = np.zeros(len(distances), dtype=np.intp)
+        best_distance = np.full(len(distances), np.inf)
+    found = np.isfinite(best_distance)
+    similarity = 1 - best_distance  # distance -> similarity
+
+    duplicate, review = Thresholds.arrays(priorities)
+    level = (similarity >= review).astype(np.intp) + (similarity >= duplicate)
+    level[~found] = 0
+    return Classification(
+        decisions=DECISIONS[level],
+        best=np.where(found, best, -1),
+        similarity=np.where(found, similarity, np.nan),
+    )
@@ -1,7 +1,9 @@
-from typing import Dict
+from pathlib import Path
+from typing import Dict, List, Optional
 import numpy as np
-from utils.document_parser import DocumentParser
-from awr.embedding_generator import EmbeddingGenerator
+from utils.doc_parser import DocumentParser
+from awr.embedding import EmbeddingGenerator
+from awr.logger import logger
 
 
 class DocumentEmbeddingPipeline:
@@ -19,20 +21,62 @@ class DocumentEmbeddingPipeline:
         sections = self.parser.extract_awr_sections(docx_path)
         logger.debug(f"Extracted {len(sections)} sections from document")
 
-        embeddings = {}
-        for section_title, section_text in sections.items():
-            try:
-                embedding_vector = self.embedder.generate(section_text)
-                embeddings[section_title] = embedding_vector
-                logger.debug(f"Generated embedding for section: {section_title}")
-            except Exception as e:
-                logger.error(
-                    f"Embedding generation failed for section '{section_title}': {e}"
-                )
+        # all sections go out in one batched call; rows of the returned
+        # matrix are handed back per section title
+        titles = list(sections)
+        try:
+            matrix = self.embedder.generate_batch([sections[t] for t in titles])
+        except Exception as e:
+            logger.error(f"Embedding generation failed for document '{docx_path}': {e}")
+            return {}
+        embeddings = dict(zip(titles, matrix))
 
         logger.info(f"Completed embeddings for document: {docx_path}")
         return embeddings
 
+    def process_documents(
+        self, docx_paths: List[str]
+    ) -> Dict[str, Dict[str, np.ndarray]]:
+        """like process_document, but sections of all documents share the
+        same batched embedding requests."""
+        sections = []
+        for docx_path in docx_paths:
+            logger.info(f"Processing document: {docx_path}")
+            for title, text in self.parser.extract_awr_sections(docx_path).items():
+                sections.append((docx_path, title, text))
+        logger.debug(
+            f"Extracted {len(sections)} sections from {len(docx_paths)} documents"
+        )
+
+        matrix = self.embedder.generate_batch([text for _, _, text in sections])
+        embeddings = {docx_path: {} for docx_path in docx_paths}
+        for (docx_path, title, _), vector in zip(sections, matrix):
+            embeddings[docx_path][title] = vector
+        logger.info(f"Completed embeddings for {len(docx_paths)} documents")
+        return embeddings
+
+    def index_document(
+        self,
+        docx_path: str,
+        chroma,
+        parent_id: Optional[str] = None,
+        metadata: Optional[dict] = None,
+    ) -> int:
+        """embeds the sections of a DOCX file and stores them in the section
+        collection of `chroma`, under `parent_id` (default: the file name
+        without extension). returns the number of sections indexed."""
+        parent_id = parent_id or Path(docx_path).stem
+        logger.info(f"Indexing document: {docx_path}")
+        sections = self.parser.extract_awr_sections(docx_path)
+        try:
+            matrix = self.embedder.generate_batch(list(sections.values()))
+        except Exception as e:
+            logger.error(f"Embedding generation failed for document '{docx_path}': {e}")
+            return 0
+        return chroma.index_sections(
+            parent_id, sections, metadata=metadata, embeddings=matrix
+        )
+
 
 # parser = DocumentParser()
 # embedder = EmbeddingGenerator()
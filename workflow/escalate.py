@@ -1,6 +1,9 @@
+from contextlib import nullcontext
 from datetime import datetime, timedelta
+from typing import Optional
 from awr.jira import JiraClient
-from awr.messaging import EmailNotifier
+from awr.outbox import get_default_outbox
+from awr.digest import Digest, digest_window
 from config.settings import settings
 from awr.logger import logger
 
@@ -8,16 +11,25 @@ from awr.logger import logger
 class EscalationWorkflow:
     def __init__(self):
         self.jira = JiraClient()
-        self.notifier = EmailNotifier()
+        self.outbox = get_default_outbox()
+        self.digest: Optional[Digest] = None  # set inside digest_window
 
-    def run(self):
-        """entry point for the escalation check."""
-        try:
-            stale_issues = self._get_stale_issues()
-            for issue in stale_issues:
-                self._escalate_issue(issue)
-        except Exception as e:
-            logger.error(f"[Escalation] Workflow failed: {str(e)}")
+    def run(self, digest: Optional[bool] = None):
+        """entry point for the escalation check. with `digest` (default:
+        NOTIFICATION_DIGEST) the run sends one summary email instead of one
+        per escalated ticket."""
+        if digest is None:
+            digest = settings.NOTIFICATION_DIGEST
+        window = digest_window(self, "Escalation") if digest else nullcontext()
+        with window:
+            try:
+                escalated = 0
+                for issue in self._get_stale_issues():
+                    self._escalate_issue(issue)
+                    escalated += 1
+                logger.info(f"[Escalation] Processed {escalated} stale tickets")
+            except Exception as e:
+                logger.error(f"[Escalation] Workflow failed: {str(e)}")
 
     def _get_stale_issues(self):
         """Finds tickets labeled 'AI_REVIEW' and not updated within the escalation window."""
@@ -26,9 +38,8 @@ class EscalationWorkflow:
         jql = f'labels = AI_REVIEW AND updated < "{cutoff_str}"'
 
         logger.info(f"[Escalation] Executing JQL: {jql}")
-        issues = self.jira.search_tickets(jql)
-        logger.info(f"[Escalation] Found {len(issues)} stale tickets")
-        return issues
+        # escalated issues lose AI_REVIEW and leave the result set as we go
+        return self.jira.iter_search(jql, fields=["labels"], consuming=True)
 
     def _escalate_issue(self, issue):
         """Updates the ticket and sends notification."""
@@ -43,8 +54,12 @@ class EscalationWorkflow:
             comment=f"Auto-escalated after {settings.ESCALATION_HOURS}h inactivity",
         )
 
-        self.notifier.send(
+        if self.digest is not None:
+            self.digest.add("escalated", issue.key)
+            return
+        self.outbox.enqueue(
             to=settings.EMAIL_USER,
             subject=f"[Escalation] {issue.key} needs attention",
             body=f"The ticket {issue.key} has been escalated after {settings.ESCALATION_HOURS} hours of inactivity.",
+            dedup_key=f"{issue.key}:escalated",
         )
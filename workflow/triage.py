@@ -1,37 +1,78 @@
+import json
+import os
+import re
+import numpy as np
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 from awr.jira_rest import JiraClientREST
-from awr.chroma import ChromaDB
-from awr.models import JiraTicket
+from awr.chroma import ChromaDB, build_where, project_of
+from awr.models import JiraTicket, Priority
 from awr.embedding import EmbeddingGenerator
-from awr.messaging import EmailNotifier
+from awr.outbox import get_default_outbox
+from awr.digest import Digest
 from awr.logger import logger
-from config.thresholds import Thresholds
+from workflow.classify import classify
 from config.settings import settings
 
+# added with every outcome label; open tickets carrying it are not triaged again
+TRIAGED_LABEL = "AI_TRIAGED"
+_SUMMARY_TAGS = re.compile(r"(\s*\[(?:DUPLICATE|REVIEW NEEDED): [^\]]*\])+$")
+
+
+def tag_summary(summary: str, tag: str) -> str:
+    """appends `[tag]` to a summary, replacing a tag left by an earlier triage"""
+    return f"{_SUMMARY_TAGS.sub('', summary)} [{tag}]"
+
 
 class TriageWorkflow:
-    def __init__(self):
+    def __init__(self, rebuild: bool = False, filters: Optional[dict] = None):
+        """`filters` (project, document_reference, version, see
+        build_where) limit duplicate detection to that slice of the corpus"""
+        self.filters = filters or {}
         self.jira = JiraClientREST()
-        self.chroma = ChromaDB()
+        self.chroma = ChromaDB(rebuild=rebuild)
         self.embedder = EmbeddingGenerator()
-        self.notifier = EmailNotifier()
+        # notifications are queued and sent by a background thread
+        self.outbox = get_default_outbox()
+        self.digest: Optional[Digest] = None  # set inside digest_window
+        self._source_stamp = None
 
-    def process(self, ticket_id: str):
-        raw_ticket = self.jira.get_ticket(ticket_id)
-        if not raw_ticket:
-            logger.error(f"[Triage] Ticket not found: {ticket_id}")
-            return
+    def reload_sources(self, xml_path: Optional[str] = None) -> bool:
+        """syncs the vector store with the XML source if the file changed
+        since the last reload. meant to be called periodically by a long
+        running service: the sync streams the file, so memory does not grow
+        with the number of reloads. returns whether a sync ran and completed;
+        a failed one is retried on the next call."""
+        xml_path = xml_path or settings.XML_SOURCE
+        if not xml_path:
+            return False
+        try:
+            stat = os.stat(xml_path)
+        except FileNotFoundError:
+            logger.error(f"[Triage] XML source not found: {xml_path}")
+            return False
 
-        fields = raw_ticket["fields"]
-        ticket = JiraTicket(
-            id=raw_ticket["key"],
-            summary=fields["summary"],
-            description=fields.get("description", ""),
-            priority=fields["priority"]["name"],
-            labels=fields.get("labels", []),
-        )
+        stamp = (xml_path, stat.st_mtime_ns, stat.st_size)
+        if stamp == self._source_stamp:
+            logger.debug(f"[Triage] XML source unchanged: {xml_path}")
+            return False
+        try:
+            synced = self.chroma.init_populate(xml_path)
+        except Exception as e:
+            logger.error(f"[Triage] Reloading {xml_path} failed: {e}", exc_info=True)
+            synced = False
+        if not synced:
+            return False  # stamp not recorded, so the next reload retries
+        self._source_stamp = stamp
+        return True
+
+    def process(self, ticket_id: str) -> Optional[str]:
+        """triages one ticket. returns the classification ("duplicate",
+        "review" or "new"), or None if the ticket could not be processed."""
+        ticket = self._fetch_ticket(ticket_id)
+        if ticket is None:
+            return
         ticket_text = self._format_ticket_text(ticket)
 
         try:
@@ -43,32 +84,125 @@ class TriageWorkflow:
             return
 
         try:
-            result = self.chroma.query(ticket_text)
+            result = self.chroma.query_by_embedding(
+                embedding,
+                n_results=settings.TRIAGE_CANDIDATES + 1,
+                where=self._where(ticket),
+            )
         except Exception as e:
             logger.error(f"[Triage] ChromaDB query failed for {ticket_id}: {str(e)}")
             return
 
-        # if not result["ids"][0]:
-        #     self._classify_new(ticket, embedding)
-        #     return
+        return self._apply([ticket], [embedding], [ticket_text], [result])[0]
 
-        # best_match = result["metadatas"][0][0]
-        # similarity = 1 - result["distances"][0][0]  # Convert distance to similarity
-        if not result:
-            self._classify_new(ticket, embedding)
-            return
+    def process_many(self, ticket_ids: List[str]) -> Dict[str, Optional[str]]:
+        """triages a chunk of tickets with one batched embedding call, one
+        vector query per distinct filter and a vectorized classification.
+        returns ticket id -> classification, None for tickets that failed."""
+        outcomes = dict.fromkeys(ticket_ids)
+        tickets = [t for t in map(self._fetch_ticket, ticket_ids) if t is not None]
+        if not tickets:
+            return outcomes
+        texts = [self._format_ticket_text(ticket) for ticket in tickets]
+
+        try:
+            embeddings = self.embedder.generate_batch(texts)
+        except Exception as e:
+            logger.error(f"[Triage] Embedding generation failed: {str(e)}")
+            return outcomes
+
+        results = [None] * len(tickets)
+        groups = {}
+        for i, ticket in enumerate(tickets):
+            where = self._where(ticket)
+            key = json.dumps(where, sort_keys=True)
+            groups.setdefault(key, (where, []))[1].append(i)
+        for where, rows in groups.values():
+            try:
+                matches = self.chroma.query_many(
+                    [embeddings[i] for i in rows],
+                    n_results=settings.TRIAGE_CANDIDATES + 1,
+                    where=where,
+                )
+            except Exception as e:
+                logger.error(f"[Triage] ChromaDB query failed: {str(e)}")
+                continue
+            for i, ticket_matches in zip(rows, matches):
+                results[i] = ticket_matches
+
+        rows = [i for i, result in enumerate(results) if result is not None]
+        decisions = self._apply(
+            [tickets[i] for i in rows],
+            [embeddings[i] for i in rows],
+            [texts[i] for i in rows],
+            [results[i] for i in rows],
+        )
+        for i, decision in zip(rows, decisions):
+            outcomes[tickets[i].id] = decision
+        return outcomes
+
+    def _fetch_ticket(self, ticket_id: str) -> Optional[JiraTicket]:
+        """the ticket as a JiraTicket, or None (logged) if it cannot be read,
+        so one bad ticket does not fail the chunk it is triaged in"""
+        try:
+            raw_ticket = self.jira.get_ticket(ticket_id)
+            if not raw_ticket:
+                logger.error(f"[Triage] Ticket not found: {ticket_id}")
+                return None
 
-        best_match = result[0]
-        similarity = 1 - best_match["distance"]  # distance -> similarity
-        priority = ticket["fields"].get("priority", {}).get("name", "Medium")
-        priority_thresholds = Thresholds.get(priority)
+            fields = raw_ticket["fields"]
+            return JiraTicket(
+                id=raw_ticket["key"],
+                summary=fields["summary"],
+                description=fields.get("description") or "",
+                priority=(fields.get("priority") or {}).get("name", Priority.MEDIUM),
+                labels=fields.get("labels", []),
+            )
+        except Exception as e:
+            logger.error(f"[Triage] Failed to fetch ticket {ticket_id}: {e}")
+            return None
+
+    def _apply(self, tickets, embeddings, texts, results) -> List[Optional[str]]:
+        """classifies the tickets from their candidate matches in one
+        vectorized pass, then updates Jira and notifies per ticket. a ticket
+        triaged before is in the store itself and is dropped from its own
+        candidates (one extra candidate is queried to make up for it)."""
+        results = [
+            [m for m in matches if m.get("id") != ticket.id][
+                : settings.TRIAGE_CANDIDATES
+            ]
+            for ticket, matches in zip(tickets, results)
+        ]
+        k = max((len(matches) for matches in results), default=0)
+        distances = np.full((len(results), k), np.inf)
+        for i, matches in enumerate(results):
+            distances[i, : len(matches)] = [m["distance"] for m in matches]
+        classification = classify(distances, [t.priority for t in tickets])
+
+        outcomes = []
+        for i, ticket in enumerate(tickets):
+            decision = str(classification.decisions[i])
+            try:
+                if decision == "new":
+                    self._classify_new(ticket, embeddings[i], texts[i])
+                else:
+                    match = results[i][classification.best[i]]
+                    similarity = float(classification.similarity[i])
+                    if decision == "duplicate":
+                        self._classify_duplicate(ticket, match, similarity)
+                    else:
+                        self._classify_review(ticket, match, similarity)
+            except Exception as e:
+                logger.error(f"[Triage] Failed to apply {decision} to {ticket.id}: {e}")
+                decision = None
+            outcomes.append(decision)
+        return outcomes
 
-        if similarity >= priority_thresholds["duplicate"]:
-            self._classify_duplicate(ticket, best_match, similarity)
-        elif similarity >= priority_thresholds["review"]:
-            self._classify_review(ticket, best_match, similarity)
-        else:
-            self._classify_new(ticket, embedding)
+    def _where(self, ticket: JiraTicket) -> Optional[dict]:
+        filters = dict(self.filters)
+        if settings.TRIAGE_SCOPE_PROJECT:
+            filters.setdefault("project", project_of(ticket.id))
+        return build_where(**filters)
 
     def _format_ticket_text(self, ticket: JiraTicket) -> str:
         """Generate a text representation for embedding."""
@@ -86,13 +220,14 @@ class TriageWorkflow:
         """Update Jira and notify for duplicate ticket."""
         self.jira.update_ticket(
             ticket.id,
-            {
-                "labels": list(set(ticket.labels + ["AI_DUPLICATE"])),
-                "summary": f"{ticket.summary} [DUPLICATE: {match.get('id')}]",
-            },
+            {"summary": tag_summary(ticket.summary, f"DUPLICATE: {match.get('id')}")},
+            add_labels=["AI_DUPLICATE", TRIAGED_LABEL],
         )
-        self.notifier.send(
-            to=settings.EMAIL_USER,
+        self._notify(
+            "duplicate",
+            ticket,
+            match,
+            similarity,
             subject=f"[Triage] Duplicate detected: {ticket.id}",
             body=(
                 f"Ticket {ticket.id} was marked as a DUPLICATE of {match.get('id')} "
@@ -107,18 +242,21 @@ class TriageWorkflow:
         self.jira.update_ticket(
             ticket.id,
             {
-                "labels": list(set(ticket.labels + ["AI_REVIEW"])),
-                "summary": f"{ticket.summary} [REVIEW NEEDED: {match.get('id')}]",
-                "comment": {
-                    "body": (
-                        f"Possible relation to {match.get('id')} (similarity: {similarity:.2f}).\n"
-                        f"URL: {match.get('url')}"
-                    )
-                },
+                "summary": tag_summary(
+                    ticket.summary, f"REVIEW NEEDED: {match.get('id')}"
+                )
             },
+            add_labels=["AI_REVIEW", TRIAGED_LABEL],
+            comment=(
+                f"Possible relation to {match.get('id')} (similarity: {similarity:.2f}).\n"
+                f"URL: {match.get('url')}"
+            ),
         )
-        self.notifier.send(
-            to=settings.EMAIL_USER,
+        self._notify(
+            "review",
+            ticket,
+            match,
+            similarity,
             subject=f"[Triage] Review needed: {ticket.id}",
             body=(
                 f"Ticket {ticket.id} is similar to {match.get('id')} "
@@ -126,16 +264,34 @@ class TriageWorkflow:
             ),
         )
 
-    def _classify_new(self, ticket: JiraTicket, embedding):
+    def _notify(
+        self,
+        category: str,
+        ticket: JiraTicket,
+        match: Dict[str, Any],
+        similarity: float,
+        subject: str,
+        body: str,
+    ):
+        """adds the event to the open digest, or queues a single email"""
+        if self.digest is not None:
+            self.digest.add(
+                category, ticket.id, match.get("id"), similarity, match.get("url")
+            )
+            return
+        self.outbox.enqueue(
+            to=settings.EMAIL_USER,
+            subject=subject,
+            body=body,
+            dedup_key=f"{ticket.id}:{category}",
+        )
+
+    def _classify_new(self, ticket: JiraTicket, embedding, ticket_text: str):
         """Update Jira and ingest new ticket into ChromaDB."""
         self.jira.update_ticket(
             ticket.id,
-            {
-                "labels": list(set(ticket.labels + ["AI_NEW"])),
-                "comment": {
-                    "body": "Classified as new ticket — no similar match found."
-                },
-            },
+            add_labels=["AI_NEW", TRIAGED_LABEL],
+            comment="Classified as new ticket — no similar match found.",
         )
         try:
             self.chroma.add_ticket(
@@ -143,10 +299,12 @@ class TriageWorkflow:
                 embedding=embedding,
                 metadata={
                     "id": ticket.id,
+                    "project": project_of(ticket.id),
                     "summary": ticket.summary,
-                    "priority": ticket.priority,
+                    "priority": ticket.priority.value,
                     "created": datetime.now().isoformat(),
                 },
+                document=ticket_text,
             )
         except Exception as e:
             logger.error(